@@ -0,0 +1,52 @@
+"""Chargement de gemini-pc-bot.py (nom de fichier non importable) pour les benchmarks."""
+import importlib.util
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def load_bot_module():
+    """Importe gemini-pc-bot.py et retourne le module."""
+    if "gemini_pc_bot" in sys.modules:
+        return sys.modules["gemini_pc_bot"]
+    spec = importlib.util.spec_from_file_location("gemini_pc_bot", os.path.join(ROOT_DIR, "gemini-pc-bot.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["gemini_pc_bot"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class RecordingSink:
+    """Sink qui garde les messages affichés (et les écrit sur la sortie standard si echo)."""
+
+    def __init__(self, echo=False):
+        self.lines = []
+        self.echo = echo
+
+    def emit(self, event, **data):
+        if event == "log":
+            self.lines.append(data["message"])
+            if self.echo:
+                print(data["message"])
+
+
+def make_automator(echo=False, backend=None, cassette=None, replay_latency=None, **kwargs):
+    """Crée un TaskAutomator qui garde ses messages en mémoire, avec la clé API de api_key.txt.
+
+    backend/cassette/replay_latency remplacent MODEL_BACKEND/CASSETTE_FILE/REPLAY_LATENCY (ex: "replay" hors ligne)."""
+    bot = load_bot_module()
+    if backend:
+        bot.MODEL_BACKEND = backend
+    if cassette:
+        bot.CASSETTE_FILE = cassette
+    if replay_latency is not None:
+        bot.REPLAY_LATENCY = replay_latency
+    api_key = os.environ.get("GEMINI_API_KEY") or bot.load_api_key()
+    if not api_key and bot.MODEL_BACKEND in ("replay", "http"):
+        api_key = "hors-ligne"  # Pas d'appel à l'API Gemini
+    if not api_key:
+        raise SystemExit("Aucune clé API : définissez GEMINI_API_KEY ou créez api_key.txt")
+    return bot.TaskAutomator(api_key, RecordingSink(echo), **kwargs)
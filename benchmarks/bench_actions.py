@@ -0,0 +1,118 @@
+"""Mesure le gain de l'optimisation des plans (gempcbot.actions.optimize) avec l'exécuteur simulé, sans toucher au bureau.
+
+Des plans générés (clics sur des éléments, raccourcis, saisies, pauses) sont exécutés tels quels puis optimisés par
+DryRunExecutor : nombre d'actions (un message et un span de trace chacune dans le bot), durée simulée des événements
+et des pauses (mode "stable" : chaque pause attend au moins SETTLE_QUIET_WINDOW), coût de l'optimisation.
+Les effets (clics et positions, touches, texte, durée totale demandée) sont comparés pour chaque plan.
+
+Usage : python benchmarks/bench_actions.py [--plans 2000] [--length 12] [--quiet-window 0.5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.actions import Capture, Click, DryRunExecutor, Keys, Move, TypeText, Wait, compile_actions, optimize
+
+KEYS = ["enter", "tab", "esc", "down", "ctrl", "a", "c", "v", "s"]
+WORDS = ["bonjour", "rapport mensuel", "notepad", "C:\\Users\\test", "été 2024"]
+
+
+def random_plan(length, rnd):
+    """Plan au format des parseurs du bot (dictionnaires), avec les motifs fréquents dans les réponses de Gemini."""
+    plan = []
+    while len(plan) < length:
+        kind = rnd.random()
+        if kind < 0.35:  # click_element : déplacement puis clic, parfois précédé d'un move_mouse
+            if rnd.random() < 0.3:
+                plan.append({"action": "mouse_move", "x": rnd.randrange(1920), "y": rnd.randrange(1080)})
+            plan.append({"action": "mouse_move", "x": rnd.randrange(1920), "y": rnd.randrange(1080)})
+            plan.append({"action": "mouse_click", "button": "left"})
+        elif kind < 0.6:
+            for _ in range(rnd.randint(1, 3)):
+                plan.append({"action": "keyboard_press", "key": rnd.choice(KEYS)})
+        elif kind < 0.75:
+            plan.append({"action": "keyboard_type", "text": rnd.choice(WORDS)})
+        else:
+            for _ in range(rnd.randint(1, 2)):
+                plan.append({"action": "wait", "seconds": rnd.choice([0.5, 1, 2])})
+    plan.append({"action": "capture_screen"})
+    return plan
+
+
+def run(actions, executor):
+    """Exécute les actions comme _dispatch_command (pauses en mode "stable"). Retourne la durée simulée."""
+    executor.reset()
+    for action in actions:
+        if isinstance(action, Move):
+            executor.move(action.x, action.y)
+        elif isinstance(action, Click):
+            executor.click(action.button, action.x, action.y)
+        elif isinstance(action, Keys):
+            executor.keys(action.strokes)
+        elif isinstance(action, TypeText):
+            executor.type_text(action.text, action.entry)
+        elif isinstance(action, Wait):
+            executor.settle.wait_until_stable(action.seconds)
+    return executor.elapsed
+
+
+def effects(actions):
+    """Effets visibles d'un plan : clics (avec leur position), frappes, texte, et durée de pause demandée entre eux."""
+    position, result, pause = None, [], 0.0
+    for action in actions:
+        if isinstance(action, Wait):
+            pause += action.seconds
+            continue
+        if isinstance(action, Move):
+            position = (action.x, action.y)
+            continue
+        if pause:
+            result.append(("wait", round(pause, 3)))
+            pause = 0.0
+        if isinstance(action, Click):
+            position = (action.x, action.y) if action.x is not None else position
+            result.append(("click", action.button, position))
+        elif isinstance(action, Keys):
+            result.extend(("key", stroke) for stroke in action.strokes)
+        elif isinstance(action, TypeText):
+            result.append(("type", action.text))
+        elif isinstance(action, Capture):
+            result.append(("capture", position))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plans", type=int, default=2000)
+    parser.add_argument("--length", type=int, default=12, help="nombre d'actions par plan")
+    parser.add_argument("--quiet-window", type=float, default=0.5, help="SETTLE_QUIET_WINDOW (s)")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    plans = [random_plan(args.length, rnd) for _ in range(args.plans)]
+    literal = [compile_actions(plan, optimized=False) for plan in plans]
+
+    start = time.perf_counter()
+    optimized = [optimize(actions) for actions in literal]
+    optimize_time = time.perf_counter() - start
+
+    mismatches = sum(effects(a) != effects(b) for a, b in zip(literal, optimized))
+    executor = DryRunExecutor(quiet_window=args.quiet_window)
+    print(f"{len(plans)} plans, optimisation : {optimize_time / len(plans) * 1e6:.1f} µs/plan, "
+          f"effets différents : {mismatches}")
+    print(f"{'plans':<10} {'actions':>8} {'événements':>11} {'durée simulée (s)':>18}")
+    for label, variant in (("tels quels", literal), ("optimisés", optimized)):
+        actions = events = elapsed = 0
+        for plan in variant:
+            elapsed += run(plan, executor)
+            actions += len(plan)
+            events += len(executor.events)
+        print(f"{label:<10} {actions / len(plans):>8.1f} {events / len(plans):>11.1f} {elapsed / len(plans):>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
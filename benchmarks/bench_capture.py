@@ -0,0 +1,84 @@
+"""Compare le temps d'encodage et la taille des captures selon le format, la qualité et la réduction.
+
+Usage : python benchmarks/bench_capture.py [--repeat N] [--synthetic]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from gempcbot.capture import ScreenCapturer, encode_image, resize_to_long_edge
+
+# (format, qualité, taille max du plus grand côté)
+SETTINGS = [
+    ("PNG", None, None),
+    ("PNG", None, 1920),
+    ("PNG", None, 1280),
+    ("JPEG", 85, None),
+    ("JPEG", 85, 1920),
+    ("JPEG", 70, 1280),
+    ("WEBP", 85, None),
+    ("WEBP", 80, 1920),
+    ("WEBP", 70, 1280),
+]
+
+
+def synthetic_screen(width=3840, height=2160, seed=0):
+    """Génère une image ressemblant à un bureau (fenêtres, boutons, texte) pour les machines sans écran."""
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (width, height), (32, 64, 96))
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x1, y1 = rnd.randrange(0, width - 400), rnd.randrange(0, height - 300)
+        x2, y2 = x1 + rnd.randrange(400, 1600), y1 + rnd.randrange(300, 1000)
+        draw.rectangle((x1, y1, x2, y2), fill=(240, 240, 240), outline=(90, 90, 90))
+        draw.rectangle((x1, y1, x2, y1 + 30), fill=(200, 210, 230))
+        for line_y in range(y1 + 40, y2 - 20, 18):
+            words_x = x1 + 10
+            while words_x < x2 - 60:
+                word = "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randrange(2, 9)))
+                draw.text((words_x, line_y), word, fill=(20, 20, 20))
+                words_x += 8 * len(word) + 8
+    draw.rectangle((0, height - 48, width, height), fill=(20, 20, 30))
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="nombre d'encodages par réglage")
+    parser.add_argument("--synthetic", action="store_true", help="utilise une image générée au lieu de l'écran")
+    args = parser.parse_args()
+
+    source = None
+    if not args.synthetic:
+        try:
+            source, _ = ScreenCapturer().grab()
+            print(f"Capture réelle : {source.width}x{source.height}")
+        except Exception as e:
+            print(f"Capture impossible ({e}), utilisation d'une image synthétique.")
+    if source is None:
+        source = synthetic_screen()
+        print(f"Image synthétique : {source.width}x{source.height}")
+
+    print(f"{'format':<6} {'qualité':>7} {'bord max':>8} {'taille envoyée':>15} {'encodage (ms)':>14} {'base64 (Ko)':>12}")
+    for image_format, quality, max_edge in SETTINGS:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            img, _ = resize_to_long_edge(source, max_edge)
+            data, _ = encode_image(img, image_format, quality or 85)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        median_ms = timings[len(timings) // 2] * 1000
+        b64_kb = ((len(data) + 2) // 3 * 4) / 1024
+        print(f"{image_format:<6} {quality or '-':>7} {max_edge or '-':>8} {f'{img.width}x{img.height}':>15} "
+              f"{median_ms:>14.1f} {b64_kb:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare la taille envoyée au modèle de vision (capture entière ou zone modifiée seulement) et le coût
+de la détection des tuiles modifiées, sur des écrans générés où une boîte de dialogue ou un menu apparaît.
+
+Usage : python benchmarks/bench_dirty_regions.py [--format PNG] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from gempcbot.capture import encode_image
+from gempcbot.dirty_regions import REGION, DirtyRegionTracker
+
+SIZES = [(1920, 1080), (2560, 1440), (3840, 2160)]
+
+
+def desktop(size, seed=0):
+    """Génère un bureau : fond, fenêtres avec barres de titre et lignes de texte."""
+    rnd = random.Random(seed)
+    img = Image.new("RGB", size, (40, 90, 140))
+    draw = ImageDraw.Draw(img)
+    width, height = size
+    for _ in range(6):
+        x, y = rnd.randrange(width // 2), rnd.randrange(height // 2)
+        w, h = rnd.randrange(width // 4, width // 2), rnd.randrange(height // 4, height // 2)
+        draw.rectangle((x, y, x + w, y + h), fill="white", outline="black")
+        draw.rectangle((x, y, x + w, y + 24), fill=(200, 200, 220))
+        for line in range(y + 40, y + h - 10, 18):
+            draw.text((x + 10, line), " ".join(rnd.choice(["Fichier", "Édition", "Total", "1234", "Ok"])
+                                               for _ in range(8)), fill="black")
+    draw.rectangle((0, height - 40, width, height), fill=(30, 30, 30))
+    return img
+
+
+def with_change(img, kind):
+    """Ajoute une boîte de dialogue (au centre) ou un menu déroulant (en haut à gauche)."""
+    img = img.copy()
+    draw = ImageDraw.Draw(img)
+    width, height = img.size
+    if kind == "dialogue":
+        x1, y1 = width // 2 - 200, height // 2 - 100
+        draw.rectangle((x1, y1, x1 + 400, y1 + 200), fill=(240, 240, 240), outline="black")
+        draw.text((x1 + 20, y1 + 40), "Voulez-vous enregistrer les modifications ?", fill="black")
+        draw.rectangle((x1 + 280, y1 + 150, x1 + 380, y1 + 180), fill=(200, 200, 200))
+    else:
+        draw.rectangle((10, 30, 250, 330), fill="white", outline="black")
+        for i, text in enumerate(["Nouveau", "Ouvrir", "Enregistrer", "Enregistrer sous", "Quitter"]):
+            draw.text((20, 40 + i * 24), text, fill="black")
+    return img
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--format", default="PNG")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'écran':<10} {'changement':<10} {'entière (Ko)':>12} {'zone (Ko)':>10} {'zone':>11} {'ratio':>6} "
+          f"{'détection (ms)':>15}")
+    for size in SIZES:
+        before = desktop(size)
+        full_bytes = len(encode_image(before, args.format)[0])
+        for kind in ("dialogue", "menu"):
+            after = with_change(before, kind)
+            tracker = DirtyRegionTracker()
+            tracker.update(before, {"elements": []})
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                mode, box, _ = tracker.plan(after)
+            detect_ms = (time.perf_counter() - start) / args.repeat * 1000
+            if mode == REGION:
+                region_bytes = len(encode_image(after.crop(box), args.format)[0])
+                region = f"{box[2] - box[0]}x{box[3] - box[1]}"
+            else:
+                region_bytes, region = full_bytes, mode
+            print(f"{size[0]}x{size[1]:<5} {kind:<10} {full_bytes / 1024:>12.0f} {region_bytes / 1024:>10.0f} "
+                  f"{region:>11} {region_bytes / full_bytes:>6.0%} {detect_ms:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
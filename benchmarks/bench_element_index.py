@@ -0,0 +1,93 @@
+"""Mesure la recherche d'éléments (texte et position) sur des écrans denses générés
+(tableur, IDE), comparée à l'ancien parcours linéaire par sous-chaîne.
+
+Usage : python benchmarks/bench_element_index.py [--elements 2000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.element_index import ElementIndex
+
+MENU = ["Fichier", "Édition", "Affichage", "Insertion", "Format", "Outils", "Données", "Fenêtre", "Aide",
+        "Enregistrer", "Enregistrer sous", "Ouvrir", "Fermer", "Rechercher", "Remplacer", "Exécuter", "Déboguer"]
+
+
+def spreadsheet_elements(count, seed=0):
+    """Génère un écran de tableur : menus, cellules avec valeurs et en-têtes."""
+    rnd = random.Random(seed)
+    elements = [{"type": "menu", "text": text, "bounding_box": {"x1": 10 + 90 * i, "y1": 5, "x2": 90 + 90 * i, "y2": 25}}
+                for i, text in enumerate(MENU)]
+    columns = 26
+    for n in range(count - len(elements)):
+        row, col = divmod(n, columns)
+        x1, y1 = 40 + col * 72, 60 + row * 20
+        text = rnd.choice([f"{chr(65 + col)}{row + 1}", f"{rnd.randrange(100000)}", f"Total {rnd.choice(MENU)}"])
+        elements.append({"type": "cell", "text": text,
+                         "bounding_box": {"x1": x1, "y1": y1, "x2": x1 + 70, "y2": y1 + 18}})
+    return elements
+
+
+def linear_find(elements, label):
+    """Ancienne recherche : premier élément dont le texte contient label."""
+    for element in elements:
+        if element and "text" in element and label in element["text"]:
+            return element
+    return None
+
+
+def linear_hit_test(elements, x, y):
+    """Recherche par position sans index."""
+    hits = [e for e in elements if e["bounding_box"]["x1"] <= x <= e["bounding_box"]["x2"]
+            and e["bounding_box"]["y1"] <= y <= e["bounding_box"]["y2"]]
+    return hits[0] if hits else None
+
+
+def timed(fn, args_list):
+    start = time.perf_counter()
+    results = [fn(*args) for args in args_list]
+    return (time.perf_counter() - start) / len(args_list) * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--elements", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    elements = spreadsheet_elements(args.elements)
+    start = time.perf_counter()
+    index = ElementIndex(elements)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"{len(elements)} éléments, index construit en {build_ms:.1f} ms")
+
+    # Requêtes sur les menus avec variantes (casse, accents, faute de frappe), la bonne cible est connue
+    variants = [("Édition", "edition"), ("Enregistrer sous", "enregistrer sous"), ("Exécuter", "Executer"),
+                ("Affichage", "Afichage"), ("Données", "DONNEES"), ("Rechercher", "Rechercher")]
+    menu_by_text = {e["text"]: e for e in elements[:len(MENU)]}
+    queries = [rnd.choice(variants) for _ in range(args.queries)]
+
+    index_us, index_results = timed(index.find, [(query,) for _, query in queries])
+    linear_us, linear_results = timed(linear_find, [(elements, query) for _, query in queries])
+    index_ok = sum(result is menu_by_text[target] for (target, _), result in zip(queries, index_results))
+    linear_ok = sum(result is menu_by_text[target] for (target, _), result in zip(queries, linear_results))
+
+    points = [(rnd.uniform(0, 1900), rnd.uniform(0, 1500)) for _ in range(args.queries)]
+    hit_us, hit_results = timed(index.element_at, points)
+    linear_hit_us, linear_hit_results = timed(linear_hit_test, [(elements, x, y) for x, y in points])
+    hits_agree = sum((a is None) == (b is None) for a, b in zip(hit_results, linear_hit_results))
+
+    print(f"{'recherche':<22} {'µs/requête':>11} {'bonne cible':>12}")
+    print(f"{'texte (index)':<22} {index_us:>11.1f} {index_ok / len(queries):>11.0%}")
+    print(f"{'texte (linéaire)':<22} {linear_us:>11.1f} {linear_ok / len(queries):>11.0%}")
+    print(f"{'position (grille)':<22} {hit_us:>11.1f} {hits_agree / len(points):>11.0%}")
+    print(f"{'position (linéaire)':<22} {linear_hit_us:>11.1f} {'-':>12}")
+
+
+if __name__ == "__main__":
+    main()
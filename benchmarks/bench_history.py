@@ -0,0 +1,70 @@
+"""Mesure le coût de l'historique des étapes sur une longue session : durée d'enregistrement d'une étape (sur le chemin
+critique), mémoire gardée comparée à l'ancien historique (captures PNG complètes en base64), place sur le disque
+et taille du résumé envoyé au modèle.
+
+Usage : python benchmarks/bench_history.py [--steps 300] [--size 1920x1080] [--max-steps 50]
+"""
+import argparse
+import base64
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import ImageDraw
+
+from bench_dirty_regions import desktop
+
+from gempcbot.capture import encode_image
+from gempcbot.history import ScreenHistory
+from gempcbot.prompts import estimate_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--size", default="1920x1080")
+    parser.add_argument("--max-steps", type=int, default=50)
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.split("x"))
+
+    base = desktop(size)
+    directory = tempfile.mkdtemp(prefix="bench_history_")
+    history = ScreenHistory(directory, args.max_steps, max_frames=args.steps)
+    durations = []
+    legacy_bytes = 0  # Ancien historique : une chaîne base64 de la capture PNG par étape, jamais libérée
+    actions = [{"action": "mouse_move", "x": 100, "y": 200}, {"action": "mouse_click", "button": "left"}]
+    try:
+        for step in range(args.steps):
+            img = base.copy()
+            if step % 3:  # Deux étapes sur trois, l'écran a changé (une sur trois, la capture est déjà sur le disque)
+                ImageDraw.Draw(img).rectangle((20 + step, 20, 220 + step, 120), fill=(step % 256, 80, 80))
+            start = time.perf_counter()
+            history.record("ouvre le bloc-notes et écris bonjour", img, actions, "écran modifié comme attendu")
+            durations.append(time.perf_counter() - start)
+            if step < 10:
+                legacy_bytes += len(base64.b64encode(encode_image(img, "PNG")[0]))
+        legacy_bytes = legacy_bytes * args.steps // min(10, args.steps)  # Extrapolé depuis les 10 premières étapes
+        history.flush()
+        stats = history.stats()
+        disk = sum(entry.stat().st_size for sub in os.scandir(directory) for entry in os.scandir(sub.path))
+        summary = history.summary(5)
+        print(f"{args.steps} étapes {size[0]}x{size[1]}, {args.max_steps} gardées en mémoire")
+        print(f"enregistrement d'une étape : médiane {statistics.median(durations) * 1000:.1f} ms, "
+              f"max {max(durations) * 1000:.1f} ms")
+        print(f"mémoire : {stats['thumbnail_bytes'] / 1024:.0f} Ko de vignettes "
+              f"(ancien historique : {legacy_bytes / 1024 / 1024:.0f} Mo)")
+        print(f"disque : {stats['frames_written']} captures écrites, {stats['frames_deduplicated']} déjà présentes, "
+              f"{disk / 1024 / 1024:.1f} Mo")
+        print(f"résumé des 5 dernières étapes : {len(summary)} caractères, ~{estimate_tokens(summary)} tokens")
+    finally:
+        history.close()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare l'ancien affichage des messages (insert + see pour chaque message, depuis le thread de travail)
+au TkSink (file d'attente, insertion par lots, nombre de lignes borné).
+
+Mesure la durée jusqu'à l'affichage du dernier message, la mémoire (RSS) et la réactivité de
+l'interface (retard maximal d'un callback Tk programmé toutes les 20 ms).
+Nécessite un affichage (ou xvfb-run).
+
+Usage : python benchmarks/bench_log_sink.py [--lines 100000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tkinter as tk
+from tkinter import scrolledtext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.events import TkSink
+
+HEARTBEAT_MS = 20
+
+
+def rss_mb():
+    """Mémoire résidente du processus en Mo (Linux), ou pic mémoire ailleurs."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def run_mode(mode, line_count):
+    """Lance une mesure dans le processus courant et retourne les résultats."""
+    root = tk.Tk()
+    output_text = scrolledtext.ScrolledText(root, wrap=tk.WORD)
+    output_text.pack(fill=tk.BOTH, expand=True)
+    label = tk.Label(root)
+    button = tk.Button(root)
+    sink = TkSink(root, output_text, label, button, button) if mode == "sink" else None
+    message = "Executing command: {'action': 'mouse_move', 'x': 1234, 'y': 567} " * 2
+    results = {"mode": mode, "lines": line_count, "rss_before_mb": rss_mb()}
+    lateness = []
+    done = threading.Event()
+    start = time.perf_counter()
+
+    def heartbeat(expected):
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected))
+        if not results.get("elapsed_s"):
+            root.after(HEARTBEAT_MS, heartbeat, now + HEARTBEAT_MS / 1000)
+
+    def producer():
+        for i in range(line_count):
+            if sink is not None:
+                sink.emit("log", message=f"{i} {message}")
+            else:
+                output_text.insert(tk.END, f"{i} {message}\n")
+                output_text.see(tk.END)
+        done.set()
+
+    def check_finished():
+        last_line = output_text.get("end-2l", "end-1c")
+        if done.is_set() and last_line.startswith(f"{line_count - 1} "):
+            results["elapsed_s"] = time.perf_counter() - start
+            results["rss_after_mb"] = rss_mb()
+            results["widget_lines"] = int(output_text.index("end-1c").split(".")[0])
+            root.after(50, root.destroy)
+        else:
+            root.after(10, check_finished)
+
+    root.after(0, heartbeat, time.perf_counter())
+    root.after(0, lambda: threading.Thread(target=producer, daemon=True).start())
+    root.after(10, check_finished)
+    root.mainloop()
+    lateness.sort()
+    results["heartbeat_p95_ms"] = lateness[int(len(lateness) * 0.95)] * 1000 if lateness else 0.0
+    results["heartbeat_max_ms"] = lateness[-1] * 1000 if lateness else 0.0
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--mode", choices=["direct", "sink"], help="mesure un seul mode (utilisé en interne)")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.lines)))
+        return
+
+    # Chaque mode dans son propre processus pour que la mesure mémoire soit comparable
+    rows = []
+    for mode in ("direct", "sink"):
+        output = subprocess.run([sys.executable, __file__, "--mode", mode, "--lines", str(args.lines)],
+                                capture_output=True, text=True, check=True).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+    print(f"{'mode':<7} {'lignes':>8} {'durée (s)':>10} {'RSS +Mo':>8} {'lignes widget':>14} "
+          f"{'retard p95 (ms)':>16} {'retard max (ms)':>16}")
+    for row in rows:
+        print(f"{row['mode']:<7} {row['lines']:>8} {row['elapsed_s']:>10.2f} "
+              f"{row['rss_after_mb'] - row['rss_before_mb']:>8.1f} {row['widget_lines']:>14} "
+              f"{row['heartbeat_p95_ms']:>16.1f} {row['heartbeat_max_ms']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Mesure la durée d'une itération de la boucle de nouvelles tentatives (capture, vision, vérification, nouveau plan)
+avec la vérification séquentielle (vision puis vérification) et avec la vérification en parallèle de la vision.
+
+Les modèles sont simulés (latence fixe par étape, la vérification signale toujours un échec) ; la capture est réelle,
+lancez-le sur un bureau de test ou sous Xvfb (xvfb-run python benchmarks/bench_pipeline.py).
+
+Usage : python benchmarks/bench_pipeline.py [--retries 5] [--vision 1.5] [--verification 0.8] [--planning 2.0]
+"""
+import argparse
+import json
+import time
+
+from _bot import RecordingSink, load_bot_module
+
+from gempcbot.backends import TextResponse
+from gempcbot.prompts import PLANNING_SYSTEM_INSTRUCTION, VERIFICATION_SYSTEM_INSTRUCTION
+from gempcbot.routing import ModelRouter
+
+
+class SimulatedBackend:
+    """Répond selon l'étape (reconnue à son system_instruction) après une latence fixe."""
+
+    def __init__(self, latencies):
+        self.latencies = latencies
+
+    def generate_content(self, contents, system_instruction=None, **kwargs):
+        if system_instruction == VERIFICATION_SYSTEM_INSTRUCTION:
+            time.sleep(self.latencies["verification"])
+            return TextResponse("Le bouton n'a pas été cliqué.")
+        if system_instruction == PLANNING_SYSTEM_INSTRUCTION:
+            time.sleep(self.latencies["planning"])
+            return TextResponse("capture_screen")
+        time.sleep(self.latencies["vision"])
+        return TextResponse(json.dumps({"elements": [
+            {"type": "button", "text": "OK", "bounding_box": {"x1": 10, "y1": 10, "x2": 50, "y2": 30}}]}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--vision", type=float, default=1.5)
+    parser.add_argument("--verification", type=float, default=0.8)
+    parser.add_argument("--planning", type=float, default=2.0)
+    args = parser.parse_args()
+
+    bot = load_bot_module()
+    bot.MAX_RETRIES = args.retries
+    latencies = {"vision": args.vision, "verification": args.verification, "planning": args.planning}
+    print(f"{'vérification':<12} {'itérations':>10} {'durée (s)':>10} {'s/itération':>12}")
+    for parallel in (False, True):
+        bot.PARALLEL_VERIFICATION = parallel
+        automator = bot.TaskAutomator("hors-ligne", RecordingSink())  # Pas d'appel à l'API Gemini
+        automator.router = ModelRouter(lambda name: SimulatedBackend(latencies), "simulé")
+        automator.vision_cache = None  # L'écran change entre deux tentatives : pas de réutilisation de la vision
+        automator.plan_cache = None
+        automator.current_instruction = "clique sur OK"
+        start = time.perf_counter()
+        automator.execute_actions([{"action": "capture_screen"}])
+        elapsed = time.perf_counter() - start
+        iterations = args.retries + 1
+        print(f"{'parallèle' if parallel else 'séquentielle':<12} {iterations:>10} {elapsed:>10.2f} "
+              f"{elapsed / iterations:>12.2f}")
+        automator.pipeline.shutdown()
+
+
+if __name__ == "__main__":
+    main()
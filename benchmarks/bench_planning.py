@@ -0,0 +1,54 @@
+"""Compare la latence et le résultat des modes de planification "two_pass" et "fused".
+
+Chaque capture (fichier image) est planifiée avec chaque mode, sans exécuter les actions.
+
+Usage : python benchmarks/bench_planning.py "ouvre la calculatrice" capture1.png [capture2.png ...] [--repeat N]
+"""
+import argparse
+import time
+
+from _bot import make_automator
+
+from PIL import Image
+
+from gempcbot.capture import CapturedFrame, encode_image
+
+MODES = ["two_pass", "fused"]
+
+
+def load_frame(path):
+    """Charge une image du disque sous forme de CapturedFrame."""
+    img = Image.open(path).convert("RGB")
+    data, mime_type = encode_image(img, "PNG")
+    return CapturedFrame(img, data, mime_type, 1.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("instruction")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = [load_frame(path) for path in args.images]
+    print(f"{'mode':<9} {'image':<24} {'médiane (s)':>11} {'min (s)':>8} {'nb actions':>10}")
+    for mode in MODES:
+        automator = make_automator(planning_mode=mode)
+        automator.vision_cache = None  # Chaque essai doit payer l'appel au modèle
+        automator.current_instruction = args.instruction
+        for path, frame in zip(args.images, frames):
+            automator.last_frame = frame
+            timings, counts = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                actions = automator._parse_instruction(args.instruction, frame)
+                timings.append(time.perf_counter() - start)
+                counts.append(len(actions))
+            timings.sort()
+            print(f"{mode:<9} {path[-24:]:<24} {timings[len(timings) // 2]:>11.2f} {timings[0]:>8.2f} "
+                  f"{'/'.join(str(c) for c in counts):>10}")
+        print(f"Dernières actions ({mode}): {actions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare la taille des prompts de planification : ancien format (consignes + repr du dict de vision)
+et nouveau format (tableau compact, éléments réduits aux plus pertinents pour un budget de tokens).
+
+Vérifie aussi que l'élément visé par l'instruction reste dans le prompt après réduction.
+
+Usage : python benchmarks/bench_prompts.py [--elements 2000] [--budget 1500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_element_index import MENU, spreadsheet_elements
+from gempcbot.prompts import PLANNING_SYSTEM_INSTRUCTION, build_planning_prompt, estimate_tokens
+
+INSTRUCTIONS = [("Clique sur le menu Enregistrer sous", "Enregistrer sous"), ("Ouvre le menu Affichage", "Affichage"),
+                ("Lance l'exécution avec le menu Exécuter", "Exécuter"), ("Cherche dans Rechercher", "Rechercher")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--elements", type=int, default=2000)
+    parser.add_argument("--budget", type=int, default=1500)
+    args = parser.parse_args()
+
+    vision_data = {"elements": spreadsheet_elements(args.elements)}
+    print(f"{len(vision_data['elements'])} éléments, consignes fixes : {estimate_tokens(PLANNING_SYSTEM_INSTRUCTION)} tokens "
+          f"(envoyées en system_instruction)")
+    print(f"{'format':<22} {'tokens':>8} {'éléments':>9} {'construction (ms)':>18} {'cible gardée':>13}")
+    for label, budget in (("repr (ancien)", "repr"), ("compact", None), (f"compact, budget {args.budget}", args.budget)):
+        tokens, kept_counts, found = [], [], 0
+        start = time.perf_counter()
+        for instruction, target in INSTRUCTIONS:
+            if budget == "repr":
+                prompt = PLANNING_SYSTEM_INSTRUCTION + f"Voici l'instruction: {instruction}\n{vision_data}"
+                kept = len(vision_data["elements"])
+            else:
+                prompt, kept, _ = build_planning_prompt(instruction, vision_data, token_budget=budget)
+            tokens.append(estimate_tokens(prompt))
+            kept_counts.append(kept)
+            found += f"|{target}|" in prompt or repr(target) in prompt
+        build_ms = (time.perf_counter() - start) / len(INSTRUCTIONS) * 1000
+        print(f"{label:<22} {sum(tokens) // len(tokens):>8} {sum(kept_counts) // len(kept_counts):>9} "
+              f"{build_ms:>18.1f} {found / len(INSTRUCTIONS):>12.0%}")
+    print(f"(menus de l'écran : {len(MENU)} ; tokens estimés à 4 caractères par token)")
+
+
+if __name__ == "__main__":
+    main()
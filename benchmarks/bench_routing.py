@@ -0,0 +1,91 @@
+"""Compare un seul modèle pour toutes les étapes au routage par étape (petit modèle pour la vision et la vérification),
+avec des modèles simulés (latence, taux d'erreur et tokens choisis), sans réseau.
+
+Les durées affichées sont ramenées à l'échelle réelle des modèles simulés.
+Le scénario "lent" dégrade le modèle de planification à mi-parcours pour montrer le repli sur le p95.
+
+Usage : python benchmarks/bench_routing.py [--tasks 50] [--scale 0.01]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.backends import TextResponse
+from gempcbot.routing import ModelRouter, format_router_stats
+
+# Latence moyenne (s) et taux d'erreur de chaque modèle simulé
+PROFILES = {
+    "gemini-1.5-pro": (6.0, 0.02),
+    "gemini-1.5-flash": (2.0, 0.02),
+    "gemini-1.5-flash-8b": (1.0, 0.02),
+}
+# Tokens (prompt, réponse) de chaque étape
+STAGE_TOKENS = {"vision": (1800, 900), "planning": (2500, 150), "verification": (800, 30)}
+
+
+class SimulatedBackend:
+    def __init__(self, model_name, scale, rnd, slow_after=None):
+        self.model_name = model_name
+        self.scale = scale  # Facteur appliqué aux latences pour que le benchmark reste court
+        self.rnd = rnd
+        self.slow_after = slow_after  # Nombre d'appels après lequel le modèle devient 4x plus lent
+        self.calls = 0
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        latency, error_rate = PROFILES[self.model_name]
+        if self.slow_after is not None and self.calls > self.slow_after:
+            latency *= 4
+        time.sleep(self.rnd.expovariate(1 / latency) * self.scale)
+        if self.rnd.random() < error_rate:
+            raise RuntimeError("503 simulé")
+        return TextResponse("ok")
+
+
+def run(label, routes, fallbacks, threshold, tasks, scale, slow_model=None):
+    rnd = random.Random(0)
+    router = ModelRouter(lambda name: SimulatedBackend(name, scale, rnd, tasks // 2 if name == slow_model else None),
+                         "gemini-1.5-pro", routes, fallbacks, threshold * scale if threshold else None)
+    start = time.perf_counter()
+    failures = 0
+    for _ in range(tasks):
+        # Une tâche : vision, planification, vision de contrôle puis vérification
+        for stage in ("vision", "planning", "vision", "verification"):
+            try:
+                _, model_name = router.generate_content(stage, ["prompt"])
+            except RuntimeError:
+                failures += 1
+                continue
+            router.record_usage(stage, model_name, *STAGE_TOKENS[stage])
+    elapsed = (time.perf_counter() - start) / scale
+    stats = router.stats()
+    for row in stats.values():
+        row["p50"] /= scale
+        row["p95"] /= scale
+    cost = sum(row["cost"] for row in stats.values())
+    print(f"\n== {label} : {elapsed / tasks:.1f} s/tâche (temps simulé), coût {cost / tasks * 1000:.3f} $ / 1000 tâches, "
+          f"{failures} appels en échec")
+    print(format_router_stats(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    routes = {"vision": "gemini-1.5-flash-8b", "verification": "gemini-1.5-flash-8b"}
+    fallbacks = {"vision": "gemini-1.5-flash", "planning": "gemini-1.5-flash", "verification": "gemini-1.5-flash"}
+    run("un seul modèle", {}, {}, None, args.tasks, args.scale)
+    run("routage par étape", routes, fallbacks, None, args.tasks, args.scale)
+    run("routage, planification lente", routes, fallbacks, None, args.tasks, args.scale, slow_model="gemini-1.5-pro")
+    run("routage + repli p95 > 30 s, planification lente", routes, fallbacks, 30.0, args.tasks, args.scale,
+        slow_model="gemini-1.5-pro")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Mesure le débit d'appels au modèle sous charge continue, face à un faux point d'accès qui applique un quota.
+
+Le serveur HTTP local accepte --quota requêtes par fenêtre glissante de --window secondes, et répond 429 (avec
+Retry-After) au-delà ; il répond aussi 503 à une proportion --errors des requêtes et ajoute --latency secondes.
+--workers threads enchaînent les appels pendant --duration secondes (comme des sessions en parallèle), via
+ModelRouter et HttpBackend, dans trois configurations :
+- "direct" : sans planificateur (une erreur fait échouer l'appel, comme avant) ;
+- "tentatives" : nouvelles tentatives avec attente exponentielle, sans limiteur ;
+- "planifié" : nouvelles tentatives et limiteur réglé sur le quota.
+Le plafond est quota / window requêtes réussies par seconde.
+
+Usage : python benchmarks/bench_scheduler.py [--workers 8] [--quota 20] [--window 5] [--duration 20]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.backends import HttpBackend
+from gempcbot.routing import ModelRouter
+from gempcbot.scheduler import RequestScheduler, format_scheduler_stats
+
+MODEL = "modele-simule"
+
+
+def make_handler(state):
+    """Handler du faux point d'accès : quota par fenêtre glissante, erreurs 503 et latence."""
+
+    class QuotaHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            now = time.monotonic()
+            with state["lock"]:
+                accepted = state["accepted"]
+                while accepted and accepted[0] <= now - state["window"]:
+                    accepted.popleft()
+                if len(accepted) >= state["quota"]:
+                    state["429"] += 1
+                    retry_after = accepted[0] + state["window"] - now
+                    status = 429
+                elif state["rng"].random() < state["errors"]:
+                    state["503"] += 1
+                    status = 503
+                else:
+                    accepted.append(now)
+                    status = 200
+            if status == 429:
+                self.send_response(429)
+                self.send_header("Retry-After", f"{math.ceil(retry_after * 10) / 10:.1f}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            time.sleep(state["latency"])
+            if status == 503:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = json.dumps({"text": "ok"}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QuotaHandler
+
+
+def run(router, workers, duration):
+    """Enchaîne les appels dans workers threads pendant duration secondes. Retourne (réussis, échoués, durée)."""
+    counts = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+    end = time.monotonic() + duration
+
+    def worker():
+        while time.monotonic() < end:
+            try:
+                router.generate_content("planning", ["instruction"])
+                outcome = "ok"
+            except Exception:
+                outcome = "failed"
+                time.sleep(0.05)  # Le bot passe à la tâche suivante après un échec
+            with lock:
+                counts[outcome] += 1
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["ok"], counts["failed"], time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--quota", type=int, default=20, help="requêtes acceptées par fenêtre")
+    parser.add_argument("--window", type=float, default=5.0, help="durée de la fenêtre du quota (s)")
+    parser.add_argument("--errors", type=float, default=0.05, help="proportion de réponses 503")
+    parser.add_argument("--latency", type=float, default=0.1, help="latence de chaque réponse (s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="durée de chaque configuration (s)")
+    parser.add_argument("--verbose", action="store_true", help="affiche les compteurs du planificateur")
+    args = parser.parse_args()
+
+    state = {"lock": threading.Lock(), "accepted": deque(), "quota": args.quota, "window": args.window,
+             "errors": args.errors, "latency": args.latency, "rng": random.Random(0), "429": 0, "503": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    ceiling = args.quota / args.window
+
+    configurations = {
+        "direct": None,
+        "tentatives": RequestScheduler({}, max_attempts=6, base_delay=0.2, deadline=30),
+        "planifié": RequestScheduler({MODEL: (args.quota, None)}, max_attempts=6, base_delay=0.2, deadline=30,
+                                     period=args.window),
+    }
+    print(f"plafond : {ceiling:.1f} requêtes/s ({args.quota} par {args.window:g} s), {args.workers} threads, "
+          f"{args.errors:.0%} de 503")
+    print(f"{'configuration':<13} {'réussis/s':>10} {'% plafond':>10} {'échecs':>7} {'429 reçus':>10} {'503 reçus':>10}")
+    for label, scheduler in configurations.items():
+        time.sleep(args.window)  # Fenêtre du quota vide entre deux configurations
+        with state["lock"]:
+            state["accepted"].clear()
+            state["429"] = state["503"] = 0
+        router = ModelRouter(lambda model_name: HttpBackend(url, model_name), MODEL, scheduler=scheduler)
+        ok, failed, elapsed = run(router, args.workers, args.duration)
+        print(f"{label:<13} {ok / elapsed:>10.2f} {ok / elapsed / ceiling:>10.0%} {failed:>7} {state['429']:>10} "
+              f"{state['503']:>10}")
+        if scheduler is not None and args.verbose:
+            print(format_scheduler_stats(scheduler.stats()))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Mesure le débit (tâches par minute) de SessionPool selon le nombre de sessions, chacune sur son écran Xvfb.
+
+Le modèle est simulé par un serveur HTTP local (MODEL_BACKEND = "http") qui répond après une latence fixe :
+la vision ne trouve aucun élément, le plan appuie sur Entrée puis prend une capture, la vérification réussit.
+Les caches et la vérification locale sont désactivés pour que chaque tâche fasse les mêmes appels.
+Nécessite Xvfb (paquet xvfb).
+
+Usage : python benchmarks/bench_sessions.py [--sessions 1 2 4] [--tasks 16] [--latency 0.5]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.prompts import PLANNING_SYSTEM_INSTRUCTION, VERIFICATION_SYSTEM_INSTRUCTION
+from gempcbot.sessions import SessionPool, format_report
+
+
+def make_handler(latency, counter):
+    """Handler du faux modèle : répond selon l'étape, reconnue à son system_instruction."""
+
+    class MockModelHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+            time.sleep(latency)
+            if request.get("system_instruction") == PLANNING_SYSTEM_INSTRUCTION:
+                text = "press_key enter\ncapture_screen"
+            elif request.get("system_instruction") == VERIFICATION_SYSTEM_INSTRUCTION:
+                text = ""
+            else:
+                text = json.dumps({"elements": []})
+            with counter["lock"]:
+                counter["requests"] += 1
+            data = json.dumps({"text": text}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockModelHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--tasks", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="latence de chaque appel au modèle (s)")
+    parser.add_argument("--verbose", action="store_true", help="affiche le rapport complet de chaque série")
+    args = parser.parse_args()
+
+    counter = {"requests": 0, "lock": threading.Lock()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, counter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    options = {"overrides": {
+        "MODEL_BACKEND": "http",
+        "STANDIN_URL": f"http://127.0.0.1:{server.server_address[1]}/",
+        "TRACE_DIR": None,
+        "HISTORY_DIR": None,
+        "PLAN_CACHE_FILE": None,
+        "VISION_CACHE_SIZE": 0,
+        "DIRTY_REGION_TILE": None,
+        "LOCAL_CHECK": False,
+        "MAX_RETRIES": 0,
+    }}
+    instructions = [f"tâche {i}" for i in range(args.tasks)]
+
+    print(f"{'sessions':>8} {'tâches':>7} {'réussies':>9} {'durée (s)':>10} {'tâches/min':>11} {'appels':>7}")
+    for sessions in args.sessions:
+        counter["requests"] = 0
+        report = SessionPool(sessions, options).run(instructions)
+        tasks = report["tasks"]
+        print(f"{sessions:>8} {len(tasks):>7} {sum(task['success'] for task in tasks):>9} {report['duration']:>10.1f} "
+              f"{len(tasks) / report['duration'] * 60:>11.1f} {counter['requests']:>7}")
+        if args.verbose or report["errors"]:
+            print(format_report(report))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
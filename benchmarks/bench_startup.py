@@ -0,0 +1,93 @@
+"""Mesure le temps d'import de gemini-pc-bot.py et la latence de la première tâche, avec et sans préchauffage.
+
+Chaque mesure se fait dans un nouveau processus (imports à froid). Le modèle est simulé par un serveur HTTP local
+(latence fixe par appel) ; la capture est réelle, lancez-le sur un bureau de test ou sous Xvfb
+(xvfb-run python benchmarks/bench_startup.py). "première tâche" est le délai entre l'envoi de l'instruction
+et l'appel de planification ; avec le préchauffage, l'utilisateur met --typing secondes à taper son instruction.
+
+Usage : python benchmarks/bench_startup.py [--repeat 3] [--latency 1.0] [--typing 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+HEAVY_MODULES = ("google.generativeai", "speech_recognition", "ttkthemes", "mss", "pyperclip", "PIL")
+
+
+def child(mode, url, typing):
+    """Mesure dans le processus courant (lancé par main) et écrit le résultat en JSON sur la sortie standard."""
+    start = time.perf_counter()
+    from _bot import RecordingSink, load_bot_module
+
+    bot = load_bot_module()
+    imported = time.perf_counter() - start
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    if mode == "import":
+        print(json.dumps({"import": imported, "heavy": heavy}))
+        return
+    bot.MODEL_BACKEND = "http"
+    bot.STANDIN_URL = url
+    bot.TRACE_DIR = bot.HISTORY_DIR = bot.PLAN_CACHE_FILE = None
+    bot.LOCAL_CHECK = False
+    automator = bot.TaskAutomator("hors-ligne", RecordingSink())
+    if mode == "warm":
+        automator.warm_up_async()
+        time.sleep(typing)  # L'utilisateur tape sa première instruction
+    first_call = []
+    generate_content = automator.router.generate_content
+
+    def timed(stage, contents, **kwargs):
+        if stage == "planning" and not first_call:
+            first_call.append(time.perf_counter())
+        return generate_content(stage, contents, **kwargs)
+
+    automator.router.generate_content = timed
+    sent = time.perf_counter()
+    automator.run_blocking("appuie sur entrée")
+    automator.pipeline.shutdown()
+    print(json.dumps({"import": imported, "heavy": heavy, "first_request": first_call[0] - sent if first_call else None}))
+
+
+def run_child(mode, url, typing):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--url", url,
+                             "--typing", str(typing)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=1.0, help="latence de chaque appel au modèle (s)")
+    parser.add_argument("--typing", type=float, default=3.0, help="temps de saisie de la première instruction (s)")
+    parser.add_argument("--child", choices=("import", "cold", "warm"), help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.url, args.typing)
+        return
+
+    from bench_sessions import make_handler
+
+    counter = {"requests": 0, "lock": threading.Lock()}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency, counter))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    imports = [run_child("import", url, 0) for _ in range(args.repeat)]
+    print(f"import de gemini-pc-bot.py : médiane {statistics.median(r['import'] for r in imports):.3f} s, "
+          f"modules lourds chargés : {', '.join(imports[0]['heavy']) or 'aucun'}")
+    print(f"{'mode':<6} {'première tâche (s)':>19}")
+    for mode in ("cold", "warm"):
+        results = [run_child(mode, url, args.typing)["first_request"] for _ in range(args.repeat)]
+        print(f"{mode:<6} {statistics.median(results):>19.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
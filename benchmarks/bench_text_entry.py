@@ -0,0 +1,102 @@
+"""Mesure le débit (caractères/seconde) de chaque stratégie de saisie de texte dans un widget Tk local.
+
+Le benchmark tape réellement au clavier : lancez-le sur un bureau de test ou sous Xvfb
+(xvfb-run python benchmarks/bench_text_entry.py) et ne touchez pas au clavier pendant la mesure.
+
+Usage : python benchmarks/bench_text_entry.py [--length 2000] [--per-char-length 300]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pynput.keyboard import Key, Controller as KeyboardController
+
+from gempcbot.text_entry import STRATEGIES, TextEntryEngine
+
+WORDS = ["automatisation", "interface", "fenêtre", "bouton", "clavier", "souris", "écran", "texte", "Gemini", "été"]
+
+
+def sample_text(length, seed=0):
+    """Génère un paragraphe de test (accents et retours à la ligne compris)."""
+    rnd = random.Random(seed)
+    parts = []
+    size = 0
+    while size < length:
+        word = rnd.choice(WORDS)
+        sep = "\n" if rnd.random() < 0.05 else " "
+        parts.append(word + sep)
+        size += len(word) + 1
+    return "".join(parts)[:length]
+
+
+class Bench:
+    """Pilote le widget Tk depuis le thread principal pendant qu'un thread tape le texte."""
+
+    def __init__(self, root, widget, engine, texts):
+        self.root = root
+        self.widget = widget
+        self.engine = engine
+        self.texts = texts
+        self.results = []
+        self._ready = threading.Event()
+        self._content = ""
+
+    def _reset(self):
+        self.widget.delete("1.0", tk.END)
+        self.widget.focus_force()
+        self._ready.set()
+
+    def _poll(self):
+        self._content = self.widget.get("1.0", "end-1c")
+        self.root.after(10, self._poll)
+
+    def run(self):
+        for strategy in STRATEGIES:
+            text = self.texts[strategy]
+            self._ready.clear()
+            self.root.after(0, self._reset)
+            self._ready.wait()
+            time.sleep(0.3)
+            start = time.perf_counter()
+            self.engine.type_text(text, strategy)
+            deadline = time.monotonic() + 30
+            while len(self._content) < len(text) and time.monotonic() < deadline:
+                time.sleep(0.005)
+            elapsed = time.perf_counter() - start
+            self.results.append((strategy, len(text), elapsed, self._content == text))
+        self.root.after(0, self.root.destroy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--length", type=int, default=2000, help="longueur du texte (clipboard et chunked)")
+    parser.add_argument("--per-char-length", type=int, default=300, help="longueur du texte en mode per_char")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    root.title("bench_text_entry")
+    widget = tk.Text(root, width=100, height=30)
+    widget.pack()
+    keyboard = KeyboardController()
+    engine = TextEntryEngine(keyboard, Key.cmd if sys.platform == "darwin" else Key.ctrl_l)
+    text = sample_text(args.length)
+    texts = {"clipboard": text, "chunked": text, "per_char": text[:args.per_char_length]}
+
+    bench = Bench(root, widget, engine, texts)
+    root.after(10, bench._poll)
+    root.after(500, lambda: threading.Thread(target=bench.run, daemon=True).start())
+    root.mainloop()
+
+    print(f"{'stratégie':<10} {'caractères':>10} {'durée (s)':>10} {'car./s':>10} {'exact':>6}")
+    for strategy, length, elapsed, exact in bench.results:
+        print(f"{strategy:<10} {length:>10} {elapsed:>10.2f} {length / elapsed:>10.0f} {'oui' if exact else 'non':>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Compare le délai entre la fin de la parole et le texte reconnu selon le moteur de reconnaissance vocale,
+sur des enregistrements WAV (mono, 16 bits).
+
+Chaque fichier passe dans le détecteur de parole (VadSegmenter) comme s'il venait du micro, puis la phrase détectée
+est envoyée à chaque moteur. Délai = silence de fin de phrase (VOICE_END_SILENCE_MS) + durée de la reconnaissance.
+À comparer avec l'ancienne écoute (speech_recognition, pause_threshold de 0,8 s). Un fichier .txt de même nom
+donne le texte attendu. Sans --fixtures, des fichiers synthétiques (bruit modulé, pas de vraie parole) mesurent
+seulement la détection et le coût des moteurs.
+
+Usage : python benchmarks/bench_voice.py [--fixtures dossier] [--backends google sphinx vosk] [--vosk-model chemin]
+"""
+import argparse
+import glob
+import math
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.element_index import normalize_text
+from gempcbot.voice import VadSegmenter, create_recognizer
+
+OLD_PAUSE_THRESHOLD = 0.8  # speech_recognition.Recognizer.pause_threshold par défaut
+
+
+def write_synthetic(path, speech_s, sample_rate=16000, seed=0):
+    """Écrit un WAV : 0,6 s de bruit de fond, speech_s secondes de "syllabes" (bruit modulé), 1 s de bruit de fond."""
+    rnd = random.Random(seed)
+    samples = []
+    for i in range(int(0.6 * sample_rate)):
+        samples.append(rnd.randint(-60, 60))
+    for i in range(int(speech_s * sample_rate)):
+        envelope = abs(math.sin(math.pi * i / (0.2 * sample_rate)))  # Une "syllabe" toutes les 0,2 s
+        samples.append(int(envelope * rnd.randint(-6000, 6000) + rnd.randint(-60, 60)))
+    for i in range(sample_rate):
+        samples.append(rnd.randint(-60, 60))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def segment(path, end_silence_ms):
+    """Passe le fichier dans le détecteur trame par trame. Retourne (phrase, fréquence, largeur) ou (None, ...)."""
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1:
+            raise ValueError(f"{path} : seuls les WAV mono sont pris en charge")
+        sample_rate, width = f.getframerate(), f.getsampwidth()
+        segmenter = VadSegmenter(sample_rate, width, end_silence_ms=end_silence_ms)
+        calibration = [f.readframes(segmenter.frame_size) for _ in range(300 // segmenter.frame_ms)]
+        segmenter.calibrate(calibration)
+        while True:
+            frame = f.readframes(segmenter.frame_size)
+            if not frame:
+                return None, sample_rate, width
+            phrase = segmenter.feed(frame)
+            if phrase is not None:
+                return phrase, sample_rate, width
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", help="dossier de fichiers WAV (et .txt attendus)")
+    parser.add_argument("--backends", nargs="+", default=["google", "sphinx", "vosk"])
+    parser.add_argument("--language", default="fr-FR")
+    parser.add_argument("--vosk-model", default="vosk-model-small-fr")
+    parser.add_argument("--end-silence", type=int, default=500, help="silence de fin de phrase (ms)")
+    args = parser.parse_args()
+
+    import speech_recognition as sr
+
+    directory = args.fixtures
+    synthetic = directory is None
+    if synthetic:
+        directory = tempfile.mkdtemp(prefix="bench_voice_")
+        for i, speech_s in enumerate((0.8, 1.6, 3.0)):
+            write_synthetic(os.path.join(directory, f"synthetique-{speech_s:.1f}s.wav"), speech_s, seed=i)
+    try:
+        recognizers = {}
+        for name in args.backends:
+            recognizers[name] = create_recognizer(name, args.language, model_path=args.vosk_model)
+            if hasattr(recognizers[name], "warm_up"):
+                try:
+                    recognizers[name].warm_up()  # Modèle chargé une fois, au démarrage de l'écoute
+                except Exception:
+                    pass  # L'erreur sera affichée à la reconnaissance
+        vad_delay = args.end_silence / 1000
+        print(f"détection de fin de phrase : {vad_delay:.2f} s (ancienne écoute : {OLD_PAUSE_THRESHOLD:.2f} s)")
+        print(f"{'fichier':<24} {'phrase (s)':>10} {'moteur':<8} {'reco (s)':>9} {'délai (s)':>10}  texte")
+        for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+            name = os.path.basename(path)
+            phrase, sample_rate, width = segment(path, args.end_silence)
+            if phrase is None:
+                print(f"{name:<24} {'-':>10}  aucune parole détectée")
+                continue
+            expected_path = os.path.splitext(path)[0] + ".txt"
+            expected = open(expected_path, encoding="utf-8").read().strip() if os.path.exists(expected_path) else None
+            audio = sr.AudioData(phrase, sample_rate, width)
+            duration = len(phrase) / (sample_rate * width)
+            for backend, recognizer in recognizers.items():
+                start = time.perf_counter()
+                try:
+                    text = recognizer.recognize(audio)
+                except sr.UnknownValueError:
+                    text = "(rien compris)"
+                except Exception as e:
+                    text = f"(indisponible : {type(e).__name__}: {e})"[:80]
+                elapsed = time.perf_counter() - start
+                if expected is not None and not text.startswith("("):
+                    text += " [ok]" if normalize_text(text) == normalize_text(expected) else f" [attendu : {expected}]"
+                print(f"{name:<24} {duration:>10.2f} {backend:<8} {elapsed:>9.2f} {vad_delay + elapsed:>10.2f}  {text}")
+    finally:
+        if synthetic:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
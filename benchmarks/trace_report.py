@@ -0,0 +1,41 @@
+"""Agrège les traces d'exécution (JSON lines) et affiche p50/p95 par étape.
+
+Usage : python benchmarks/trace_report.py [dossier ou fichiers .jsonl ...]  (par défaut : traces/)
+"""
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gempcbot.tracing import format_summary, load_spans, percentile, summarize
+
+
+def main():
+    targets = sys.argv[1:] or ["traces"]
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "*.jsonl"))))
+        else:
+            paths.append(target)
+    if not paths:
+        raise SystemExit("Aucune trace trouvée.")
+
+    spans = load_spans(paths)
+    run_durations = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            first = json.loads(f.readline())
+            if first.get("type") == "run":
+                run_durations.append(first["duration"])
+
+    print(f"{len(paths)} exécutions, {len(spans)} spans")
+    if run_durations:
+        print(f"Durée par exécution : p50 {percentile(run_durations, 50):.2f} s, p95 {percentile(run_durations, 95):.2f} s")
+    print(format_summary(summarize(spans)))
+
+
+if __name__ == "__main__":
+    main()
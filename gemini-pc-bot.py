@@ -1,29 +1,136 @@
-import google.generativeai as genai
 from pynput.mouse import Button, Controller as MouseController
 from pynput.keyboard import Key, Controller as KeyboardController
 import time
-import mss
-import base64
 import os
-from PIL import Image
-import io
+import sys
 import json
-import speech_recognition as sr
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, simpledialog
-from ttkthemes import ThemedTk
+import base64
+import argparse
 import threading
-import pyperclip  # Import de pyperclip
+from concurrent.futures import Future
+import queue
+import re
+from gempcbot.actions import (Capture, Click, DryRunExecutor, Keys, Move, PynputExecutor, TypeText, Wait,
+                              compile_actions)
+from gempcbot.capture import ScreenCapturer, encode_image
+from gempcbot.dirty_regions import REGION, SAME, DirtyRegionTracker, merge_elements, offset_elements
+from gempcbot.vision_cache import VisionCache, hamming_distance
+from gempcbot.planning import FUSED_SYSTEM_INSTRUCTION, PLAN_SCHEMA, build_fused_prompt
+from gempcbot.prompts import (PLANNING_SYSTEM_INSTRUCTION, VERIFICATION_SYSTEM_INSTRUCTION, build_planning_prompt,
+                              build_verification_prompt, token_usage)
+from gempcbot.text_entry import TextEntryEngine
+from gempcbot.settle import ScreenSettleWaiter
+from gempcbot.tracing import RunTracer, format_summary
+from gempcbot.backends import create_backend
+from gempcbot.events import JsonLogSink, MultiSink, StdoutSink, TkSink
+from gempcbot.element_index import ElementIndex
+from gempcbot.local_check import EXPECTED_CHANGE, INCONCLUSIVE, UNCHANGED, LocalVerifier
+from gempcbot.pipeline import InferencePipeline, PipelineCancelled
+from gempcbot.history import ScreenHistory, describe_action
+from gempcbot.screen_diff import changed_ratio
+from gempcbot.voice import VadSegmenter, VoiceListener, create_recognizer
+from gempcbot.plan_cache import PlanCache
+from gempcbot.routing import ModelRouter, format_router_stats
+from gempcbot.scheduler import FREE_TIER_LIMITS, RequestScheduler, format_scheduler_stats, is_rate_limit
 
 # Définition des constantes de configuration
 # Durée de la pause entre chaque action en secondes
 PAUSE_DURATION = 1
 API_KEY_FILE = "api_key.txt"  # Nom du fichier de sauvegarde de la clé api
 MIN_PAUSE_DURATION = 1
-MAX_RETRIES = 0  # nombre maximal de tentatives d'execution
+# Taille du prompt de planification
+PROMPT_TOKEN_BUDGET = 1500  # Tokens max pour les éléments de l'interface dans un prompt (les plus pertinents sont gardés, None = tous)
+# Vérification locale (comparaison des captures avant/après) avant de demander à Gemini
+LOCAL_CHECK = True
+LOCAL_CHECK_UNCHANGED_RATIO = 0.0005  # En dessous de cette proportion de pixels modifiés, les actions n'ont rien fait
+LOCAL_CHECK_MARGIN = 40  # Distance (pixels de la capture) entre un clic et une zone modifiée pour que le changement soit "attendu"
+# Vérification sur la capture d'écran, en parallèle de l'analyse de vision (qui ne sert qu'en cas d'échec, ou à la tâche suivante)
+# quand la vérification locale n'a pas conclu ; si l'écran a changé comme attendu, l'analyse n'est lancée qu'en cas d'échec
+PARALLEL_VERIFICATION = True
+PIPELINE_WORKERS = 4  # Threads pour les appels au modèle lancés en parallèle
+# Mode de planification : "two_pass" (analyse de vision puis planification, 2 appels)
+# ou "fused" (éléments et actions en un seul appel avec une réponse JSON structurée)
+PLANNING_MODE = "two_pass"
+# Exécute les actions au fil de la génération du plan (mode "two_pass" uniquement)
+STREAMING_EXECUTION = False
+# Saisie de texte : collage via le presse-papier au-delà de ce nombre de caractères, sinon frappe par morceaux
+TEXT_ENTRY_CLIPBOARD_THRESHOLD = 200
+TEXT_ENTRY_CHUNK_SIZE = 32
+# Pauses "wait" : "stable" (jusqu'à ce que l'écran ne bouge plus), "change" (jusqu'à ce qu'il change)
+# ou "fixed" (durée complète). La durée choisie par Gemini reste la durée maximale.
+WAIT_MODE = "stable"
+SETTLE_QUIET_WINDOW = 0.5  # Durée sans changement (s) pour considérer l'écran stable
+SETTLE_POLL_INTERVAL = 0.1  # Intervalle (s) entre deux captures basse résolution
+# Exécution des actions : "pynput" (souris et clavier réels) ou "dry_run" (simulation sans toucher au bureau,
+# la durée estimée de chaque plan est journalisée)
+EXECUTOR = "pynput"
+OPTIMIZE_ACTIONS = True  # Fusionne les pauses consécutives, les déplacements suivis d'un clic et les frappes consécutives
+LOG_MAX_LINES = 5000  # Nombre max de lignes gardées dans la zone de texte
+LOG_SPILL_FILE = None  # Fichier tournant qui garde tous les messages (ex: "gemini-pc-bot.log"), None pour aucun
+# Historique des étapes : captures complètes sur le disque (PNG, une fois par contenu), vignettes et actions en mémoire
+HISTORY_DIR = "history"  # None pour ne garder que les vignettes en mémoire
+HISTORY_STEPS = 50  # Nombre max d'étapes gardées en mémoire
+HISTORY_MAX_FRAMES = 500  # Nombre max de captures gardées sur le disque (les plus anciennes sont supprimées)
+HISTORY_PROMPT_STEPS = 5  # Étapes résumées dans le prompt de planification (0 = aucune)
+HISTORY_PROMPT_FRAMES = 0  # Vignettes des captures précédentes jointes au prompt de planification
+# Préchauffage pendant que l'utilisateur tape sa première instruction : client Gemini, connexion, capture de l'écran
+WARMUP = True
+WARMUP_VISION = True  # Lance aussi l'analyse de vision de l'écran (la première tâche n'analyse plus que ce qui a changé)
+WARMUP_WAIT = 10  # Attente max (s) de la connexion aux modèles, et de la capture du préchauffage par la première tâche
+# Saisie vocale : le micro reste ouvert après la première utilisation, la reconnaissance démarre dès la fin de la parole
+VOICE_RECOGNIZER = "google"  # "google" (réseau), "sphinx" ou "vosk" (hors ligne)
+VOICE_LANGUAGE = "fr-FR"
+VOSK_MODEL_PATH = "vosk-model-small-fr"  # Dossier du modèle Vosk (https://alphacephei.com/vosk/models)
+VOICE_END_SILENCE_MS = 500  # Silence qui marque la fin de la phrase
+VOICE_TIMEOUT = 5  # Attente max (s) du début de la phrase
+VOICE_MAX_PHRASE = 15  # Durée max (s) d'une phrase
+TRACE_DIR = "traces"  # Dossier des traces de durée par étape (JSON lines), None pour ne rien écrire
+MAX_RETRIES = 0  # Nombre de nouveaux plans demandés à Gemini quand l'exécution n'a pas fonctionné (0 = aucun)
 DEFAULT_MODEL = "gemini-2.0-flash-exp" # modèle par défaut
+# Réglages de la capture d'écran envoyée à Gemini
+SCREENSHOT_FORMAT = "PNG"  # "PNG" (sans perte), "JPEG" ou "WEBP"
+SCREENSHOT_QUALITY = 85  # Qualité JPEG/WEBP (1-100)
+SCREENSHOT_MAX_EDGE = None  # Taille max du plus grand côté en pixels (None = pas de réduction)
+# Zone capturée : "monitor:N" (moniteur N, 1 = principal), "all" (tous les moniteurs) ou "active_window" (fenêtre au premier plan)
+CAPTURE_TARGET = "monitor:1"
+# Cache des analyses Gemini Vision (réutilisées si l'écran n'a pas visiblement changé)
+VISION_CACHE_SIZE = 64  # Nombre max de captures gardées en cache (0 = cache désactivé)
+VISION_CACHE_MAX_DISTANCE = 2  # Distance de Hamming max entre hashs perceptuels pour réutiliser une analyse
+VISION_CACHE_FILE = None  # Fichier de persistance du cache entre les lancements (ex: "vision_cache.json")
+# Après une première analyse complète, seule la zone modifiée de l'écran (tuiles de DIRTY_REGION_TILE pixels) est envoyée
+DIRTY_REGION_TILE = 64  # None pour toujours envoyer la capture entière
+DIRTY_REGION_MAX_RATIO = 0.5  # Au-delà de cette proportion de l'écran, la capture entière est analysée
+# Cache des plans réussis : une instruction déjà réussie sur un écran similaire est rejouée sans appel à Gemini
+PLAN_CACHE_FILE = "plan_cache.json"  # None pour désactiver le cache de plans
+PLAN_CACHE_SIZE = 200  # Nombre max de plans gardés
+PLAN_CACHE_TTL = 7 * 24 * 3600  # Durée de validité d'un plan en secondes
+# Backend du modèle : "gemini" (API), "record" (API + enregistrement dans CASSETTE_FILE),
+# "replay" (rejoue CASSETTE_FILE hors ligne) ou "http" (serveur local de remplacement à STANDIN_URL)
+MODEL_BACKEND = "gemini"
+CASSETTE_FILE = "cassette.jsonl"
+REPLAY_LATENCY = None  # Latence synthétique en secondes pour "replay" (None = latence enregistrée)
+STANDIN_URL = "http://127.0.0.1:8765/"
+# Modèle de chaque étape ("vision", "planning", "verification") ; les étapes absentes utilisent le modèle du menu déroulant
+MODEL_ROUTES = {"vision": "gemini-1.5-flash-8b", "verification": "gemini-1.5-flash-8b"}
+# Modèle de repli de chaque étape, utilisé si l'appel échoue ou si le p95 de l'étape dépasse ROUTING_P95_THRESHOLD
+MODEL_FALLBACKS = {"vision": "gemini-1.5-flash", "planning": "gemini-1.5-flash", "verification": "gemini-1.5-flash"}
+ROUTING_P95_THRESHOLD = 10.0  # Secondes (None = repli uniquement en cas d'erreur)
+# Quotas de chaque modèle {modèle: (requêtes/min, tokens/min)} : les appels attendent leur tour au lieu d'être refusés (429).
+# Appliqués aux backends "gemini" et "record" ; par défaut ceux de l'offre gratuite, {} pour ne pas limiter
+RATE_LIMITS = FREE_TIER_LIMITS
+# Nouvelles tentatives des appels refusés pour quota (429) ou en erreur passagère (5xx, réseau), avec une attente
+# exponentielle aléatoire ou la durée demandée par l'API, avant de passer au modèle de repli
+REQUEST_MAX_ATTEMPTS = 4
+REQUEST_DEADLINE = 60  # Durée max (s) d'un appel au modèle, attentes et nouvelles tentatives comprises (repli compris)
 AVAILABLE_MODELS = ["gemini-2.0-flash-exp", "gemini-2.0-flash-thinking-exp-1219", "gemini-1.5-pro", "gemini-1.5-flash", "gemini-1.5-flash-8b", "text-embedding-004"] # Modèle disponible dans le menu déroulant
 
+# Ligne d'action dans une réponse texte de Gemini, tolère les puces, la numérotation et les backticks
+ACTION_LINE_PATTERN = re.compile(
+    r"^\s*(?:[-*•]|\d+[.)])?\s*`?\s*((?:move_mouse|click_mouse|click_element|press_key|type_text|wait_until_stable|wait_for_change|wait|capture_screen)\b[^`]*)`?\s*$")
+
+# Résultat d'une étape de l'historique d'après la vérification locale
+LOCAL_VERDICT_LABELS = {UNCHANGED: "écran inchangé", EXPECTED_CHANGE: "écran modifié comme attendu"}
+
 # Couleurs et polices pour un thème plus doux
 BG_COLOR = "#f0f0f0"  # Gris très clair pour le fond
 TEXT_COLOR = "#333333"  # Gris foncé pour le texte
@@ -34,51 +141,274 @@ FONT_SIZE = 11
 
 
 class TaskAutomator:
-    def __init__(self, api_key, output_text_widget, status_label, send_button, stop_button, model_name=DEFAULT_MODEL, max_retries = MAX_RETRIES):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(self, api_key, sink, model_name=DEFAULT_MODEL, max_retries=None, planning_mode=PLANNING_MODE, streaming=STREAMING_EXECUTION,
+                 capture_target=CAPTURE_TARGET, executor=EXECUTOR):
+        self.api_key = api_key  # Le client Gemini est configuré à la création du premier backend
+        self._shared_backend = None  # Backend commun à tous les modèles en rejeu et en HTTP
+        self.scheduler = RequestScheduler(RATE_LIMITS if MODEL_BACKEND in ("gemini", "record") else {},
+                                          REQUEST_MAX_ATTEMPTS, deadline=REQUEST_DEADLINE,
+                                          should_stop=lambda: self._stop_requested, on_retry=self._log_retry)
+        self.router = ModelRouter(self._create_model, model_name, MODEL_ROUTES, MODEL_FALLBACKS, ROUTING_P95_THRESHOLD,
+                                  scheduler=self.scheduler)
         self.mouse = MouseController()
         self.keyboard = KeyboardController()
-        self.output_text_widget = output_text_widget  # Widget ou les textes doivent etre affichés
-        self.status_label = status_label  # Label pour indiquer si Gemini est en cours
-        self.send_button = send_button  # Bouton envoyer pour le désactiver pendant l'analyse
-        self.stop_button = stop_button  # Bouton pour arrêter l'exécution
+        paste_modifier = Key.cmd if sys.platform == "darwin" else Key.ctrl_l
+        self.text_entry = TextEntryEngine(self.keyboard, paste_modifier, TEXT_ENTRY_CLIPBOARD_THRESHOLD, TEXT_ENTRY_CHUNK_SIZE)
+        self._typing_target = None  # Où va arriver le texte tapé ("start_menu" après la touche windows)
+        self.sink = sink  # Reçoit les messages et changements d'état (interface Tk, console, fichier JSON...)
         self._stop_requested = False  # Flag pour interrompre l'exécution
-        self._history = []
+        self.history = ScreenHistory(HISTORY_DIR, HISTORY_STEPS, max_frames=HISTORY_MAX_FRAMES)  # Étapes des tâches, d'une tâche à l'autre
         self.current_instruction = None # Mémorise l'instruction courante
-        self.max_retries = max_retries # Nombre maximal de tentatives
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries # Nombre maximal de tentatives
+        self.planning_mode = planning_mode # "two_pass" ou "fused"
+        self.streaming = streaming # Exécution des actions pendant la génération du plan
+        self.capturer = ScreenCapturer(SCREENSHOT_FORMAT, SCREENSHOT_QUALITY, SCREENSHOT_MAX_EDGE, capture_target)
+        self.last_frame = None  # Dernière capture, sert à convertir les coordonnées du modèle en coordonnées écran
+        self.wait_mode = WAIT_MODE
+        self.settle_waiter = ScreenSettleWaiter(self.capturer.grab_thumbnail, SETTLE_POLL_INTERVAL, SETTLE_QUIET_WINDOW)
+        if executor == "dry_run":
+            self.executor = DryRunExecutor(quiet_window=SETTLE_QUIET_WINDOW)
+        else:
+            self.executor = PynputExecutor(self.mouse, self.keyboard, self.text_entry, self.settle_waiter, Button)
+        self._expect_change = False  # La dernière action (clic, touche) devrait modifier l'écran
+        self._change_reference = None  # Vignette de l'écran prise avant cette action, si une pause la suit
+        self.wait_time_saved = 0.0  # Temps gagné sur les pauses demandées par Gemini
+        self._element_index = None  # Index des éléments de la dernière analyse de vision
+        self._element_index_source = None
+        self._click_targets = []  # Éléments cliqués depuis la dernière capture (texte, ou None), dans l'ordre des clics
+        self.plan_cache = PlanCache(PLAN_CACHE_FILE, PLAN_CACHE_SIZE, PLAN_CACHE_TTL) if PLAN_CACHE_FILE else None
+        self.last_retry_count = 0  # Nombre de tentatives de la dernière exécution
+        self.dirty_regions = DirtyRegionTracker(DIRTY_REGION_TILE, max_ratio=DIRTY_REGION_MAX_RATIO) if DIRTY_REGION_TILE else None
+        self.local_verifier = LocalVerifier(LOCAL_CHECK_UNCHANGED_RATIO, LOCAL_CHECK_MARGIN) if LOCAL_CHECK else None
+        self.model_calls_avoided = 0  # Appels au modèle évités grâce à la vérification locale
+        self.pipeline = InferencePipeline(PIPELINE_WORKERS)
+        self._prefetch = None  # (clé du cache de vision, Future) de la dernière analyse lancée en arrière-plan
+        self.tracer = RunTracer(TRACE_DIR)  # Durée de chaque étape (capture, encodage, appels Gemini, actions)
+        self.vision_cache = VisionCache(VISION_CACHE_SIZE, VISION_CACHE_MAX_DISTANCE, path=VISION_CACHE_FILE) if VISION_CACHE_SIZE else None
+        self.voice = None  # VoiceListener créé à la première utilisation du micro
+        self._warm_up_thread = None
+        self._warm_frame = None  # (capture du préchauffage, vignette pour savoir si l'écran a changé depuis)
+        self._warm_lock = threading.Lock()
+        self._warm_frame_ready = threading.Event()  # La capture du préchauffage est prise (ou a échoué)
+
+    def _create_model(self, model_name):
+        """Crée le backend du modèle selon MODEL_BACKEND (appelé par le routeur au premier usage de chaque modèle)."""
+        if MODEL_BACKEND in ("replay", "http"):
+            # Une seule cassette (ou un seul serveur) pour tous les modèles, pour garder l'ordre des réponses
+            if self._shared_backend is None:
+                self._shared_backend = create_backend(MODEL_BACKEND, model_name, cassette_path=CASSETTE_FILE,
+                                                      url=STANDIN_URL, replay_latency=REPLAY_LATENCY)
+            return self._shared_backend
+        return create_backend(MODEL_BACKEND, model_name, cassette_path=CASSETTE_FILE, url=STANDIN_URL,
+                              replay_latency=REPLAY_LATENCY, api_key=self.api_key)
+
+    def set_model(self, model_name):
+        """Change le modèle des étapes sans route dans MODEL_ROUTES."""
+        self.router.set_default_model(model_name)
+
+    def reload_models(self, api_key=None):
+        """Passe à une nouvelle clé API : les backends des modèles sont recréés au prochain appel (le client Gemini
+        de chaque clé n'est créé qu'une fois) et les quotas repartent de zéro. Sans changement de clé, ne fait rien."""
+        if not api_key or api_key == self.api_key:
+            return
+        self.api_key = api_key
+        self._shared_backend = None
+        self.router.clear_backends()
+        self.scheduler.reset()
+
+    def _log_retry(self, model_name, error, delay, attempt):
+        """Journalise une nouvelle tentative d'appel au modèle (appelé par le scheduler)."""
+        reason = "quota atteint" if is_rate_limit(error) else f"erreur {error}"
+        self._log_message(f"{model_name} : {reason}, nouvelle tentative dans {delay:.1f} s "
+                          f"({attempt + 1}/{REQUEST_MAX_ATTEMPTS})")
+
+    def warm_up_async(self):
+        """Lance le préchauffage (warm_up) dans un thread, une seule fois."""
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+            self._warm_up_thread.start()
+
+    def warm_up(self):
+        """Prépare la première tâche pendant que l'utilisateur tape son instruction : capture et encode l'écran,
+        lance son analyse de vision (WARMUP_VISION), puis crée les clients des modèles et ouvre leur connexion."""
+        start = time.perf_counter()
+        try:
+            frame = self._capture_screen()
+            with self._warm_lock:
+                self._warm_frame = (frame, self.capturer.grab_thumbnail())
+            if WARMUP_VISION:
+                self._prefetch_vision(frame)  # Lancée avant le signal : la première tâche attendra son résultat
+        finally:
+            self._warm_frame_ready.set()  # La première tâche n'attend que la capture
+        try:
+            models = self.router.warm_up(timeout=WARMUP_WAIT)
+        except Exception as e:
+            models = []
+            self._log_message(f"Préchauffage de la connexion à Gemini impossible : {e}")
+        self._log_message(f"Préchauffage terminé en {time.perf_counter() - start:.2f} s "
+                          f"(modèles prêts : {', '.join(models) or 'aucun'})")
+
+    def _take_warm_frame(self):
+        """Retourne la capture du préchauffage si l'écran n'a pas changé depuis, sinon None (une seule fois).
+        Attend seulement que la capture du préchauffage soit prise, pas la connexion aux modèles."""
+        if self._warm_up_thread is None:
+            return None
+        self._warm_frame_ready.wait(WARMUP_WAIT)
+        with self._warm_lock:
+            warm, self._warm_frame = self._warm_frame, None
+        if warm is None:
+            return None
+        frame, warm_thumbnail = warm
+        with self.tracer.span("warm_frame") as span:
+            # Vignettes sans la fenêtre du bot (le champ de saisie change pendant la frappe), et même seuil que
+            # les attentes de l'écran pour ignorer un curseur qui clignote ou une horloge
+            span["changed_ratio"] = changed_ratio(warm_thumbnail, self.capturer.grab_thumbnail())
+            span["reused"] = span["changed_ratio"] <= self.settle_waiter.change_threshold
+        if not span["reused"]:
+            return None
+        self.last_frame = frame
+        return frame
+
+    def set_own_window(self, rect):
+        """Mémorise la position de la fenêtre du bot {"left", "top", "width", "height"} (None si elle est masquée),
+        exclue des comparaisons entre captures."""
+        self.capturer.ignore_rect = rect
 
     def _log_message(self, message):
-        """Affiche le message dans la zone de texte."""
-        self.output_text_widget.insert(tk.END, message + "\n")
-        self.output_text_widget.see(tk.END)  # Pour que la dernière ligne soit visible.
+        """Envoie le message à afficher au sink."""
+        self.sink.emit("log", message=message)
 
     def _capture_screen(self):
-        """Capture une partie de l'écran et la retourne en base64."""
-        with mss.mss() as sct:
-            monitor = sct.monitors[1]
-            bbox = (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
-            sct_img = sct.grab(bbox)
-            img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-
-            buffered = io.BytesIO()
-            img.save(buffered, format="PNG")
-            return base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-    def _analyze_image_with_gemini_vision(self, image_base64):
-        """Analyse l'image avec l'API Gemini Vision."""
+        """Capture l'écran et retourne un CapturedFrame (image encodée + échelle)."""
+        with self.tracer.span("capture"):
+            img, monitor = self.capturer.grab()
+        with self.tracer.span("encode", format=self.capturer.image_format) as span:
+            frame = self.capturer.encode(img, monitor)
+            span["payload_bytes"] = len(frame.data)
+        self.last_frame = frame
+        return frame
+
+    def _to_screen(self, x, y):
+        """Convertit des coordonnées de la dernière capture en coordonnées écran."""
+        if self.last_frame is None:
+            return int(round(x)), int(round(y))
+        return self.last_frame.to_screen(x, y)
+
+    def _analyze_image_with_gemini_vision(self, frame):
+        """Analyse l'image avec l'API Gemini Vision, ou réutilise l'analyse d'une capture quasi identique."""
+        cache_key = None
+        if self.vision_cache is not None:
+            with self.tracer.span("vision_cache") as span:
+                cache_key = self.vision_cache.key_for(frame.image)
+                data, distance = self.vision_cache.get(cache_key)
+                span["hit"] = data is not None
+            if data is not None:
+                stats = self.vision_cache.stats()
+                self._log_message(f"Écran inchangé (distance {distance}), analyse de vision réutilisée. "
+                                  f"Cache: {stats['hits']} hits / {stats['misses']} misses")
+                return data
+            data = self._wait_for_prefetch(cache_key)
+            if data:
+                return data
+        return self._request_vision(frame, cache_key)
+
+    def _wait_for_prefetch(self, cache_key):
+        """Si l'analyse de vision d'un écran quasi identique tourne en arrière-plan, attend son résultat."""
+        prefetch = self._prefetch
+        if prefetch is None:
+            return None
+        key, future = prefetch
+        if future.cancelled() or key[1] != cache_key[1] or \
+                hamming_distance(key[0], cache_key[0]) > self.vision_cache.max_distance:
+            return None
+        if not future.done():
+            self._log_message("Analyse de vision de cet écran déjà en cours, attente du résultat...")
+        try:
+            return self.pipeline.result(future, lambda: self._stop_requested)
+        except Exception:
+            return None
+
+    def _prefetch_vision(self, frame):
+        """Lance l'analyse de vision de la capture en arrière-plan et retourne son Future.
+        Le résultat est mis en cache : la planification suivante sur le même écran n'aura pas à l'attendre."""
+        cache_key = None
+        if self.vision_cache is not None:
+            cache_key = self.vision_cache.key_for(frame.image)
+            data, _ = self.vision_cache.peek(cache_key)  # Sans compter : l'analyse qui utilisera ce résultat fera le get
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+                return future
+        future = self.pipeline.submit(self._request_vision, frame, cache_key)
+        if cache_key is not None:
+            self._prefetch = (cache_key, future)
+        return future
+
+    def _request_vision(self, frame, cache_key=None):
+        """Demande à Gemini les éléments de l'interface de la capture (ou seulement de la zone modifiée depuis
+        la dernière analyse) et met la réponse en cache."""
+        if self.dirty_regions is not None:
+            mode, box, previous = self.dirty_regions.plan(frame.image, frame.ignore)  # Sans la fenêtre du bot
+            data = None
+            if mode == SAME:
+                self._log_message("Aucune tuile modifiée depuis la dernière analyse, éléments réutilisés.")
+                data = previous
+            elif mode == REGION:
+                data = self._request_vision_region(frame, box, previous)
+            if data:
+                self.dirty_regions.update(frame.image, data)
+                if cache_key is not None:
+                    self.vision_cache.put(cache_key, data)
+                return data
+        data = self._request_full_vision(frame, cache_key)
+        if self.dirty_regions is not None:
+            self.dirty_regions.update(frame.image, data)
+        return data
+
+    def _request_vision_region(self, frame, box, previous):
+        """Analyse seulement la zone box de la capture et fusionne ses éléments avec ceux de la dernière analyse.
+        Retourne None si l'analyse de la zone échoue."""
+        x1, y1, x2, y2 = box
+        region = frame.image.crop(box)
+        data, mime_type = encode_image(region, self.capturer.image_format, self.capturer.quality)
+        self._log_message(f"Analyse de la zone modifiée ({x2 - x1}x{y2 - y1} à {x1},{y1}, "
+                          f"{len(data) / max(len(frame.data), 1):.0%} de la capture) avec Gemini Vision...")
+        try:
+            contents = [
+                "Analyse l'image et détecte tous les éléments de l'interface graphique, et leurs textes. "
+                "Cette image est une partie de l'écran : donne les bounding_box en pixels de cette image.",
+                {"mime_type": mime_type, "data": base64.b64encode(data).decode("utf-8")}
+            ]
+            with self.tracer.span("vision", payload_bytes=len(data), region=True) as span:
+                response, model_name = self.router.generate_content("vision", contents=contents)
+                self._log_tokens("vision", model_name, response, contents[0], None, span)
+            region_data = json.loads(response.text)
+        except Exception as e:
+            self._log_message(f"Erreur lors de l'analyse de la zone modifiée, analyse de toute la capture: {e}")
+            return None
+        elements = offset_elements(region_data.get("elements", []), x1, y1)
+        merged = merge_elements(previous.get("elements", []), elements, box)
+        self._log_message(f"Gemini Vision Response (zone), nb elements: {len(elements)}, total après fusion: {len(merged)}")
+        return dict(previous, elements=merged)
+
+    def _request_full_vision(self, frame, cache_key=None):
+        """Demande à Gemini les éléments de l'interface de toute la capture."""
         self._log_message("Analyse de l'image avec Gemini Vision...")
         try:
             contents = [
                 "Analyse l'image et détecte tous les éléments de l'interface graphique, et leurs textes",
-                {"mime_type": "image/png", "data": image_base64}
+                {"mime_type": frame.mime_type, "data": frame.base64}
             ]
-            response = self.model.generate_content(contents=contents)
+            with self.tracer.span("vision", payload_bytes=len(frame.data)) as span:
+                response, model_name = self.router.generate_content("vision", contents=contents)
+                self._log_tokens("vision", model_name, response, contents[0], None, span)
 
             if response.text:
                 try:
                     data = json.loads(response.text)
                     self._log_message(f"Gemini Vision Response (parsed), nb elements: {len(data.get('elements', []))}")
+                    if cache_key is not None and data:
+                        self.vision_cache.put(cache_key, data)
                     return data
                 except json.JSONDecodeError as e:
                     self._log_message(f"Erreur lors du parsing JSON : {e}. La réponse brute de Gemini Vision n'a pas pu être parsée.")
@@ -91,71 +421,66 @@ class TaskAutomator:
             self._log_message(f"Erreur lors de l'analyse avec Gemini Vision: {e}")
             return {}
     def _calculate_center(self, element):
-            """Calcule le centre d'un élément à partir de ses coordonnées."""
+            """Calcule le centre d'un élément (en coordonnées écran) à partir de ses coordonnées dans la capture."""
             if "bounding_box" in element:
                 x1 = element["bounding_box"]["x1"]
                 y1 = element["bounding_box"]["y1"]
                 x2 = element["bounding_box"]["x2"]
                 y2 = element["bounding_box"]["y2"]
-                center_x = (x1 + x2) // 2
-                center_y = (y1 + y2) // 2
-                return center_x, center_y
+                return self._to_screen((x1 + x2) / 2, (y1 + y2) / 2)
             return None, None
 
-    def _parse_instruction(self, instruction, image_base64, vision_data=None, retry_message=None):
+    def _build_planning_prompt(self, instruction, vision_data, retry_message=None, history=None, history_frames=0):
+        """Construit la partie variable du prompt de planification (consignes dans PLANNING_SYSTEM_INSTRUCTION)."""
+        prompt, kept, total = build_planning_prompt(instruction, vision_data, retry_message, PROMPT_TOKEN_BUDGET,
+                                                    history, history_frames)
+        if kept < total:
+            self._log_message(f"Éléments envoyés à Gemini : {kept}/{total} (les plus pertinents pour l'instruction)")
+        return prompt
+
+    def _history_context(self):
+        """Retourne (résumé des dernières étapes, vignettes JPEG des captures précédentes) pour la planification."""
+        if not HISTORY_PROMPT_STEPS:
+            return None, []
+        return self.history.summary(HISTORY_PROMPT_STEPS), self.history.thumbnails(HISTORY_PROMPT_FRAMES)
+
+    def _planning_contents(self, prompt, frame, thumbnails):
+        """Prompt, vignettes des captures précédentes puis capture actuelle."""
+        contents = [prompt]
+        contents.extend({"mime_type": "image/jpeg", "data": base64.b64encode(data).decode("utf-8")} for data in thumbnails)
+        contents.append({"mime_type": frame.mime_type, "data": frame.base64})
+        return contents
+
+    def _log_tokens(self, stage, model_name, response, prompt, system_instruction, span):
+        """Journalise le modèle et le nombre de tokens d'un appel, et les ajoute au span et aux compteurs du routeur."""
+        prompt_tokens, output_tokens, estimated = token_usage(response, (system_instruction or "") + prompt)
+        span["model"] = model_name
+        span["prompt_tokens"] = prompt_tokens
+        span["output_tokens"] = output_tokens
+        self.router.record_usage(stage, model_name, prompt_tokens, output_tokens)
+        self._log_message(f"Tokens {stage} ({model_name}) : prompt {prompt_tokens}, réponse {output_tokens}"
+                          + (" (estimation)" if estimated else ""))
+
+    def _parse_instruction(self, instruction, frame, vision_data=None, retry_message=None):
         """Utilise Gemini pour analyser l'instruction, l'image et les données de vision et retourner des actions sous forme textuelle."""
+        if self.planning_mode == "fused":
+            return self._parse_instruction_fused(instruction, frame, vision_data, retry_message)
+
         #vision_data = self._analyze_image_with_gemini_vision(image_base64)  # données de vision
         if not vision_data:
-             vision_data = self._analyze_image_with_gemini_vision(image_base64)
-
-        prompt = f"""
-            Tu es un assistant expert en automatisation d'interface graphique. Ton but est d'exécuter une instruction en interagissant avec l'interface.
-            Voici l'instruction: {instruction}
-
-            Voici les données de vision (format json):
-            {vision_data}
-
-            Tu dois retourner une liste d'actions textuelles, une action par ligne. 
-            Priorise toujours les interactions avec l'interface (clics, mouvements de souris) avant la frappe au clavier.
-            Si tu dois lancer un programme, **ouvre toujours le menu Démarrer en appuyant sur la touche windows, utilise type_text pour taper le nom du programme, puis appuie sur la touche enter pour valider.**
-            Après avoir lancé le programme, interagit directement avec son interface pour faire ce que l'on te demande.
-            Une fois ta tâche terminée, ne fait rien de plus.
-            Rajoute une pause après avoir interagi avec l'interface graphique, surtout si tu viens d'ouvrir une application ou un menu.
-            Ajoute une pause après une action `press_key enter`.
-            Quand tu dois cliquer sur un élément, utilise les données de vision pour déterminer les coordonnées précises de l'élément et clique au centre de celui-ci.
-            
-            Les types d'actions possibles sont:
-                - 'move_mouse x y': Déplace le curseur.
-                - 'click_mouse button': Simule un clic de souris. button peut être "left" ou "right". Si tu vois un élément de l'interface qui semble cliquable, utilise `click_mouse` et cible le centre de cet élément.
-                - 'press_key key': Simule l'appui sur une touche du clavier. Utilise `press_key` pour les touches spéciales comme `enter`, `esc` ou `cmd`. Utilise 'cmd' pour la touche windows.
-                - 'type_text text': Simule la frappe de texte. Utilise `type_text` uniquement dans les champs de texte ou pour saisir du texte libre.
-                - 'wait seconds': Mets le programme en pause. Tu dois choisir la durée de la pause (en secondes) en fonction du contexte. 
-                - 'capture_screen': Prend une capture d'écran.
-            
-            Utilise 'capture_screen' quand :
-                - Tu as exécuté des actions et tu veux vérifier le résultat
-                - Tu ne comprends pas l'état de l'interface
-                - Tu soupçonnes un problème
-
-            Si l'action précédente n'a pas fonctionné, explique brièvement pourquoi et prends une capture d'écran pour réévaluer la situation.
-            Retourne les actions une par ligne. Si tu ne peux pas determiner les actions à faire, ne retourne rien.
-
-            Par exemple, si tu dois cliquer sur un bouton qui contient le texte "Ouvrir", tu dois retourner l'action 'click_mouse left' et cibler le centre du bouton.
-            Si tu dois écrire ton nom dans un champ texte, tu dois utiliser l'action 'type_text <ton nom>'.
-            **Si tu dois lancer un programme, ouvre le menu Démarrer en appuyant sur la touche windows, tape le nom du programme avec type_text puis valides avec la touche enter.**
-
-            Explique ton raisonnement avant de prendre une capture d'écran.
-        """
-        if retry_message:
-            prompt += f"\n L'action précédente n'a pas fonctionné, voici l'erreur: {retry_message}. Essaye à nouveau."
+             vision_data = self._analyze_image_with_gemini_vision(frame)
+
+        history, thumbnails = self._history_context()
+        prompt = self._build_planning_prompt(instruction, vision_data, retry_message, history, len(thumbnails))
 
         try:
-            contents = [
-                prompt,
-                {"mime_type": "image/png", "data": image_base64}
-            ]
+            contents = self._planning_contents(prompt, frame, thumbnails)
 
-            response = self.model.generate_content(contents=contents)
+            with self.tracer.span("planning", prompt_chars=len(prompt), payload_bytes=len(frame.data),
+                                  retry=bool(retry_message)) as span:
+                response, model_name = self.router.generate_content("planning", contents=contents,
+                                                                    system_instruction=PLANNING_SYSTEM_INSTRUCTION)
+                self._log_tokens("planning", model_name, response, prompt, PLANNING_SYSTEM_INSTRUCTION, span)
             self._log_message("Analyse de l'instruction par Gemini...")
             # On utilise strip pour retirer les \n en debut et fin de chaine
             actions_text = response.text.strip()
@@ -167,6 +492,124 @@ class TaskAutomator:
         self._log_message(f"Actions Parsées par Gemini: {actions}")
         return actions
 
+    def _parse_instruction_fused(self, instruction, frame, vision_data=None, retry_message=None):
+        """Obtient les éléments de l'interface et les actions en un seul appel à Gemini (réponse JSON structurée)."""
+        history, thumbnails = self._history_context()
+        prompt = build_fused_prompt(instruction, vision_data, retry_message, PROMPT_TOKEN_BUDGET, history, len(thumbnails))
+        generation_config = {"response_mime_type": "application/json", "response_schema": PLAN_SCHEMA}
+        try:
+            contents = self._planning_contents(prompt, frame, thumbnails)
+            self._log_message("Analyse de l'image et de l'instruction par Gemini (appel unique)...")
+            with self.tracer.span("planning", mode="fused", prompt_chars=len(prompt), payload_bytes=len(frame.data),
+                                  retry=bool(retry_message)) as span:
+                response, model_name = self.router.generate_content("planning", contents=contents,
+                                                                    generation_config=generation_config,
+                                                                    system_instruction=FUSED_SYSTEM_INSTRUCTION)
+                self._log_tokens("planning", model_name, response, prompt, FUSED_SYSTEM_INSTRUCTION, span)
+            plan = json.loads(response.text)
+        except json.JSONDecodeError as e:
+            self._log_message(f"Erreur lors du parsing JSON du plan : {e}.")
+            return []
+        except Exception as e:
+            self._log_message(f"Erreur lors de l'analyse de l'instruction avec Gemini: {e}")
+            return []
+
+        vision_data = {"elements": plan.get("elements", [])}
+        self._log_message(f"Gemini Vision Response (plan), nb elements: {len(vision_data['elements'])}")
+        if self.vision_cache is not None and vision_data["elements"]:
+            self.vision_cache.put(self.vision_cache.key_for(frame.image), vision_data)
+        if self.dirty_regions is not None:
+            self.dirty_regions.update(frame.image, vision_data)
+        if plan.get("reasoning"):
+            self._log_message(f"Raisonnement de Gemini: {plan['reasoning']}")
+
+        actions = self.parse_structured_actions(plan.get("actions", []), vision_data)
+        self._log_message(f"Actions Parsées par Gemini: {actions}")
+        return actions
+
+    def _key_from_name(self, key_name):
+        """Convertit un nom de touche retourné par Gemini en touche pynput."""
+        if key_name == 'windows' or key_name == 'win' or key_name == 'cmd':
+            return Key.cmd
+        return getattr(Key, key_name) if hasattr(Key, key_name) else key_name
+
+    def _key_action(self, key_name):
+        """Action d'appui sur une touche, ou sur un raccourci ("ctrl+c" : touches appuyées ensemble)."""
+        keys = [self._key_from_name(name) for name in key_name.split("+") if name] or [key_name]
+        if len(keys) == 1:
+            return {"action": "keyboard_press", "key": keys[0]}
+        return {"action": "keyboard_press", "keys": [keys]}
+
+    def _get_element_index(self, vision_data):
+        """Retourne l'index des éléments des données de vision (construit une seule fois par analyse)."""
+        if self._element_index is None or self._element_index_source is not vision_data:
+            elements = vision_data.get("elements", []) if isinstance(vision_data, dict) else []
+            self._element_index = ElementIndex(elements)
+            self._element_index_source = vision_data
+        return self._element_index
+
+    def _element_at(self, x, y):
+        """Retourne l'élément de la dernière analyse de vision sous le point écran (x, y), ou None."""
+        if self._element_index is None:
+            return None
+        if self.last_frame is not None:
+            x, y = self.last_frame.to_image(x, y)
+        return self._element_index.element_at(x, y)
+
+    def _find_element(self, target, vision_data):
+        """Retourne l'élément dont le texte correspond le mieux à target (sans accents, tolère les fautes), ou None."""
+        if not vision_data or 'elements' not in vision_data:
+            return None
+        return self._get_element_index(vision_data).find(target)
+
+    def _click_actions(self, button, label, vision_data):
+        """Retourne les actions pour cliquer au centre de l'élément label, ou None s'il est introuvable."""
+        element = self._find_element(label, vision_data)
+        if element is None:
+            return None
+        center_x, center_y = self._calculate_center(element)
+        if center_x is None or center_y is None:
+            return None
+        return [{"action": "mouse_move", "x": center_x, "y": center_y}, {"action": "mouse_click", "button": button}]
+
+    def parse_structured_actions(self, plan_actions, vision_data):
+        """Convertit la liste d'actions typées du mode "fused" en une liste de dictionnaires."""
+        actions = []
+        for item in plan_actions:
+            action_type = item.get("action")
+            try:
+                if action_type == "move_mouse":
+                    x, y = self._to_screen(int(item["x"]), int(item["y"]))
+                    actions.append({"action": "mouse_move", "x": x, "y": y})
+                elif action_type == "click_mouse":
+                    element = self._find_element(item["target"], vision_data) if item.get("target") else None
+                    center_x, center_y = self._calculate_center(element) if element else (None, None)
+                    if center_x is not None and center_y is not None:
+                        actions.append({"action": "mouse_move", "x": center_x, "y": center_y})
+                    elif "x" in item and "y" in item:
+                        x, y = self._to_screen(int(item["x"]), int(item["y"]))
+                        actions.append({"action": "mouse_move", "x": x, "y": y})
+                    actions.append({"action": "mouse_click", "button": item.get("button", "left")})
+                elif action_type == "press_key":
+                    actions.append(self._key_action(item["key"]))
+                elif action_type == "type_text":
+                    action = {"action": "keyboard_type", "text": item["text"]}
+                    if item.get("entry"):
+                        action["entry"] = item["entry"]
+                    actions.append(action)
+                elif action_type == "wait":
+                    action = {"action": "wait", "seconds": float(item["seconds"])}
+                    if item.get("mode"):
+                        action["mode"] = item["mode"]
+                    actions.append(action)
+                elif action_type == "capture_screen":
+                    actions.append({"action": "capture_screen"})
+                else:
+                    self._log_message(f"Action inconnue ignorée : {action_type}")
+            except (KeyError, TypeError, ValueError) as e:
+                self._log_message(f"Action structurée invalide ignorée : {item} ({e})")
+        return actions
+
     def parse_text_actions(self, actions_text, vision_data):
         """Parse les actions textuelles retournées par Gemini en une liste de dictionnaires."""
         actions = []
@@ -179,44 +622,39 @@ class TaskAutomator:
                 if action_type == "move_mouse":
                     if len(parts) == 3:
                         try:
-                            actions.append({"action": "mouse_move", "x": int(parts[1]), "y": int(parts[2])})
+                            x, y = self._to_screen(int(parts[1]), int(parts[2]))
+                            actions.append({"action": "mouse_move", "x": x, "y": y})
                         except ValueError:
                             self._log_message(
                                 f"Erreur de parsing pour move_mouse : les coordonnées doivent être des entiers.")
                     else:
                         self._log_message(f"Erreur de parsing pour move_mouse : nombre d'arguments incorrect.")
                 elif action_type == "click_mouse":
-                    if len(parts) == 2:
-                        # on itère sur vision data pour trouver l'element qui correspond
-                        if vision_data and 'elements' in vision_data:
-                          # si la réponse contient des éléments, on itère sur chaque élément pour trouver le centre.
-                           found_element = False
-                           for element in vision_data["elements"]:
-                             if element and "text" in element and parts[1] in element["text"] :
-                               center_x, center_y = self._calculate_center(element)
-                               if center_x is not None and center_y is not None:
-                                  actions.append({"action": "mouse_move", "x": center_x, "y": center_y})
-                                  actions.append({"action": "mouse_click", "button": "left"}) # On clique toujours à gauche, on verra pour faire autrement après
-                                  found_element = True
-                                  break
-                           if not found_element: # Si on n'a pas trouvé d'élément, on fait un simple click
-                                 actions.append({"action": "mouse_click", "button": parts[1]})
+                    if len(parts) >= 2:
+                        # "click_mouse button" clique à la position courante, "click_mouse button texte" sur l'élément
+                        label = " ".join(parts[2:])
+                        click_actions = self._click_actions(parts[1], label, vision_data) if label else None
+                        if click_actions:
+                            actions.extend(click_actions)
                         else:
-                              actions.append({"action": "mouse_click", "button": parts[1]})
+                            if label:
+                                self._log_message(f"Élément introuvable pour click_mouse : {label}, clic à la position courante.")
+                            actions.append({"action": "mouse_click", "button": parts[1]})
                     else:
                         self._log_message(f"Erreur de parsing pour click_mouse : nombre d'arguments incorrect.")
+                elif action_type == "click_element":
+                    if len(parts) >= 2:
+                        label = " ".join(parts[1:])
+                        click_actions = self._click_actions("left", label, vision_data)
+                        if click_actions:
+                            actions.extend(click_actions)
+                        else:
+                            self._log_message(f"Élément introuvable pour click_element : {label}")
+                    else:
+                        self._log_message(f"Erreur de parsing pour click_element : nombre d'arguments incorrect.")
                 elif action_type == "press_key":
                   if len(parts) == 2:
-                      key_name = parts[1]
-                      if key_name == 'windows' or key_name == 'win' or key_name == 'cmd':
-                           key = Key.cmd
-                      else:
-                          try:
-                              key = getattr(Key, key_name) if hasattr(Key, key_name) else key_name
-                          except AttributeError:
-                            self._log_message(f"Erreur de parsing pour press_key, touche inconnue: {key_name}")
-                            continue # On ignore les touches non reconnues
-                      actions.append({"action": "keyboard_press", "key": key})
+                      actions.append(self._key_action(parts[1]))
                   else:
                      self._log_message(f"Erreur de parsing pour press_key : nombre d'arguments incorrect.")
                 elif action_type == "type_text":
@@ -225,10 +663,13 @@ class TaskAutomator:
                         actions.append({"action": "keyboard_type", "text": text})
                     else:
                         self._log_message(f"Erreur de parsing pour type_text : nombre d'arguments incorrect.")
-                elif action_type == "wait":
+                elif action_type in ("wait", "wait_until_stable", "wait_for_change"):
                     if len(parts) == 2:
                         try:
-                            actions.append({"action": "wait", "seconds": float(parts[1])})
+                            action = {"action": "wait", "seconds": float(parts[1])}
+                            if action_type != "wait":
+                                action["mode"] = "stable" if action_type == "wait_until_stable" else "change"
+                            actions.append(action)
                         except ValueError:
                             self._log_message(f"Erreur de parsing pour wait : les secondes doivent être un nombre.")
                     else:
@@ -240,48 +681,68 @@ class TaskAutomator:
 
         return actions
 
+    def _compile_actions(self, actions):
+        """Convertit les actions en actions typées, optimisées si OPTIMIZE_ACTIONS."""
+        compiled = compile_actions(actions, OPTIMIZE_ACTIONS)
+        if len(compiled) < len(actions):
+            self._log_message(f"Plan optimisé : {len(actions)} → {len(compiled)} actions")
+        return compiled
+
     def execute_actions(self, commands):
-        """Exécute la liste de commandes."""
+        """Exécute la liste de commandes (dictionnaires ou actions typées).
+        Retourne True si elles ont toutes été exécutées (et vérifiées)."""
+        commands = self._compile_actions(commands)
         retry_count = 0
-        image_base64 = None
+        frame = None
         error = None
         success = False # On ajoute cette variable
         vision_data_for_check = None # On initialise la variable ici
-        while retry_count <= MAX_RETRIES and not success: # On ajoute success ici
-            image_base64 = None # On réinitialise la variable ici
+        while retry_count <= self.max_retries and not success: # On ajoute success ici
+            frame = None # On réinitialise la variable ici
+            before = self.last_frame  # Capture de référence pour la vérification locale
+            segment_start = 0  # Début des actions exécutées depuis la dernière capture
+            clicked = []  # Positions des clics depuis la dernière capture
+            self._click_targets = []
             for i, command in enumerate(commands):
                 if self._stop_requested:
                     self._log_message("Execution interrompue.")
-                    return
+                    return False
 
+                self.tracer.annotate(retries=retry_count)
+                self.last_retry_count = retry_count
                 self._log_message(f"Executing command: {command}")
                 try:
-                     if command["action"] == "mouse_move":
-                        self.mouse.position = (command["x"], command["y"])
-                     elif command["action"] == "mouse_click":
-                        button = Button.left if command["button"] == "left" else Button.right
-                        self.mouse.click(button)
-                     elif command["action"] == "keyboard_press":
-                        self.keyboard.press(command['key'])
-                        self.keyboard.release(command['key'])
-                     elif command["action"] == "keyboard_type":
-                        text = command["text"]
-                        for char in text:
-                            self.keyboard.type(char)
-                            time.sleep(0.03)  # Délai de 30 ms entre chaque caractère
-                        # Option alternative : Utiliser le presse-papier
-                        # pyperclip.copy(text)
-                        # self.keyboard.press(Key.ctrl_l)
-                        # self.keyboard.press('v')
-                        # self.keyboard.release('v')
-                        # self.keyboard.release(Key.ctrl_l)
-                     elif command["action"] == "wait":
-                        self._log_message(f"Attente de {command['seconds']} secondes")
-                        time.sleep(command["seconds"]) # On garde la pause que Gemini a retourné
-                     elif command["action"] == "capture_screen":
-                        image_base64 = self._capture_screen()
-                        self._log_message("Capture d'écran prise.")
-                        vision_data_for_check = self._analyze_image_with_gemini_vision(image_base64)
+                     if not isinstance(command, Capture):
+                        self._execute_command(command, commands[i + 1] if i + 1 < len(commands) else None)
+                        if isinstance(command, Click):
+                            clicked.append(self.executor.position)
+                        continue
+                     frame, verdict = self._capture_and_check_locally(before, commands[segment_start:i], clicked)
+                     self._log_message("Capture d'écran prise.")
+                     self._add_to_history(self.current_instruction, frame, self._describe_segment(commands[segment_start:i]),
+                                          LOCAL_VERDICT_LABELS.get(verdict))
+                     before, segment_start, clicked = frame, i + 1, []
+                     if verdict == EXPECTED_CHANGE and i < len(commands) - 1:
+                        self.model_calls_avoided += 2  # Ni analyse de vision ni vérification pour une étape intermédiaire
+                        vision_data_for_check = None
+                        self._log_message("L'écran a changé là où on l'attendait, pas de vérification par Gemini.")
+                        continue
+                     if PARALLEL_VERIFICATION:
+                        try:
+                            vision_data_for_check, error = self._check_in_parallel(frame, verdict != EXPECTED_CHANGE)
+                        except PipelineCancelled:
+                            self._log_message("Execution interrompue.")
+                            return False
+                        if error:
+                            retry_count += 1
+                            self.history.set_outcome(f"échec : {error}")
+                            self._log_message(f"L'action n'a pas fonctionnée. Tentative #{retry_count}. Erreur: {error}")
+                            break
+                        self.history.set_outcome("réussi")
+                        if i == len(commands) - 1:
+                            success = True
+                     else:
+                        vision_data_for_check = self._analyze_image_with_gemini_vision(frame)
 
                         if i == len(commands) - 1:
                             if not vision_data_for_check:
@@ -291,9 +752,11 @@ class TaskAutomator:
                             error = self._check_action_with_gemini(vision_data_for_check)
                             if error:
                                 retry_count += 1
+                                self.history.set_outcome(f"échec : {error}")
                                 self._log_message(f"L'action n'a pas fonctionnée. Tentative #{retry_count}. Erreur: {error}")
                                 break
                             else:
+                                self.history.set_outcome("réussi")
                                 success = True # Si c'est la dernière action et qu'il n'y a pas d'erreur, on passe success à true
                         else:
                            if not vision_data_for_check:
@@ -303,43 +766,235 @@ class TaskAutomator:
                            error = self._check_action_with_gemini(vision_data_for_check)
                            if error:
                                 retry_count += 1
+                                self.history.set_outcome(f"échec : {error}")
                                 self._log_message(f"L'action n'a pas fonctionnée. Tentative #{retry_count}. Erreur: {error}")
                                 break
+                           self.history.set_outcome("réussi")
                 except Exception as e:
                     self._log_message(f"Une erreur innatendue est survenue lors de l'execution de la commande {command}. Erreur: {e}")
                     retry_count += 1 # On augmente le nombre de tentatives
-                    image_base64 = self._capture_screen()  # On prend une nouvelle capture d'écran
-                    vision_data_for_check = self._analyze_image_with_gemini_vision(image_base64)
+                    frame = self._capture_screen()  # On prend une nouvelle capture d'écran
+                    vision_data_for_check = self._analyze_image_with_gemini_vision(frame)
                     error = f"Une erreur inattendue est survenue. Erreur: {e}" # on sauvegarde l'erreur
+                    self._add_to_history(self.current_instruction, frame, [command], f"échec : {error}")
                     break  # On sort de la boucle for pour réanalyser
 
             else:
-                if not image_base64:
+                if not frame:
                     success = True # On passe success à True si toutes les actions ont été faite et qu'il n'y a pas de capture d'écran à la fin
-                
-            if image_base64:
-                commands = self._parse_instruction(self.current_instruction, image_base64, vision_data_for_check, f"L'action précédente n'a pas fonctionné. Tentative #{retry_count}. Erreur: {error}")
+
+            if success:
+                return True  # Pas besoin de redemander des actions à Gemini
+            if retry_count > self.max_retries:
+                break  # Plus de tentative : inutile de demander un nouveau plan
+            if frame:
+                commands = self._parse_instruction(self.current_instruction, frame, vision_data_for_check, f"L'action précédente n'a pas fonctionné. Tentative #{retry_count}. Erreur: {error}")
                 if not commands:
                     self._log_message(f"Gemini n'a pas retourné de nouvelle action.")
-                    return
+                    return False
+                commands = self._compile_actions(commands)
             else:
-                return  # Pas de capture d'écran.
-        self._log_message(f"L'action n'a pas fonctionnée après {MAX_RETRIES} tentatives.")
-
+                return False  # Pas de capture d'écran.
+        self._log_message(f"L'action n'a pas fonctionnée après {retry_count} tentative(s).")
+        return False
 
-    def _check_action_with_gemini(self, vision_data):
-        """Utilise Gemini pour vérifier si l'action a fonctionné."""
+    def _capture_and_check_locally(self, before, segment, clicked):
+        """Capture l'écran et le compare à la capture before. Retourne (capture, verdict).
+
+        Un écran inchangé n'est pas une preuve d'échec (petit changement, application lente) et les actions ne sont
+        pas rejouées (un clic ou un raccourci répété peut annuler le premier) : Gemini vérifie l'étape."""
+        frame = self._capture_screen()
+        if self.local_verifier is None or before is None or all(isinstance(c, Wait) for c in segment):
+            return frame, INCONCLUSIVE  # Sans action depuis la dernière capture, il n'y a rien à vérifier localement
+        points = [frame.to_image(x, y) for x, y in clicked]
+        with self.tracer.span("local_check") as span:
+            # La fenêtre du bot (son journal) change à chaque message : elle n'est pas comparée
+            verdict, ratio, regions = self.local_verifier.compare(before.image, frame.image, points,
+                                                                  before.ignore + frame.ignore)
+            span.update(verdict=verdict, changed_ratio=ratio, regions=len(regions))
+        self._log_message(f"Vérification locale : {verdict} ({ratio:.2%} des pixels modifiés, {len(regions)} zone(s))")
+        return frame, verdict
+
+    def _execute_command(self, command, next_command=None):
+        """Exécute une action typée simple (souris, clavier ou pause). next_command est l'action suivante si elle est
+        connue."""
+        with self.tracer.span("wait" if isinstance(command, Wait) else "action", action=command.name):
+            self._dispatch_command(command, next_command)
+
+    def _take_change_reference(self, next_command):
+        """Avant un clic ou une touche suivi d'une pause, capture l'écran de référence de l'attente : une réaction
+        rapide de l'interface (menu, boîte de dialogue) compte alors comme un changement."""
+        self._change_reference = None
+        if isinstance(next_command, Wait) and (next_command.mode or self.wait_mode) != "fixed":
+            try:
+                self._change_reference = self.executor.settle.reference()
+            except Exception:
+                pass  # L'attente prendra sa référence elle-même
+
+    def _dispatch_command(self, command, next_command=None):
+        """Envoie une action typée simple à l'exécuteur (souris, clavier) ou à l'attente."""
+        if isinstance(command, Move):
+            self.executor.move(command.x, command.y)
+        elif isinstance(command, Click):
+            self._take_change_reference(next_command)
+            self.executor.click(command.button, command.x, command.y)
+            element = self._element_at(*self.executor.position)
+            target = (str(element.get("text", "")).strip() or None) if element else None
+            self._click_targets.append(target)
+            if target:
+                self._log_message(f"Clic sur l'élément « {target} »")
+            self._typing_target = None
+            self._expect_change = True
+        elif isinstance(command, Keys):
+            self._take_change_reference(next_command)
+            self.executor.keys(command.strokes)
+            self._typing_target = "start_menu" if command.strokes[-1] == (Key.cmd,) else None
+            self._expect_change = True
+        elif isinstance(command, TypeText):
+            # entry permet de forcer la stratégie de saisie ("clipboard", "chunked" ou "per_char")
+            strategy = self.executor.type_text(command.text, command.entry, self._typing_target)
+            self._log_message(f"Texte saisi ({len(command.text)} caractères, stratégie {strategy})")
+            self._expect_change = False
+        elif isinstance(command, Wait):
+            self._wait(command.seconds, command.mode or self.wait_mode) # La pause de Gemini sert de durée maximale
+            self._expect_change = False
+
+    def _wait(self, seconds, mode):
+        """Attend que l'écran se stabilise ou change (selon mode), au plus seconds secondes, et journalise le temps gagné."""
+        reference, self._change_reference = self._change_reference, None
+        if mode == "fixed":
+            self._log_message(f"Attente de {seconds} secondes")
+            self.executor.sleep(seconds)
+            return
+
+        should_stop = lambda: self._stop_requested
+        elapsed = 0.0
+        outcome = ""
+        try:
+            if mode == "change" or self._expect_change:
+                # Après un clic ou une touche, on attend d'abord que l'écran réagisse
+                elapsed, changed = self.executor.settle.wait_for_change(seconds, should_stop, reference)
+                outcome = "écran modifié" if changed else "aucun changement"
+            if mode != "change" and elapsed < seconds:
+                stable_elapsed, stable = self.executor.settle.wait_until_stable(seconds - elapsed, should_stop)
+                elapsed += stable_elapsed
+                outcome = "écran stable" if stable else "durée maximale atteinte"
+        except Exception as e:
+            self._log_message(f"Surveillance de l'écran impossible ({e}), attente de {seconds} secondes")
+            self.executor.sleep(max(0.0, seconds - elapsed))
+            return
+
+        saved = max(0.0, seconds - elapsed)
+        self.wait_time_saved += saved
+        self._log_message(f"Attente de {elapsed:.1f}/{seconds} secondes ({outcome}), {saved:.1f} s économisées "
+                          f"(total {self.wait_time_saved:.1f} s)")
+
+    def _queue_action_line(self, line, vision_data, action_queue):
+        """Parse une ligne complète du flux de Gemini et met ses actions dans la file. Ignore les lignes de raisonnement.
+        Retourne True si au moins une action a été ajoutée."""
+        match = ACTION_LINE_PATTERN.match(line)
+        if not match:
+            return False
+        actions = self._compile_actions(self.parse_text_actions(match.group(1), vision_data))
+        for action in actions:
+            action_queue.put(action)
+        return bool(actions)
+
+    def _stream_actions(self, instruction, frame, vision_data, action_queue):
+        """Reçoit le plan de Gemini en streaming et met les actions dans la file dès que leur ligne est complète."""
+        history, thumbnails = self._history_context()
+        prompt = self._build_planning_prompt(instruction, vision_data, history=history, history_frames=len(thumbnails))
+        response = None
+        try:
+            contents = self._planning_contents(prompt, frame, thumbnails)
+            self._log_message("Analyse de l'instruction par Gemini (streaming)...")
+            with self.tracer.span("planning", mode="stream", prompt_chars=len(prompt), payload_bytes=len(frame.data)) as span:
+                stream_start = time.perf_counter()
+                response, model_name = self.router.generate_content("planning", contents=contents, stream=True,
+                                                                    system_instruction=PLANNING_SYSTEM_INSTRUCTION)
+                buffer = ""
+                for chunk in response:
+                    if self._stop_requested:
+                        # Annule le flux gRPC en cours au lieu d'attendre la fin de la génération
+                        cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+                        if cancel:
+                            cancel()
+                        break
+                    try:
+                        buffer += chunk.text
+                    except ValueError:
+                        continue  # Morceau sans texte (fin de génération, filtre de sécurité...)
+                    *lines, buffer = buffer.split("\n")
+                    for line in lines:
+                        if self._queue_action_line(line, vision_data, action_queue) and "first_action_s" not in span:
+                            span["first_action_s"] = time.perf_counter() - stream_start  # Délai avant la première action
+                else:
+                    self._queue_action_line(buffer, vision_data, action_queue)
+                    self._log_tokens("planning", model_name, response, prompt, PLANNING_SYSTEM_INSTRUCTION, span)
+        except Exception as e:
+            self._log_message(f"Erreur lors de l'analyse de l'instruction avec Gemini (streaming): {e}")
+        finally:
+            action_queue.put(None)  # Fin du flux
+
+    def _run_streaming(self, instruction, frame):
+        """Exécute les actions simples dès qu'elles arrivent du flux. À partir d'une capture d'écran ou d'une erreur,
+        la suite est confiée à execute_actions (vérification et nouvelles tentatives).
+        Retourne (succès, liste complète des actions du plan)."""
+        vision_data = self._analyze_image_with_gemini_vision(frame)
+        action_queue = queue.Queue()
+        producer = threading.Thread(target=self._stream_actions, args=(instruction, frame, vision_data, action_queue))
+        producer.start()
+
+        executed = []
+        remaining = []  # Actions à exécuter avec vérification une fois le flux terminé
+        while True:
+            try:
+                command = action_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop_requested:
+                    break
+                continue
+            if command is None:
+                break
+            if self._stop_requested:
+                break
+            if remaining or isinstance(command, Capture):
+                remaining.append(command)
+                continue
+            self._log_message(f"Executing command: {command}")
+            try:
+                with action_queue.mutex:  # Action suivante si elle est déjà arrivée
+                    next_command = action_queue.queue[0] if action_queue.queue else None
+                self._execute_command(command, next_command)
+                executed.append(command)
+            except Exception as e:
+                self._log_message(f"Une erreur innatendue est survenue lors de l'execution de la commande {command}. Erreur: {e}")
+                remaining.append(command)
+        producer.join()
+
+        if self._stop_requested:
+            self._log_message("Execution interrompue.")
+            return False, executed + remaining
+        self._log_message(f"Actions exécutées pendant le streaming: {executed}")
+        self.last_retry_count = 0
+        success = bool(executed or remaining)
+        if remaining:
+            success = self.execute_actions(remaining)
+        return success, executed + remaining
+
+
+    def _check_action_with_gemini(self, vision_data, frame=None):
+        """Utilise Gemini pour vérifier si l'action a fonctionné, d'après les données de vision ou directement la capture."""
         self._log_message("Vérification de l'action avec Gemini...")
-        prompt = f"""
-          Voici l'instruction qui a été exécutée: {self.current_instruction}
-          Voici les informations sur l'interface graphique après execution:
-          {vision_data}
-
-          Dis moi si l'action a bien fonctionnée ou non. Si ce n'est pas le cas donne moi une raison de l'échec, sinon ne dis rien.
-          Réponds par du texte uniquement, ne fait pas de code ou de json.
-        """
+        prompt = build_verification_prompt(self.current_instruction, vision_data, PROMPT_TOKEN_BUDGET)
+        contents = [prompt]
+        if frame is not None:
+            contents.append({"mime_type": frame.mime_type, "data": frame.base64})
         try:
-            response = self.model.generate_content(prompt)
+            with self.tracer.span("verification", prompt_chars=len(prompt), image=frame is not None) as span:
+                response, model_name = self.router.generate_content("verification", contents,
+                                                                    system_instruction=VERIFICATION_SYSTEM_INSTRUCTION)
+                self._log_tokens("verification", model_name, response, prompt, VERIFICATION_SYSTEM_INSTRUCTION, span)
             if response.text:
                  self._log_message(f"Gemini a répondu à la vérification: {response.text}")
                 # On utilise strip pour retirer les \n en debut et fin de chaine
@@ -351,84 +1006,201 @@ class TaskAutomator:
             self._log_message(f"Erreur lors de la vérification de l'action avec Gemini: {e}")
             return None
     
-    def _add_to_history(self, instruction, image_base64):
-        """Ajoute l'instruction et la capture à l'historique."""
-        self._history.append({
-            "instruction": instruction,
-            "image_base64": image_base64
-        })
+    def _check_in_parallel(self, frame, speculative=True):
+        """Vérifie l'action sur la capture ; avec speculative, l'analyse de vision de la même capture tourne en parallèle,
+        sinon elle n'est lancée qu'en cas d'erreur (un appel de moins quand l'étape réussit).
+
+        Retourne (données de vision, erreur). Les données de vision ne sont attendues qu'en cas d'erreur, pour corriger
+        le plan ; sinon l'analyse lancée se termine en arrière-plan et sert à la tâche suivante si l'écran n'a pas
+        changé. Lève PipelineCancelled si la tâche est interrompue."""
+        vision_future = self._prefetch_vision(frame) if speculative else None
+        check_future = self.pipeline.submit(self._check_action_with_gemini, None, frame)
+        should_stop = lambda: self._stop_requested
+        error = self.pipeline.result(check_future, should_stop)
+        if not error:
+            return None, None
+        if vision_future is None:
+            vision_future = self._prefetch_vision(frame)
+        return self.pipeline.result(vision_future, should_stop), error
+
+    def _describe_segment(self, segment):
+        """Descriptions des actions d'un segment pour l'historique, avec l'élément sous chaque clic s'il est connu."""
+        targets, self._click_targets = iter(self._click_targets), []
+        return [describe_action(command, next(targets, None) if isinstance(command, Click) else None)
+                for command in segment]
+
+    def _add_to_history(self, instruction, frame, actions=(), outcome=None):
+        """Ajoute à l'historique la capture prise après les actions, et leur résultat s'il est connu."""
+        with self.tracer.span("history"):
+            self.history.record(instruction, frame.image, actions, outcome)
 
     def set_status(self, status):
-        """Met à jour le label de statut dans l'interface graphique."""
-        self.status_label.config(text=status)
-        self.status_label.update_idletasks()  # Force l'update du label
+        """Met à jour le statut affiché."""
+        self.sink.emit("status", text=status)
 
-    def set_send_button_state(self, state):
-        """Active ou désactive le bouton Envoyer."""
-        self.send_button.config(state=state)
-        self.send_button.update_idletasks()  # Force l'update du bouton
+    def set_busy(self, busy):
+        """Indique si une tâche est en cours (désactive le bouton Envoyer)."""
+        self.sink.emit("busy", value=busy)
 
-    def set_stop_button_state(self, state):
-        """Active ou désactive le bouton Interrompre"""
-        self.stop_button.config(state=state)
-        self.stop_button.update_idletasks()
+    def set_stoppable(self, stoppable):
+        """Indique si la tâche peut être interrompue (active le bouton Interrompre)."""
+        self.sink.emit("stoppable", value=stoppable)
 
     def request_stop(self):
         """ Demande l'arrêt de l'exécution """
         self._stop_requested = True
+        self.pipeline.cancel()  # Débloque les attentes des appels lancés en parallèle
         self._log_message("Demande d'interruption en cours...")
-        self.set_stop_button_state(tk.DISABLED)
+        self.set_stoppable(False)
 
-    def run(self, instruction):
-        """Analyse l'instruction et l'image, puis exécute les commandes."""
+    def _prepare_run(self, instruction):
+        """Réinitialise l'état avant une nouvelle tâche."""
         self._stop_requested = False  # Reset le flag avant d'executer
-        self.set_stop_button_state(tk.NORMAL)  # Réactiver le bouton au début de l'analyse
+        self.pipeline.reset()
+        self.set_stoppable(True)  # Réactiver le bouton au début de l'analyse
         self.current_instruction = instruction # On sauvegarde l'instruction
+
+    def run(self, instruction):
+        """Analyse l'instruction et l'image, puis exécute les commandes."""
+        self._prepare_run(instruction)
         thread = threading.Thread(target=self._run_in_thread, args=(instruction,))
         thread.start()
-        self._history = []  # Réinitialise l'historique à chaque run
+
+    def run_blocking(self, instruction):
+        """Exécute la tâche dans le thread courant et ne rend la main qu'une fois terminée (mode sans interface).
+        Retourne True si la tâche a réussi."""
+        self._prepare_run(instruction)
+        return self._run_in_thread(instruction)
 
     def _run_in_thread(self, instruction):
-        """Analyse l'instruction et l'image, puis exécute les commandes (dans un nouveau thread)."""
-        self.set_send_button_state(tk.DISABLED)  # Désactiver le bouton
+        """Analyse l'instruction et l'image, puis exécute les commandes (dans un nouveau thread).
+        Retourne True si la tâche a réussi."""
+        success = False
+        self.set_busy(True)  # Désactiver le bouton
         self.set_status("Gemini réfléchi...")
-        image_base64 = self._capture_screen()
-        self._add_to_history(instruction, image_base64) # Ajouter la capture à l'historique
-        commands = self._parse_instruction(instruction, image_base64)
-        if commands:
-            self.execute_actions(commands)
+        self.tracer.start_run(instruction)
+        frame = self._take_warm_frame() or self._capture_screen()
+        self._add_to_history(instruction, frame) # Ajouter la capture à l'historique
+        frame = self._replay_cached_plan(instruction, frame)
+        if frame is None:
+            success = not self._stop_requested  # Plan connu rejoué (ou tâche interrompue)
+        elif self.streaming and self.planning_mode == "two_pass":
+            success, commands = self._run_streaming(instruction, frame)
+            self._store_plan(instruction, frame, commands, success)
+        else:
+            commands = self._parse_instruction(instruction, frame)
+            if commands:
+                success = self.execute_actions(commands)
+                self._store_plan(instruction, frame, commands, success)
+        summary = self.tracer.end_run()
+        self._log_message("Durée par étape :\n" + format_summary(summary))
+        if self.executor.simulated:
+            self._log_message(f"Exécution simulée : {len(self.executor.events)} opérations, "
+                              f"durée estimée {self.executor.elapsed:.2f} s")
+            self.executor.reset()
+        self._log_message("Modèles par étape (depuis le lancement) :\n" + format_router_stats(self.router.stats()))
+        scheduler_stats = self.scheduler.stats()
+        if any(row["retries"] or row["throttled_s"] for row in scheduler_stats.values()):
+            self._log_message("Quotas et nouvelles tentatives (depuis le lancement) :\n" + format_scheduler_stats(scheduler_stats))
+        if self.model_calls_avoided:
+            self._log_message(f"Appels au modèle évités par la vérification locale (depuis le lancement) : {self.model_calls_avoided}")
         self.set_status("Gemini est prêt.")
-        self.set_send_button_state(tk.NORMAL)  # Réactiver le bouton
-        self.set_stop_button_state(tk.DISABLED)  # Désactiver le bouton interrompre
+        self.set_busy(False)  # Réactiver le bouton
+        self.set_stoppable(False)  # Désactiver le bouton interrompre
+        return success
+
+    def _serialize_actions(self, actions):
+        """Convertit les actions en données JSON (les touches spéciales deviennent "Key.nom")."""
+        serialized = []
+        for action in actions:
+            action = action.to_dict() if hasattr(action, "to_dict") else dict(action)
+            if isinstance(action.get("key"), Key):
+                action["key"] = f"Key.{action['key'].name}"
+            if "keys" in action:
+                action["keys"] = [[f"Key.{key.name}" if isinstance(key, Key) else key for key in stroke]
+                                  for stroke in action["keys"]]
+            serialized.append(action)
+        return serialized
+
+    def _deserialize_actions(self, actions):
+        """Inverse de _serialize_actions."""
+        def deserialize(key):
+            return self._key_from_name(key[len("Key."):]) if isinstance(key, str) and key.startswith("Key.") else key
+
+        for action in actions:
+            if "key" in action:
+                action["key"] = deserialize(action["key"])
+            if "keys" in action:
+                action["keys"] = [[deserialize(key) for key in stroke] for stroke in action["keys"]]
+        return actions
+
+    def _store_plan(self, instruction, frame, commands, success):
+        """Mémorise le plan s'il a réussi du premier coup et si sa dernière action est une capture : sans elle, rien
+        n'a vérifié le résultat."""
+        if self.plan_cache is None or not success or not commands or self.last_retry_count:
+            return
+        actions = self._serialize_actions(commands)
+        if actions[-1]["action"] != "capture_screen":
+            self._log_message("Plan non vérifié par une capture finale, il n'est pas mis en cache.")
+            return
+        self.plan_cache.put(instruction, frame.image, actions)
+
+    def _replay_cached_plan(self, instruction, frame):
+        """Rejoue le plan connu pour cette instruction et cet écran. Retourne None si la tâche est terminée,
+        sinon la capture à partir de laquelle Gemini doit planifier (pas de plan connu, ou plan en échec :
+        il est alors supprimé du cache)."""
+        if self.plan_cache is None:
+            return frame
+        key, actions = self.plan_cache.get(instruction, frame.image)
+        stats = self.plan_cache.stats()
+        if key is None:
+            return frame
+        self._log_message(f"Plan connu rejoué sans appel à Gemini (cache de plans: {stats['hits']} hits / "
+                          f"{stats['misses']} misses, taux {stats['hit_rate']:.0%})")
+        actions = self._deserialize_actions(actions)
+        if not actions or actions[-1]["action"] != "capture_screen":
+            actions.append({"action": "capture_screen"})  # Vérifie le résultat à la fin du plan rejoué
+        with self.tracer.span("plan_replay", actions=len(actions)):
+            success = self.execute_actions(actions)
+        if success and not self.last_retry_count:
+            return None
+        self.plan_cache.invalidate(key)
+        if success or self._stop_requested:
+            return None  # Gemini a corrigé le plan pendant les nouvelles tentatives, ou tâche interrompue
+        self._log_message("Le plan connu n'a pas fonctionné, il est supprimé du cache. Nouvelle analyse par Gemini...")
+        return self._capture_screen()
 
     def _recognize_speech(self, callback):
-        """Reconnaît la parole via le micro et la transforme en texte (dans un nouveau thread)."""
+        """Reconnaît la prochaine phrase dite au micro et la transforme en texte (dans un nouveau thread)."""
         thread = threading.Thread(target=self._recognize_speech_in_thread, args=(callback,))
         thread.start()
 
     def _recognize_speech_in_thread(self, callback):
-        """Reconnaît la parole via le micro et la transforme en texte (dans un nouveau thread)."""
-        r = sr.Recognizer()
-        with sr.Microphone() as source:
-            self._log_message("Parlez...")
+        """Ouvre le micro à la première utilisation (il reste ouvert, le bruit de fond n'est mesuré qu'une fois),
+        puis attend la prochaine phrase ; callback reçoit le texte reconnu ou None."""
+        if self.voice is None:
             try:
-                audio = r.listen(source, phrase_time_limit=5)
-            except sr.WaitTimeoutError:
-                self._log_message("Aucune parole détectée, veuillez réessayer.")
+                recognizer = create_recognizer(VOICE_RECOGNIZER, VOICE_LANGUAGE, model_path=VOSK_MODEL_PATH)
+            except ValueError as e:
+                self._log_message(str(e))
                 callback(None)
                 return
+            segmenter = VadSegmenter(end_silence_ms=VOICE_END_SILENCE_MS, max_phrase_s=VOICE_MAX_PHRASE)
+            self.voice = VoiceListener(recognizer, segmenter, log=self._log_message)
+        try:
+            self.voice.start()
+        except Exception as e:
+            self._log_message(f"Micro indisponible : {e}")
+            callback(None)
+            return
 
-            try:
-                self._log_message("Reconnaissance en cours...")
-                text = r.recognize_google(audio, language="fr-FR")
-                self._log_message(f"Vous avez dit : {text}")
-                callback(text)
-            except sr.UnknownValueError:
-                self._log_message("Impossible de comprendre l'audio")
-                callback(None)
-            except sr.RequestError as e:
-                self._log_message(f"Erreur lors de la requête de reconnaissance vocale: {e}")
-                callback(None)
+        def on_text(text):
+            if text:
+                self._log_message(f"Vous avez dit : {text} (reconnu {self.voice.last_latency:.2f} s après la fin de la parole)")
+            callback(text)
+
+        self._log_message("Parlez...")
+        self.voice.listen_once(on_text, VOICE_TIMEOUT)
 
 
 def load_api_key():
@@ -454,8 +1226,81 @@ def save_api_key(api_key):
         return False
 
 
+def read_instructions(path):
+    """Lit les instructions, une par ligne, d'un fichier ou de l'entrée standard ("-"), au fur et à mesure."""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    with stream:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith("#"):  # Ignore les lignes vides et les commentaires
+                yield line
+
+
+def run_headless(instructions_path, json_log=None, model_name=DEFAULT_MODEL, capture_target=CAPTURE_TARGET,
+                 executor=EXECUTOR):
+    """Exécute les instructions les unes après les autres, sans interface graphique (ex: sous Xvfb).
+    Retourne le code de sortie : 0 si toutes les tâches ont réussi, 1 sinon."""
+    api_key = os.environ.get("GEMINI_API_KEY") or load_api_key()
+    if not api_key and MODEL_BACKEND in ("gemini", "record"):
+        print("Vous devez fournir une clé API (GEMINI_API_KEY ou fichier api_key.txt).")
+        return 1
+
+    sinks = [StdoutSink()]
+    if json_log:
+        sinks.append(JsonLogSink(json_log))
+    automator = TaskAutomator(api_key, MultiSink(sinks), model_name=model_name, capture_target=capture_target,
+                              executor=executor)
+    if WARMUP:
+        automator.warm_up_async()  # Pendant la lecture de la première instruction
+
+    count = 0
+    failed = 0
+    interrupted = False
+    start = time.perf_counter()
+    try:
+        for instruction in read_instructions(instructions_path):
+            automator._log_message(f"Tâche demandée: {instruction}")
+            if not automator.run_blocking(instruction):
+                failed += 1
+            count += 1
+    except KeyboardInterrupt:
+        interrupted = True
+        automator._log_message("Exécution par lot interrompue.")
+    elapsed = time.perf_counter() - start
+    if count:
+        automator._log_message(f"{count} tâches en {elapsed:.1f} s ({count / elapsed * 3600:.0f} tâches/heure), "
+                               f"{failed} en échec")
+    return 1 if failed or interrupted else 0
+
+
+def parse_args():
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Contrôle clavier/souris par Gemini.")
+    parser.add_argument("--headless", action="store_true",
+                        help="exécute les instructions d'un fichier sans interface graphique")
+    parser.add_argument("--file", default="-",
+                        help="fichier d'instructions, une par ligne (défaut : entrée standard)")
+    parser.add_argument("--json-log", help="écrit aussi les événements en JSON lines dans ce fichier")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="modèle Gemini à utiliser")
+    parser.add_argument("--capture", default=CAPTURE_TARGET,
+                        help='zone capturée : "monitor:N", "all" ou "active_window" (défaut : %(default)s)')
+    parser.add_argument("--dry-run", action="store_true",
+                        help="simule les actions sans toucher à la souris ni au clavier (avec --headless)")
+    return parser.parse_args()
+
+
 def main():
     """Fonction principale pour la création de l'interface graphique."""
+    args = parse_args()
+    if args.headless:
+        sys.exit(run_headless(args.file, args.json_log, args.model, args.capture,
+                              "dry_run" if args.dry_run else EXECUTOR))
+
+    # Seulement pour l'interface graphique : le mode headless et les sessions n'ont pas besoin de Tk
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, messagebox, simpledialog
+    from ttkthemes import ThemedTk
+
     # Chargement de la clé API depuis le fichier
     api_key = load_api_key()
 
@@ -512,19 +1357,16 @@ def main():
     def send_instruction():
         instruction = input_entry.get()
         if instruction:
-            output_text.insert(tk.END, f"Tâche demandée: {instruction}\n")
-            output_text.see(tk.END)
+            sink.emit("log", message=f"Tâche demandée: {instruction}")
             input_entry.delete(0, tk.END)
             automator.run(instruction)
         else:
-            output_text.insert(tk.END, "Veuillez entrer une instruction\n")
-            output_text.see(tk.END)
+            sink.emit("log", message="Veuillez entrer une instruction")
 
     def use_voice_command():
         def voice_callback(instruction):
             if instruction:
-                output_text.insert(tk.END, f"Tâche demandée: {instruction}\n")
-                output_text.see(tk.END)
+                sink.emit("log", message=f"Tâche demandée: {instruction}")
                 automator.run(instruction)
 
         automator._recognize_speech(voice_callback)
@@ -560,16 +1402,15 @@ def main():
 
     # Menu déroulant pour les modèles
     model_var = tk.StringVar(root)
-    model_var.set(DEFAULT_MODEL)  # Valeur par défaut
+    model_var.set(args.model)  # Valeur par défaut
     model_dropdown = ttk.Combobox(root, textvariable=model_var, values=AVAILABLE_MODELS, state="readonly",
                                  font=(FONT_FAMILY, FONT_SIZE))
     model_dropdown.pack(pady=(0, 5))
 
     def change_model(event):
         selected_model = model_var.get()
-        automator.model = genai.GenerativeModel(selected_model)
-        output_text.insert(tk.END, f"Modèle changé pour: {selected_model}\n")
-        output_text.see(tk.END)
+        automator.set_model(selected_model)
+        sink.emit("log", message=f"Modèle changé pour: {selected_model}")
 
     model_dropdown.bind("<<ComboboxSelected>>", change_model)
 
@@ -588,18 +1429,32 @@ def main():
         background=[("active", "#81b150"), ("pressed", "#689a3d")],
     )
 
-    # Initialisation de l'automator avec le text widget, le label de status et le bouton envoyer et le bouton stop
-    automator = TaskAutomator(api_key, output_text, status_label, send_button, stop_button)
+    # Initialisation de l'automator, qui affiche ses messages et son état via le text widget, le label de status et les boutons
+    sink = TkSink(root, output_text, status_label, send_button, stop_button, max_lines=LOG_MAX_LINES,
+                  spill_path=LOG_SPILL_FILE)
+    automator = TaskAutomator(api_key, sink, model_name=args.model, capture_target=args.capture)
+
+    def track_own_window(event):
+        # La fenêtre du bot apparaît sur les captures : ses changements ne doivent pas compter comme ceux de l'écran
+        if event.widget is not root:
+            return
+        if root.state() == "iconic":
+            automator.set_own_window(None)
+        else:
+            automator.set_own_window({"left": root.winfo_rootx(), "top": root.winfo_rooty(),
+                                      "width": root.winfo_width(), "height": root.winfo_height()})
+
+    root.bind("<Configure>", track_own_window)
+    root.bind("<Unmap>", track_own_window)
+    root.bind("<Map>", track_own_window)
 
     def change_api_key():
         new_key = simpledialog.askstring("Changer clé API", "Veuillez entrer votre nouvelle clé API Gemini :")
         if new_key:
             if save_api_key(new_key):
                 messagebox.showinfo("Changement clé API", "Votre clé API a bien été enregistrée.")
-                genai.configure(api_key=new_key)
-                automator.model = genai.GenerativeModel("gemini-pro-vision")  # Recharger le model
-                output_text.insert(tk.END, f"Nouvelle clé api chargée\n")
-                output_text.see(tk.END)
+                automator.reload_models(new_key)  # Recharger les modèles avec la nouvelle clé
+                sink.emit("log", message="Nouvelle clé api chargée")
             else:
                 messagebox.showerror("Changement clé API",
                                      "Une erreur s'est produite lors de la sauvegarde de la nouvelle clé API.")
@@ -612,6 +1467,9 @@ def main():
     )
     api_key_button.pack(pady=10)
 
+    if WARMUP:
+        root.after(500, automator.warm_up_async)  # Une fois la fenêtre affichée, pour qu'elle soit sur la capture
+
     root.mainloop()
 
 
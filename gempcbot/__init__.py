@@ -0,0 +1 @@
+"""Modules utilitaires de GemPCBot (capture, cache, exécution...)."""
@@ -0,0 +1,237 @@
+"""Représentation typée des actions d'un plan, optimisation et exécuteurs (pynput ou simulation).
+
+Les parseurs et le cache de plans échangent des dictionnaires ({"action": "mouse_move", "x": 10, "y": 20}) ;
+compile_actions les convertit en actions typées et optimise la liste avant l'exécution.
+"""
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Move:
+    x: int
+    y: int
+    name = "mouse_move"
+
+    def to_dict(self):
+        return {"action": self.name, "x": self.x, "y": self.y}
+
+
+@dataclass(frozen=True)
+class Click:
+    """Clic à la position courante, ou en (x, y) si elle est donnée (déplacement et clic fusionnés)."""
+    button: str = "left"
+    x: Optional[int] = None
+    y: Optional[int] = None
+    name = "mouse_click"
+
+    def to_dict(self):
+        action = {"action": self.name, "button": self.button}
+        if self.x is not None:
+            action.update(x=self.x, y=self.y)
+        return action
+
+
+@dataclass(frozen=True)
+class Keys:
+    """Suite de frappes ; chaque frappe est un accord (touches appuyées dans l'ordre puis relâchées à l'envers)."""
+    strokes: tuple  # Ex: ((Key.ctrl, "c"), (Key.enter,))
+    name = "keyboard_press"
+
+    def to_dict(self):
+        if len(self.strokes) == 1 and len(self.strokes[0]) == 1:
+            return {"action": self.name, "key": self.strokes[0][0]}
+        return {"action": self.name, "keys": [list(stroke) for stroke in self.strokes]}
+
+
+@dataclass(frozen=True)
+class TypeText:
+    text: str
+    entry: Optional[str] = None  # Stratégie de saisie forcée ("clipboard", "chunked" ou "per_char")
+    name = "keyboard_type"
+
+    def to_dict(self):
+        action = {"action": self.name, "text": self.text}
+        if self.entry:
+            action["entry"] = self.entry
+        return action
+
+
+@dataclass(frozen=True)
+class Wait:
+    seconds: float
+    mode: Optional[str] = None  # "stable", "change" ou "fixed" (None = mode par défaut du bot)
+    name = "wait"
+
+    def to_dict(self):
+        action = {"action": self.name, "seconds": self.seconds}
+        if self.mode:
+            action["mode"] = self.mode
+        return action
+
+
+@dataclass(frozen=True)
+class Capture:
+    name = "capture_screen"
+
+    def to_dict(self):
+        return {"action": self.name}
+
+
+def from_dict(action):
+    """Convertit une action sous forme de dictionnaire en action typée. Lève KeyError/ValueError si elle est invalide."""
+    kind = action["action"]
+    if kind == "mouse_move":
+        return Move(action["x"], action["y"])
+    if kind == "mouse_click":
+        return Click(action.get("button", "left"), action.get("x"), action.get("y"))
+    if kind == "keyboard_press":
+        if "keys" in action:
+            return Keys(tuple(tuple(stroke) for stroke in action["keys"]))
+        return Keys(((action["key"],),))
+    if kind == "keyboard_type":
+        return TypeText(action["text"], action.get("entry"))
+    if kind == "wait":
+        return Wait(float(action["seconds"]), action.get("mode"))
+    if kind == "capture_screen":
+        return Capture()
+    raise ValueError(f"Action inconnue : {kind}")
+
+
+def optimize(actions):
+    """Simplifie une liste d'actions typées sans changer son effet :
+
+    - pauses consécutives de même mode fusionnées (une seule attente que l'écran se stabilise) ;
+    - déplacement suivi directement d'un autre déplacement supprimé ;
+    - déplacement suivi d'un clic fusionnés en un clic à cette position ;
+    - frappes consécutives regroupées en une seule action.
+    """
+    optimized = []
+    for action in actions:
+        previous = optimized[-1] if optimized else None
+        if isinstance(action, Wait) and isinstance(previous, Wait) and action.mode == previous.mode:
+            optimized[-1] = Wait(round(previous.seconds + action.seconds, 3), action.mode)
+        elif isinstance(action, Move) and isinstance(previous, Move):
+            optimized[-1] = action
+        elif isinstance(action, Click) and action.x is None and isinstance(previous, Move):
+            optimized[-1] = Click(action.button, previous.x, previous.y)
+        elif isinstance(action, Keys) and isinstance(previous, Keys):
+            optimized[-1] = Keys(previous.strokes + action.strokes)
+        else:
+            optimized.append(action)
+    return optimized
+
+
+def compile_actions(actions, optimized=True):
+    """Convertit les actions (dictionnaires ou actions typées) en actions typées, optimisées si optimized."""
+    compiled = [action if hasattr(action, "to_dict") else from_dict(action) for action in actions]
+    return optimize(compiled) if optimized else compiled
+
+
+class PynputExecutor:
+    """Exécute les actions sur le bureau avec les contrôleurs pynput."""
+
+    simulated = False
+
+    def __init__(self, mouse, keyboard, text_entry, settle_waiter, buttons):
+        self.mouse = mouse
+        self.keyboard = keyboard
+        self.text_entry = text_entry
+        self.settle = settle_waiter  # Attentes "stable" et "change" (ScreenSettleWaiter)
+        self.buttons = buttons  # pynput.mouse.Button
+
+    @property
+    def position(self):
+        return self.mouse.position
+
+    def move(self, x, y):
+        self.mouse.position = (x, y)
+
+    def click(self, button, x=None, y=None):
+        if x is not None:
+            self.mouse.position = (x, y)
+        self.mouse.click(self.buttons.left if button == "left" else self.buttons.right)
+
+    def keys(self, strokes):
+        for stroke in strokes:
+            for key in stroke:
+                self.keyboard.press(key)
+            for key in reversed(stroke):
+                self.keyboard.release(key)
+
+    def type_text(self, text, entry=None, target=None):
+        """Saisit le texte et retourne la stratégie de saisie utilisée."""
+        return self.text_entry.type_text(text, entry, target)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class _SimulatedSettle:
+    """Attentes de l'écran simulées : l'écran réagit après reaction_time et se stabilise aussitôt."""
+
+    def __init__(self, executor, reaction_time, quiet_window):
+        self.executor = executor
+        self.reaction_time = reaction_time
+        self.quiet_window = quiet_window
+
+    def reference(self):
+        return None
+
+    def wait_for_change(self, timeout, should_stop=None, reference=None):
+        elapsed = min(timeout, self.reaction_time)
+        self.executor.record("wait_for_change", elapsed)
+        return elapsed, elapsed < timeout
+
+    def wait_until_stable(self, timeout, should_stop=None):
+        elapsed = min(timeout, self.quiet_window)
+        self.executor.record("wait_until_stable", elapsed)
+        return elapsed, elapsed < timeout
+
+
+class DryRunExecutor:
+    """Exécuteur simulé : n'agit pas sur le bureau, enregistre chaque opération avec une durée estimée.
+
+    events : liste de (opération, arguments, durée simulée) ; elapsed : durée simulée totale (s).
+    event_time est le coût d'un événement souris ou clavier, char_time celui d'un caractère tapé."""
+
+    simulated = True
+
+    def __init__(self, event_time=0.002, char_time=0.004, reaction_time=0.2, quiet_window=0.5):
+        self.event_time = event_time
+        self.char_time = char_time
+        self.settle = _SimulatedSettle(self, reaction_time, quiet_window)
+        self.position = (0, 0)
+        self.events = []
+        self.elapsed = 0.0
+
+    def record(self, operation, duration, *args):
+        self.events.append((operation, args, duration))
+        self.elapsed += duration
+
+    def reset(self):
+        self.events = []
+        self.elapsed = 0.0
+
+    def move(self, x, y):
+        self.position = (x, y)
+        self.record("move", self.event_time, x, y)
+
+    def click(self, button, x=None, y=None):
+        events = 2  # Appui et relâchement
+        if x is not None:
+            self.position = (x, y)
+            events += 1
+        self.record("click", events * self.event_time, button, self.position)
+
+    def keys(self, strokes):
+        for stroke in strokes:
+            self.record("keys", 2 * len(stroke) * self.event_time, stroke)
+
+    def type_text(self, text, entry=None, target=None):
+        self.record("type_text", len(text) * self.char_time, text)
+        return "simulation"
+
+    def sleep(self, seconds):
+        self.record("sleep", seconds)
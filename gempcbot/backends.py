@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def _normalize_contents(contents):
+    """Sépare les parties texte et image d'une requête generate_content."""
+    if isinstance(contents, (str, dict)):
+        contents = [contents]
+    texts, images = [], []
+    for part in contents:
+        if isinstance(part, str):
+            texts.append(part)
+        elif isinstance(part, dict) and "data" in part:
+            data = part["data"]
+            images.append({"mime_type": part.get("mime_type"), "data": data})
+    return texts, images
+
+
+def image_digest(data):
+    """Empreinte sha256 (courte) d'une image encodée, en base64 ou en octets."""
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def request_keys(contents):
+    """Retourne (clé exacte, clé texte) d'une requête : la première inclut les images, la seconde seulement le texte."""
+    texts, images = _normalize_contents(contents)
+    text_key = hashlib.sha256("\x00".join(texts).encode("utf-8")).hexdigest()[:16]
+    exact_key = hashlib.sha256((text_key + "".join(image_digest(i["data"]) for i in images)).encode()).hexdigest()[:16]
+    return exact_key, text_key
+
+
+class TextResponse:
+    """Réponse minimale compatible avec celles de google.generativeai (attribut text, itérable en streaming)."""
+
+    def __init__(self, text, chunks=None):
+        self.text = text
+        self._chunks = chunks
+
+    def __iter__(self):
+        if self._chunks is None:
+            yield self
+        else:
+            yield from self._chunks
+
+
+class GeminiClient:
+    """Connexion à l'API Gemini pour une clé API, partagée par tous les modèles (voir gemini_client).
+
+    Garde un GenerativeModel par (modèle, system_instruction) : changer de modèle puis revenir au précédent ne recrée
+    rien. google.generativeai (long à importer) n'est importé qu'à la création du premier client."""
+
+    def __init__(self, api_key=None):
+        import google.generativeai as genai
+        from google.generativeai import client
+
+        self._genai = genai
+        if api_key:
+            genai.configure(api_key=api_key)
+        # Client gRPC de cette clé : un configure() pour une autre clé ne le remplace pas
+        self._service = client.get_default_generative_client()
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name, system_instruction=None):
+        with self._lock:
+            model = self._models.get((model_name, system_instruction))
+            if model is None:
+                model = self._genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                model._client = self._service  # Sinon le modèle prendrait le client par défaut (dernière clé configurée)
+                self._models[(model_name, system_instruction)] = model
+            return model
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def gemini_client(api_key=None):
+    """Client Gemini de la clé API, créé une seule fois puis réutilisé (changement de modèle ou de clé)."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = GeminiClient(api_key)
+            _clients[api_key] = client
+        return client
+
+
+class GeminiBackend:
+    """Appelle directement l'API Gemini.
+
+    system_instruction (consignes fixes, non renvoyées dans le texte de chaque requête) est passé au modèle :
+    un GenerativeModel est gardé par system_instruction, dans le client partagé de la clé API.
+    timeout (secondes) limite la durée de la requête."""
+
+    def __init__(self, model_name, api_key=None):
+        self.client = gemini_client(api_key)
+        self.model_name = model_name
+
+    def _model_for(self, system_instruction):
+        return self.client.model(self.model_name, system_instruction)
+
+    def generate_content(self, contents, system_instruction=None, timeout=None, **kwargs):
+        if timeout is not None:
+            kwargs["request_options"] = {"timeout": timeout}
+        return self._model_for(system_instruction).generate_content(contents, **kwargs)
+
+    def warm_up(self, timeout=10):
+        """Crée le client et ouvre la connexion à l'API avec un appel count_tokens (non facturé)."""
+        self._model_for(None).count_tokens("ping", request_options={"timeout": timeout})
+
+
+class RecordingStream:
+    """Réponse en streaming d'un RecordingBackend : transmet chaque morceau dès qu'il arrive et enregistre l'échange
+    à la fin du flux (un flux interrompu n'est pas enregistré). Les autres attributs sont ceux de la réponse d'origine
+    (usage_metadata, _iterator pour annuler le flux...)."""
+
+    def __init__(self, response, on_complete):
+        self._response = response
+        self._on_complete = on_complete
+        self._chunks = []
+
+    def __iter__(self):
+        for chunk in self._response:
+            try:
+                self._chunks.append(chunk.text)
+            except ValueError:
+                pass  # Morceau sans texte
+            yield chunk
+        self._on_complete("".join(self._chunks))
+
+    @property
+    def text(self):
+        """Texte reçu jusqu'ici."""
+        return "".join(self._chunks)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class RecordingBackend:
+    """Appelle un autre backend et enregistre chaque échange (prompt, empreintes d'images, réponse) dans une cassette."""
+
+    def __init__(self, inner, cassette_path):
+        self.inner = inner
+        self.model_name = inner.model_name
+        self.cassette_path = cassette_path
+        self._lock = threading.Lock()
+
+    def _record(self, contents, kwargs, text, latency):
+        texts, images = _normalize_contents(contents)
+        exact_key, text_key = request_keys(contents)
+        entry = {
+            "model": self.model_name,
+            "key": exact_key,
+            "text_key": text_key,
+            "system_instruction": kwargs.get("system_instruction"),
+            "prompt": texts,
+            "images": [{"mime_type": i["mime_type"], "sha256": image_digest(i["data"])} for i in images],
+            "stream": bool(kwargs.get("stream")),
+            "structured": kwargs.get("generation_config") is not None,
+            "response": text,
+            "latency": latency,
+        }
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def warm_up(self, timeout=10):
+        warm_up = getattr(self.inner, "warm_up", None)
+        if warm_up is not None:
+            warm_up(timeout)
+
+    def generate_content(self, contents, **kwargs):
+        start = time.perf_counter()
+        response = self.inner.generate_content(contents, **kwargs)
+        if not kwargs.get("stream"):
+            self._record(contents, kwargs, response.text, time.perf_counter() - start)
+            return response
+        return RecordingStream(response, lambda text: self._record(contents, kwargs, text, time.perf_counter() - start))
+
+
+class ReplayBackend:
+    """Rejoue les réponses d'une cassette, sans réseau, avec une latence synthétique.
+
+    Une requête est associée à l'enregistrement de même prompt et mêmes images, sinon de même prompt,
+    sinon au prochain enregistrement non rejoué (dans l'ordre de la cassette)."""
+
+    def __init__(self, cassette_path, latency=None, latency_scale=1.0, chunk_size=40, model_name="replay"):
+        self.model_name = model_name
+        self.latency = latency  # Latence fixe en secondes (None = latence enregistrée)
+        self.latency_scale = latency_scale
+        self.chunk_size = chunk_size  # Taille des morceaux rejoués en streaming
+        self._lock = threading.Lock()
+        with open(cassette_path, "r", encoding="utf-8") as f:
+            self._entries = [json.loads(line) for line in f if line.strip()]
+        self._used = [False] * len(self._entries)
+
+    def _match(self, contents):
+        exact_key, text_key = request_keys(contents)
+        with self._lock:
+            for field, key in (("key", exact_key), ("text_key", text_key)):
+                for index, entry in enumerate(self._entries):
+                    if not self._used[index] and entry.get(field) == key:
+                        self._used[index] = True
+                        return entry
+            for index, entry in enumerate(self._entries):
+                if not self._used[index]:
+                    self._used[index] = True
+                    return entry
+        raise LookupError("Cassette épuisée : aucune réponse enregistrée pour cette requête.")
+
+    def generate_content(self, contents, timeout=None, **kwargs):
+        entry = self._match(contents)
+        latency = self.latency if self.latency is not None else entry.get("latency", 0.0)
+        latency *= self.latency_scale
+        text = entry["response"]
+        if not kwargs.get("stream"):
+            time.sleep(latency)
+            return TextResponse(text)
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+
+        def chunks():
+            for piece in pieces:
+                time.sleep(latency / len(pieces))
+                yield TextResponse(piece)
+
+        return TextResponse(text, chunks())
+
+
+class HttpBackend:
+    """Envoie les requêtes à un serveur HTTP local qui se fait passer pour Gemini.
+
+    Requête POST {url} avec {"model", "prompt": [...], "images": [...], "system_instruction", "stream", "structured"},
+    réponse {"text": "..."}. Les erreurs HTTP (429 avec Retry-After, 503...) sont levées telles quelles (HTTPError)."""
+
+    def __init__(self, url, model_name, timeout=60):
+        self.url = url
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def generate_content(self, contents, timeout=None, **kwargs):
+        import urllib.request
+
+        texts, images = _normalize_contents(contents)
+        payload = json.dumps({
+            "model": self.model_name,
+            "prompt": texts,
+            "images": images,
+            "system_instruction": kwargs.get("system_instruction"),
+            "stream": bool(kwargs.get("stream")),
+            "structured": kwargs.get("generation_config") is not None,
+        }).encode("utf-8")
+        request = urllib.request.Request(self.url, data=payload, headers={"Content-Type": "application/json"})
+        timeout = self.timeout if timeout is None else min(self.timeout, timeout)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            text = json.loads(response.read().decode("utf-8"))["text"]
+        return TextResponse(text, [TextResponse(line + "\n") for line in text.split("\n")])
+
+
+def create_backend(kind, model_name, cassette_path=None, url=None, replay_latency=None, api_key=None):
+    """Crée le backend de modèle demandé : "gemini", "record", "replay" ou "http"."""
+    if kind == "gemini":
+        return GeminiBackend(model_name, api_key)
+    if kind == "record":
+        return RecordingBackend(GeminiBackend(model_name, api_key), cassette_path)
+    if kind == "replay":
+        if not cassette_path or not os.path.exists(cassette_path):
+            raise ValueError(f"Cassette introuvable : {cassette_path}")
+        return ReplayBackend(cassette_path, latency=replay_latency, model_name=model_name)
+    if kind == "http":
+        return HttpBackend(url, model_name)
+    raise ValueError(f"Backend de modèle inconnu : {kind}")
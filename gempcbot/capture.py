@@ -0,0 +1,162 @@
+import base64
+import io
+import threading
+from dataclasses import dataclass
+
+from gempcbot.screen_diff import mask_boxes, thumbnail
+from gempcbot.windows import active_window_rect, clip_rect
+
+# Formats d'encodage supportés et leur type mime
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+@dataclass
+class CapturedFrame:
+    """Capture d'écran encodée, avec les infos pour revenir aux coordonnées réelles."""
+    image: "Image.Image"  # Image PIL (éventuellement réduite) envoyée au modèle
+    data: bytes  # Image encodée
+    mime_type: str
+    scale: float  # Taille de l'image envoyée / taille réelle de la zone capturée
+    left: int = 0  # Position de la zone capturée sur le bureau
+    top: int = 0
+    ignore: tuple = ()  # Rectangles (x1, y1, x2, y2) de l'image à ne pas comparer (fenêtre du bot)
+
+    @property
+    def base64(self):
+        """Retourne l'image encodée en base64."""
+        return base64.b64encode(self.data).decode("utf-8")
+
+    def to_screen(self, x, y):
+        """Convertit des coordonnées de l'image envoyée en coordonnées écran."""
+        return int(round(self.left + x / self.scale)), int(round(self.top + y / self.scale))
+
+    def to_image(self, x, y):
+        """Convertit des coordonnées écran en coordonnées de l'image envoyée."""
+        return (x - self.left) * self.scale, (y - self.top) * self.scale
+
+
+def resize_to_long_edge(img, max_long_edge):
+    """Réduit l'image pour que son plus grand côté ne dépasse pas max_long_edge. Retourne (image, échelle)."""
+    long_edge = max(img.size)
+    if not max_long_edge or long_edge <= max_long_edge:
+        return img, 1.0
+    from PIL import Image  # Importé à la première utilisation, comme mss
+
+    scale = max_long_edge / long_edge
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(new_size, Image.LANCZOS, reducing_gap=3.0), scale
+
+
+def encode_image(img, image_format="PNG", quality=85):
+    """Encode une image PIL dans le format demandé et retourne (données, type mime)."""
+    image_format = image_format.upper()
+    if image_format not in MIME_TYPES:
+        raise ValueError(f"Format d'image non supporté : {image_format}")
+    buffered = io.BytesIO()
+    if image_format == "PNG":
+        img.save(buffered, format="PNG", compress_level=1)  # La compression max coûte cher pour peu de gain
+    else:
+        img.save(buffered, format=image_format, quality=quality)
+    return buffered.getvalue(), MIME_TYPES[image_format]
+
+
+def parse_capture_target(target):
+    """Analyse une cible de capture : "monitor:N" (N à partir de 1), "all" (tous les moniteurs) ou "active_window".
+    Retourne (type, numéro du moniteur ou None)."""
+    if target in ("all", "active_window"):
+        return target, None
+    kind, _, index = str(target).partition(":")
+    if kind == "monitor" and index.isdigit() and int(index) >= 1:
+        return "monitor", int(index)
+    raise ValueError(f"Cible de capture inconnue : {target} (monitor:N, all ou active_window)")
+
+
+class ScreenCapturer:
+    """Capture l'écran avec un grabber mss persistant, puis réduit et encode l'image.
+
+    target choisit la zone capturée : un moniteur ("monitor:N"), tous les moniteurs assemblés ("all") ou la fenêtre
+    au premier plan ("active_window", repli sur le moniteur principal si elle est introuvable). La position de
+    la zone est gardée dans chaque CapturedFrame pour convertir les coordonnées du modèle en coordonnées écran.
+    ignore_rect est un rectangle du bureau à exclure des comparaisons entre captures (la fenêtre du bot)."""
+
+    def __init__(self, image_format="PNG", quality=85, max_long_edge=None, target="monitor:1"):
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.max_long_edge = max_long_edge
+        self.target, self.monitor_index = parse_capture_target(target)
+        self.ignore_rect = None  # {"left", "top", "width", "height"} en coordonnées du bureau, ou None
+        # mss n'est pas utilisable d'un thread à l'autre (Windows), on garde un grabber par thread
+        self._local = threading.local()
+
+    def _grabber(self):
+        """Retourne le grabber mss du thread courant, en le créant au besoin."""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss  # Importé à la première capture
+
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def region(self, sct=None):
+        """Zone capturée {"left", "top", "width", "height"} en coordonnées du bureau."""
+        sct = sct or self._grabber()
+        if self.target == "all":
+            return dict(sct.monitors[0])  # Rectangle qui englobe tous les moniteurs
+        if self.target == "active_window":
+            rect = active_window_rect()
+            rect = clip_rect(rect, sct.monitors[0]) if rect else None
+            return rect or dict(sct.monitors[1])
+        if self.monitor_index >= len(sct.monitors):
+            raise ValueError(f"Moniteur {self.monitor_index} introuvable ({len(sct.monitors) - 1} moniteur(s))")
+        return dict(sct.monitors[self.monitor_index])
+
+    def ignore_boxes(self, monitor, scale=1.0):
+        """Rectangles (x1, y1, x2, y2) à ne pas comparer, en pixels d'une capture de la zone monitor à l'échelle scale."""
+        rect = self.ignore_rect
+        rect = clip_rect(rect, monitor) if rect else None
+        if rect is None:
+            return ()
+        x1, y1 = (rect["left"] - monitor["left"]) * scale, (rect["top"] - monitor["top"]) * scale
+        return ((x1, y1, x1 + rect["width"] * scale, y1 + rect["height"] * scale),)
+
+    def grab(self):
+        """Capture la zone cible et retourne (image RGB pleine résolution, zone capturée)."""
+        sct = self._grabber()
+        monitor = self.region(sct)
+        # mss attend un dict left/top/width/height (un tuple serait lu comme left, top, right, bottom)
+        sct_img = sct.grab(monitor)
+        from PIL import Image
+
+        img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
+        return img, monitor
+
+    def grab_thumbnail(self, max_edge=160):
+        """Capture la zone cible en basse résolution et niveaux de gris, pour détecter les changements
+        (la zone ignore_rect est masquée)."""
+        img, monitor = self.grab()
+        small = thumbnail(img, max_edge)
+        return mask_boxes(small, self.ignore_boxes(monitor), small.width / img.width)
+
+    def encode(self, img, monitor):
+        """Réduit et encode une capture pleine résolution en CapturedFrame."""
+        img, scale = resize_to_long_edge(img, self.max_long_edge)
+        data, mime_type = encode_image(img, self.image_format, self.quality)
+        return CapturedFrame(img, data, mime_type, scale, monitor["left"], monitor["top"],
+                             self.ignore_boxes(monitor, scale))
+
+    def capture(self):
+        """Capture la zone cible et retourne un CapturedFrame encodé."""
+        img, monitor = self.grab()
+        return self.encode(img, monitor)
+
+    def close(self):
+        """Ferme le grabber du thread courant."""
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
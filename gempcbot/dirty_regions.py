@@ -0,0 +1,89 @@
+import threading
+
+from gempcbot.element_index import bounding_box
+from gempcbot.screen_diff import change_mask, mask_boxes
+
+# Résultats de DirtyRegionTracker.plan
+FULL = "full"  # Analyser toute la capture
+SAME = "same"  # Rien n'a changé : les éléments connus sont toujours valables
+REGION = "region"  # Analyser seulement la zone modifiée
+
+
+def offset_elements(elements, dx, dy):
+    """Décale les bounding_box d'éléments analysés sur une zone découpée vers les coordonnées de la capture entière."""
+    shifted = []
+    for element in elements:
+        box = bounding_box(element)
+        if box is None:
+            continue
+        element = dict(element)
+        x1, y1, x2, y2 = (int(round(v)) for v in box)
+        element["bounding_box"] = {"x1": x1 + dx, "y1": y1 + dy, "x2": x2 + dx, "y2": y2 + dy}
+        shifted.append(element)
+    return shifted
+
+
+def merge_elements(base_elements, region_elements, box):
+    """Remplace les éléments dont le centre est dans la zone box par ceux analysés sur cette zone."""
+    x1, y1, x2, y2 = box
+    kept = []
+    for element in base_elements:
+        element_box = bounding_box(element)
+        if element_box is not None:
+            cx, cy = (element_box[0] + element_box[2]) / 2, (element_box[1] + element_box[3]) / 2
+            if x1 <= cx <= x2 and y1 <= cy <= y2:
+                continue
+        kept.append(element)
+    return kept + list(region_elements)
+
+
+class DirtyRegionTracker:
+    """Garde la dernière capture analysée et ses éléments, et trouve la zone qui a changé depuis.
+
+    La capture est découpée en tuiles de tile pixels ; la zone à analyser est l'union des tuiles modifiées,
+    élargie de margin_tiles tuiles. Au-delà de max_ratio de la surface de l'écran, il vaut mieux tout analyser.
+    Les zones ignorées (fenêtre du bot) ne rendent aucune tuile modifiée."""
+
+    def __init__(self, tile=64, tolerance=16, margin_tiles=1, max_ratio=0.5):
+        self.tile = tile
+        self.tolerance = tolerance
+        self.margin_tiles = margin_tiles
+        self.max_ratio = max_ratio
+        self._base = None  # (image en niveaux de gris, vision_data)
+        self._lock = threading.Lock()
+
+    def update(self, image, vision_data):
+        """Mémorise la capture analysée et ses éléments (sur toute la capture)."""
+        if not vision_data or not isinstance(vision_data.get("elements"), list):
+            return
+        with self._lock:
+            self._base = (image.convert("L"), vision_data)
+
+    def clear(self):
+        with self._lock:
+            self._base = None
+
+    def plan(self, image, ignore=()):
+        """Retourne (FULL, None, None), (SAME, None, vision_data) ou (REGION, (x1, y1, x2, y2), vision_data).
+        ignore : rectangles (x1, y1, x2, y2) de la capture à ne pas comparer."""
+        with self._lock:
+            base = self._base
+        if base is None or base[0].size != image.size:
+            return FULL, None, None
+        from PIL import Image
+
+        base_image, vision_data = base
+        mask = change_mask(mask_boxes(base_image, ignore), mask_boxes(image.convert("L"), ignore),
+                           self.tolerance).convert("L")
+        cols, rows = -(-image.width // self.tile), -(-image.height // self.tile)
+        tiles = mask.resize((cols, rows), Image.BOX, reducing_gap=None).point(lambda v: 255 if v else 0)
+        dirty = tiles.getbbox()
+        if dirty is None:
+            return SAME, None, vision_data
+        c1, r1, c2, r2 = dirty
+        c1, r1 = max(0, c1 - self.margin_tiles), max(0, r1 - self.margin_tiles)
+        c2, r2 = min(cols, c2 + self.margin_tiles), min(rows, r2 + self.margin_tiles)
+        box = (c1 * self.tile, r1 * self.tile, min(c2 * self.tile, image.width), min(r2 * self.tile, image.height))
+        if (box[2] - box[0]) * (box[3] - box[1]) > self.max_ratio * image.width * image.height:
+            return FULL, None, None
+        return REGION, box, vision_data
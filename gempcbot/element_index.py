@@ -0,0 +1,125 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_text(text):
+    """Normalise un texte pour la recherche : sans accents, en minuscules, sans ponctuation."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", text.casefold()).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounding_box(element):
+    """Retourne (x1, y1, x2, y2) de l'élément, ou None si sa bounding_box est absente ou invalide."""
+    box = element.get("bounding_box") if isinstance(element, dict) else None
+    if not isinstance(box, dict):
+        return None
+    try:
+        x1, y1, x2, y2 = (float(box[key]) for key in ("x1", "y1", "x2", "y2"))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+class ElementIndex:
+    """Index des éléments d'une analyse de vision : recherche par texte (approchée, sans accents)
+    et par position (grille de cellules sur les bounding_box)."""
+
+    def __init__(self, elements, cell_size=64):
+        self.elements = [element for element in elements or [] if isinstance(element, dict)]
+        self.cell_size = cell_size
+        self._texts = []  # Texte normalisé de chaque élément
+        self._boxes = []
+        self._exact = {}  # texte normalisé -> éléments
+        self._tokens = {}  # mot -> éléments
+        self._trigram_index = {}  # trigramme -> éléments
+        self._grid = {}  # (colonne, ligne) -> éléments
+        for i, element in enumerate(self.elements):
+            text = normalize_text(element.get("text", ""))
+            self._texts.append(text)
+            if text:
+                self._exact.setdefault(text, []).append(i)
+                for token in text.split():
+                    self._tokens.setdefault(token, set()).add(i)
+                for trigram in _trigrams(text):
+                    self._trigram_index.setdefault(trigram, set()).add(i)
+            box = bounding_box(element)
+            self._boxes.append(box)
+            if box is not None:
+                for cell in self._cells(box):
+                    self._grid.setdefault(cell, []).append(i)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def _cells(self, box):
+        x1, y1, x2, y2 = box
+        size = self.cell_size
+        for col in range(int(x1 // size), int(x2 // size) + 1):
+            for row in range(int(y1 // size), int(y2 // size) + 1):
+                yield col, row
+
+    def _area(self, i):
+        box = self._boxes[i]
+        if box is None:
+            return float("inf")
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    def find(self, label, min_score=0.6, max_candidates=16):
+        """Retourne l'élément dont le texte correspond le mieux à label, ou None.
+
+        Ordre de préférence : texte identique (après normalisation), puis élément contenant tous les mots
+        (le texte le plus court), puis correspondance approchée (fautes de frappe) parmi les max_candidates
+        éléments qui partagent le plus de trigrammes. À égalité, l'élément le plus petit gagne."""
+        query = normalize_text(label)
+        if not query:
+            return None
+        exact = self._exact.get(query)
+        if exact:
+            return self.elements[min(exact, key=self._area)]
+
+        query_tokens = set(query.split())
+        # Éléments qui contiennent tous les mots : plus le texte est court, plus il est proche de la demande
+        postings = [self._tokens.get(token) for token in query_tokens]
+        if all(postings):
+            matches = set.intersection(*postings)
+            if matches:
+                best = max(matches, key=lambda i: (len(query) / max(len(self._texts[i]), len(query)), -self._area(i)))
+                return self.elements[best]
+
+        # Sinon correspondance approchée, limitée aux éléments qui partagent le plus de trigrammes
+        counts = {}
+        for trigram in _trigrams(query):
+            for i in self._trigram_index.get(trigram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:max_candidates]
+        best, best_key = None, None
+        for i in candidates:
+            score = SequenceMatcher(None, query, self._texts[i]).ratio()
+            key = (score, -self._area(i))
+            if score >= min_score and (best_key is None or key > best_key):
+                best, best_key = i, key
+        return self.elements[best] if best is not None else None
+
+    def hit_test(self, x, y):
+        """Retourne les éléments qui contiennent le point (x, y), du plus petit au plus grand."""
+        cell = (int(x // self.cell_size), int(y // self.cell_size))
+        hits = []
+        for i in self._grid.get(cell, ()):
+            x1, y1, x2, y2 = self._boxes[i]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                hits.append(i)
+        return [self.elements[i] for i in sorted(hits, key=self._area)]
+
+    def element_at(self, x, y):
+        """Retourne l'élément le plus précis (le plus petit) sous le point (x, y), ou None."""
+        hits = self.hit_test(x, y)
+        return hits[0] if hits else None
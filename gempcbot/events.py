@@ -0,0 +1,151 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+# Événements émis par TaskAutomator :
+#   "log"      message=str    message pour l'utilisateur
+#   "status"   text=str       état de Gemini ("Gemini réfléchi...", "Gemini est prêt.")
+#   "busy"     value=bool     une tâche est en cours (bouton Envoyer désactivé)
+#   "stoppable" value=bool    la tâche peut être interrompue (bouton Interrompre actif)
+
+
+class StdoutSink:
+    """Affiche les messages et les changements de statut sur la sortie standard."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event, **data):
+        if event == "log":
+            line = data["message"]
+        elif event == "status":
+            line = f"[{data['text']}]"
+        else:
+            return
+        with self._lock:
+            self.stream.write(f"{time.strftime('%H:%M:%S')} {line}\n")
+            self.stream.flush()
+
+
+class JsonLogSink:
+    """Écrit chaque événement sur une ligne JSON (horodatée) dans un fichier."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event, **data):
+        record = {"ts": time.time(), "event": event}
+        record.update(data)
+        with self._lock:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class MultiSink:
+    """Transmet chaque événement à plusieurs sinks."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def emit(self, event, **data):
+        for sink in self.sinks:
+            sink.emit(event, **data)
+
+
+def rotating_file_logger(path, max_bytes=5_000_000, backup_count=3):
+    """Crée un logger qui écrit les messages bruts dans un fichier tournant."""
+    logger = logging.getLogger(f"gempcbot.spill.{path}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+
+class TkSink:
+    """Affiche les événements dans l'interface Tk.
+
+    Les événements peuvent venir de n'importe quel thread : ils passent par une file
+    vidée par lots par la boucle Tk (after), seul le thread principal touche aux widgets.
+    La zone de texte garde au plus max_lines lignes ; spill_path garde l'historique complet dans un fichier tournant."""
+
+    def __init__(self, root, output_text, status_label, send_button, stop_button, poll_interval_ms=50,
+                 max_lines=5000, max_batch=2000, spill_path=None):
+        self.root = root
+        self.output_text = output_text
+        self.status_label = status_label
+        self.send_button = send_button
+        self.stop_button = stop_button
+        self.poll_interval_ms = poll_interval_ms
+        self.max_lines = max_lines  # Nombre max de lignes gardées dans la zone de texte (None = illimité)
+        self.max_batch = max_batch  # Nombre max d'événements appliqués par passage, pour ne pas figer l'interface
+        self._spill = rotating_file_logger(spill_path) if spill_path else None
+        self._queue = queue.Queue()
+        self.root.after(self.poll_interval_ms, self._drain)
+
+    def emit(self, event, **data):
+        if event == "log" and self._spill is not None:
+            self._spill.info(data["message"])
+        self._queue.put((event, data))
+
+    def _drain(self):
+        """Applique les événements en attente aux widgets (thread principal), les messages en un seul insert."""
+        pending_lines = []
+        try:
+            for _ in range(self.max_batch):
+                event, data = self._queue.get_nowait()
+                if event == "log":
+                    pending_lines.append(data["message"])
+                else:
+                    self._flush_lines(pending_lines)  # Garde l'ordre entre messages et changements d'état
+                    pending_lines = []
+                    self._apply(event, data)
+        except queue.Empty:
+            pass
+        finally:
+            try:
+                self._flush_lines(pending_lines)
+            finally:
+                # Replanifié même si un widget lève une erreur, sinon plus rien ne s'afficherait.
+                # S'il reste des événements, on repasse tout de suite (la boucle Tk traite les autres événements entre deux)
+                delay = 1 if not self._queue.empty() else self.poll_interval_ms
+                self.root.after(delay, self._drain)
+
+    def _flush_lines(self, lines):
+        """Ajoute des lignes à la zone de texte et supprime les plus anciennes au-delà de max_lines."""
+        if not lines:
+            return
+        import tkinter as tk  # Importé ici : les autres sorties servent sans Tk (mode headless, sessions)
+
+        if self.max_lines is not None and len(lines) > self.max_lines:
+            lines = lines[-self.max_lines:]
+        self.output_text.insert(tk.END, "\n".join(lines) + "\n")
+        if self.max_lines is not None:
+            line_count = int(self.output_text.index("end-1c").split(".")[0]) - 1
+            excess = line_count - self.max_lines
+            if excess > 0:
+                self.output_text.delete("1.0", f"{excess + 1}.0")
+        self.output_text.see(tk.END)  # Pour que la dernière ligne soit visible.
+
+    def _apply(self, event, data):
+        import tkinter as tk
+
+        if event == "status":
+            self.status_label.config(text=data["text"])
+        elif event == "busy":
+            self.send_button.config(state=tk.DISABLED if data["value"] else tk.NORMAL)
+        elif event == "stoppable":
+            self.stop_button.config(state=tk.NORMAL if data["value"] else tk.DISABLED)
@@ -0,0 +1,198 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_ACTION_CHARS = 40  # Les arguments d'action plus longs sont tronqués dans le résumé
+MAX_ACTIONS_PER_STEP = 8  # Au-delà, les actions d'une étape sont résumées par "..."
+
+
+def frame_digest(img):
+    """Empreinte du contenu exact d'une capture (adresse de la capture sur le disque)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def describe_action(action, target=None):
+    """Description courte d'une action, dictionnaire ou action typée ("mouse_click left", "keyboard_type 'Bonjour'"...),
+    avec l'élément visé s'il est connu ("mouse_click left sur « OK »"). Une description déjà faite est gardée telle quelle."""
+    if isinstance(action, str):
+        return action
+    if hasattr(action, "to_dict"):
+        action = action.to_dict()
+    parts = [str(action.get("action", "?"))]
+    for name, value in action.items():
+        if name == "action":
+            continue
+        text = repr(value) if isinstance(value, str) else str(value)
+        parts.append(text if len(text) <= MAX_ACTION_CHARS else text[:MAX_ACTION_CHARS - 3] + "...")
+    if target:
+        target = " ".join(str(target).split())
+        parts.append(f"sur « {target if len(target) <= MAX_ACTION_CHARS else target[:MAX_ACTION_CHARS - 3] + '...'} »")
+    return " ".join(parts)
+
+
+class ScreenHistory:
+    """Historique borné des étapes d'exécution (instruction, actions, résultat, capture).
+
+    Les captures complètes sont écrites sur le disque en PNG dans directory, une seule fois par contenu
+    (nom de fichier = empreinte du contenu), par un thread d'écriture qui calcule aussi l'empreinte ;
+    au-delà de max_frames fichiers, les plus anciens sont supprimés. En mémoire ne restent que les max_steps
+    dernières étapes, avec une vignette JPEG de thumbnail_edge pixels. Sans directory, seules les vignettes sont gardées."""
+
+    def __init__(self, directory=None, max_steps=50, thumbnail_edge=256, max_frames=500, thumbnail_quality=70):
+        self.directory = directory
+        self.max_steps = max_steps
+        self.thumbnail_edge = thumbnail_edge
+        self.max_frames = max_frames
+        self.thumbnail_quality = thumbnail_quality
+        self.frames_written = 0
+        self.frames_deduplicated = 0
+        self._steps = deque(maxlen=max_steps)
+        self._count = 0  # Nombre total d'étapes enregistrées
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history") if directory else None
+
+    def _frame_path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".png")
+
+    def _thumbnail(self, img):
+        from PIL import Image  # Importé à la première utilisation
+
+        small = img.convert("RGB")
+        small.thumbnail((self.thumbnail_edge, self.thumbnail_edge), Image.BILINEAR)
+        buffer = io.BytesIO()
+        small.save(buffer, format="JPEG", quality=self.thumbnail_quality)
+        return buffer.getvalue()
+
+    def record(self, instruction, img, actions=(), outcome=None):
+        """Ajoute une étape : la capture img prise après les actions. Retourne l'étape enregistrée
+        (son empreinte "frame" est renseignée par le thread d'écriture)."""
+        step = {
+            "time": time.time(),
+            "instruction": instruction,
+            "actions": [describe_action(action) for action in actions],
+            "outcome": outcome,
+            "frame": None,
+            "size": img.size,
+            "thumbnail": self._thumbnail(img),
+        }
+        with self._lock:
+            self._count += 1
+            step["index"] = self._count
+            self._steps.append(step)
+        if self._writer is not None:
+            self._writer.submit(self._write_frame, step, img.copy())
+        return step
+
+    def set_outcome(self, outcome):
+        """Renseigne le résultat de la dernière étape (après la vérification par le modèle)."""
+        with self._lock:
+            if self._steps:
+                self._steps[-1]["outcome"] = outcome
+
+    def _write_frame(self, step, img):
+        digest = frame_digest(img)
+        with self._lock:
+            step["frame"] = digest
+        path = self._frame_path(digest)
+        try:
+            if os.path.exists(path):
+                os.utime(path)  # Déjà sur le disque : la capture redevient la plus récente
+                self.frames_deduplicated += 1
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            img.save(tmp_path, format="PNG", compress_level=6)
+            os.replace(tmp_path, path)
+            self.frames_written += 1
+            self._prune()
+        except OSError as e:
+            print(f"Erreur lors de l'écriture de l'historique des captures : {e}")
+
+    def _prune(self):
+        """Supprime les captures les plus anciennes au-delà de max_frames (dans le thread d'écriture)."""
+        if self.max_frames is None:
+            return
+        files = []
+        for sub in os.scandir(self.directory):
+            if sub.is_dir():
+                files.extend((entry.stat().st_mtime, entry.path) for entry in os.scandir(sub.path)
+                             if entry.name.endswith(".png"))
+        if len(files) <= self.max_frames:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.max_frames]:
+            os.remove(path)
+
+    def load_frame(self, digest):
+        """Capture complète d'une étape, ou None si elle n'est pas (ou plus) sur le disque."""
+        if not self.directory or digest is None:
+            return None
+        from PIL import Image
+
+        try:
+            with Image.open(self._frame_path(digest)) as img:
+                return img.convert("RGB")
+        except OSError:
+            return None
+
+    def steps(self, count=None):
+        """Copie des count dernières étapes (toutes par défaut), de la plus ancienne à la plus récente."""
+        with self._lock:
+            steps = list(self._steps)
+        return steps if count is None else steps[-count:] if count > 0 else []
+
+    def summary(self, count=5):
+        """Résumé texte des count dernières étapes, une ligne par étape numérotée de la plus ancienne à la plus récente,
+        pour le prompt de planification. Ni heure ni âge : les mêmes étapes donnent le même texte (cache du prompt,
+        enregistrement et rejeu des appels)."""
+        lines = []
+        for number, step in enumerate(self.steps(count), 1):
+            actions = step["actions"][:MAX_ACTIONS_PER_STEP]
+            if len(step["actions"]) > MAX_ACTIONS_PER_STEP:
+                actions.append("...")
+            line = f"- étape {number} | tâche: {step['instruction']} | "
+            line += f"actions: {'; '.join(actions)}" if actions else "capture initiale"
+            if step["outcome"]:
+                line += f" | résultat: {step['outcome']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def thumbnails(self, count, skip_latest=True):
+        """Vignettes JPEG des count étapes précédentes (sans la dernière, dont la capture complète est déjà envoyée)."""
+        steps = self.steps()
+        if skip_latest:
+            steps = steps[:-1]
+        return [step["thumbnail"] for step in steps[-count:]] if count > 0 else []
+
+    def clear(self):
+        """Oublie les étapes en mémoire (les captures restent sur le disque)."""
+        with self._lock:
+            self._steps.clear()
+
+    def stats(self):
+        """Retourne les compteurs de l'historique."""
+        with self._lock:
+            steps = list(self._steps)
+        return {
+            "steps": len(steps),
+            "recorded": self._count,
+            "thumbnail_bytes": sum(len(step["thumbnail"]) for step in steps),
+            "frames_written": self.frames_written,
+            "frames_deduplicated": self.frames_deduplicated,
+        }
+
+    def flush(self):
+        """Attend la fin des écritures en cours."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
@@ -0,0 +1,61 @@
+from gempcbot.screen_diff import changed_ratio, changed_regions, mask_boxes, thumbnail
+
+# Verdicts de la vérification locale
+UNCHANGED = "unchanged"  # L'écran n'a pas changé : les actions n'ont rien fait
+EXPECTED_CHANGE = "expected_change"  # L'écran a changé là où on l'attendait
+INCONCLUSIVE = "inconclusive"  # Il faut demander au modèle
+
+
+class LocalVerifier:
+    """Vérification locale d'une suite d'actions, en comparant les captures d'avant et d'après.
+
+    Si presque aucun pixel n'a changé (moins de unchanged_ratio des vignettes, et rien autour des points cliqués en
+    pleine résolution, où une case cochée se voit même si elle disparaît dans une vignette), les actions n'ont rien
+    fait. Si une zone modifiée touche le voisinage (margin pixels) d'un point cliqué, ou si l'écran a changé après
+    des actions sans clic (touches, saisie), le changement est celui attendu. Sinon le résultat est incertain. Les
+    zones ignorées (fenêtre du bot, dont le journal change à chaque message) ne comptent pas."""
+
+    def __init__(self, unchanged_ratio=0.0005, margin=40, tolerance=16, max_edge=320):
+        self.unchanged_ratio = unchanged_ratio
+        self.margin = margin  # En pixels des captures
+        self.tolerance = tolerance  # Écart de niveau de gris en dessous duquel un pixel est considéré inchangé
+        self.max_edge = max_edge  # Taille des vignettes comparées
+
+    def compare(self, before, after, expected_points=(), ignore=()):
+        """Compare deux captures (images PIL de même géométrie).
+
+        expected_points : points cliqués, ignore : rectangles (x1, y1, x2, y2) à ne pas comparer, en pixels des
+        captures. Retourne (verdict, proportion de pixels modifiés, zones modifiées en pixels des captures)."""
+        before_small = thumbnail(before, self.max_edge)
+        after_small = thumbnail(after, self.max_edge)
+        if ignore:
+            before_small = mask_boxes(before_small, ignore, before_small.width / before.width)
+            after_small = mask_boxes(after_small, ignore, after_small.width / after.width)
+        ratio = changed_ratio(before_small, after_small, self.tolerance)
+        if ratio < self.unchanged_ratio:
+            regions = [region for point in expected_points
+                       for region in self._changed_near(before, after, point, ignore)]
+            return (EXPECTED_CHANGE if regions else UNCHANGED), ratio, regions
+        scale = before.width / before_small.width
+        regions = [tuple(v * scale for v in region)
+                   for region in changed_regions(before_small, after_small, self.tolerance)]
+        if not expected_points:
+            return EXPECTED_CHANGE, ratio, regions
+        for x, y in expected_points:
+            for x1, y1, x2, y2 in regions:
+                if x1 - self.margin <= x <= x2 + self.margin and y1 - self.margin <= y <= y2 + self.margin:
+                    return EXPECTED_CHANGE, ratio, regions
+        return INCONCLUSIVE, ratio, regions
+
+    def _changed_near(self, before, after, point, ignore=()):
+        """Zones modifiées à moins de margin pixels du point, comparées en pleine résolution (pixels des captures)."""
+        x, y = point
+        box = (max(0, int(x - self.margin)), max(0, int(y - self.margin)),
+               min(before.width, int(x + self.margin) + 1), min(before.height, int(y + self.margin) + 1))
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return []
+        shifted = [(x1 - box[0], y1 - box[1], x2 - box[0], y2 - box[1]) for x1, y1, x2, y2 in ignore]
+        before_crop = mask_boxes(before.crop(box).convert("L"), shifted)
+        after_crop = mask_boxes(after.crop(box).convert("L"), shifted)
+        return [(x1 + box[0], y1 + box[1], x2 + box[0], y2 + box[1])
+                for x1, y1, x2, y2 in changed_regions(before_crop, after_crop, self.tolerance)]
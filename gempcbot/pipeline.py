@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class PipelineCancelled(Exception):
+    """La tâche a été interrompue pendant l'attente d'un résultat."""
+
+
+class InferencePipeline:
+    """Exécute en parallèle les étapes indépendantes d'une tâche (analyse de vision, vérification, encodage...).
+
+    Les appels au modèle bloquent sur le réseau : un pool de threads suffit à les faire se chevaucher.
+    cancel() annule les étapes pas encore commencées et débloque les attentes en cours ; les appels déjà partis
+    vont à leur terme mais leur résultat est ignoré."""
+
+    def __init__(self, max_workers=4, poll_interval=0.05):
+        self.poll_interval = poll_interval  # Délai entre deux vérifications de l'interruption pendant une attente
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._pending = set()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Prépare une nouvelle tâche (après un cancel)."""
+        self._cancelled.clear()
+
+    def submit(self, fn, *args, **kwargs):
+        """Lance fn(*args, **kwargs) dans le pool et retourne son Future."""
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def result(self, future, should_stop=None):
+        """Attend le résultat du Future. Lève PipelineCancelled si la tâche est interrompue entre-temps."""
+        while True:
+            if self._cancelled.is_set() or (should_stop is not None and should_stop()):
+                raise PipelineCancelled()
+            done, _ = wait([future], timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            if done:
+                return future.result()
+
+    def cancel(self):
+        """Annule les étapes en attente et débloque les appels à result()."""
+        self._cancelled.set()
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,134 @@
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from gempcbot.element_index import normalize_text
+from gempcbot.vision_cache import dhash, hamming_distance
+
+
+class PlanCache:
+    """Cache persistant des plans d'actions réussis, indexé par instruction normalisée et empreinte grossière de l'écran.
+
+    Éviction LRU au-delà de max_entries et expiration après ttl secondes."""
+
+    def __init__(self, path=None, max_entries=200, ttl=7 * 24 * 3600, max_distance=10, hash_size=8):
+        self.path = path  # Fichier de persistance (None = cache en mémoire uniquement)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance  # Distance de Hamming max entre empreintes d'écran
+        self.hash_size = hash_size  # Empreinte volontairement grossière (8x8 = 64 bits)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # (instruction normalisée, empreinte) -> {"actions", "created", "uses"}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def fingerprint(self, img):
+        """Empreinte grossière de l'écran."""
+        return dhash(img, self.hash_size)
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry["created"] > self.ttl
+
+    def _find_key(self, instruction, fingerprint, now):
+        """Clé de l'entrée valide la plus proche pour cette instruction (appelé avec le verrou)."""
+        best_key, best_distance = None, None
+        for key in list(self._entries):
+            entry_instruction, entry_fingerprint = key
+            if entry_instruction != instruction:
+                continue
+            if self._expired(self._entries[key], now):
+                del self._entries[key]
+                continue
+            distance = hamming_distance(fingerprint, entry_fingerprint)
+            if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                best_key, best_distance = key, distance
+        return best_key
+
+    def get(self, instruction, img):
+        """Retourne (clé, actions) du plan connu pour cette instruction et cet écran, ou (None, None)."""
+        instruction = normalize_text(instruction)
+        fingerprint = self.fingerprint(img)
+        with self._lock:
+            key = self._find_key(instruction, fingerprint, time.time())
+            if key is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            entry = self._entries[key]
+            entry["uses"] += 1
+            self._entries.move_to_end(key)
+            return key, copy.deepcopy(entry["actions"])
+
+    def put(self, instruction, img, actions):
+        """Enregistre le plan réussi d'une instruction pour cet écran."""
+        key = (normalize_text(instruction), self.fingerprint(img))
+        with self._lock:
+            self._entries[key] = {"actions": copy.deepcopy(actions), "created": time.time(), "uses": 0}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self.stores += 1
+        if self.path:
+            self.save()
+
+    def invalidate(self, key):
+        """Supprime un plan qui n'a pas fonctionné."""
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self.invalidations += 1
+        if removed and self.path:
+            self.save()
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def save(self):
+        """Sauvegarde le cache sur le disque."""
+        with self._lock:
+            entries = [
+                {"instruction": instruction, "fingerprint": format(fingerprint, "x"), **entry}
+                for (instruction, fingerprint), entry in self._entries.items()
+            ]
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"hash_size": self.hash_size, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Erreur lors de la sauvegarde du cache de plans : {e}")
+
+    def load(self):
+        """Charge le cache depuis le disque s'il existe (les entrées expirées sont ignorées)."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Erreur lors du chargement du cache de plans : {e}")
+            return
+        if saved.get("hash_size") != self.hash_size:
+            return
+        now = time.time()
+        with self._lock:
+            for entry in saved.get("entries", [])[-self.max_entries:]:
+                key = (entry.pop("instruction"), int(entry.pop("fingerprint"), 16))
+                if not self._expired(entry, now):
+                    self._entries[key] = entry
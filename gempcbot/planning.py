@@ -0,0 +1,94 @@
+"""Mode de planification en un seul appel : éléments de l'interface et actions dans une même réponse JSON."""
+
+from gempcbot.prompts import encode_elements, history_section
+
+# Types d'actions acceptés dans la réponse structurée
+ACTION_TYPES = ["move_mouse", "click_mouse", "press_key", "type_text", "wait", "capture_screen"]
+
+BOUNDING_BOX_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "x1": {"type": "integer"},
+        "y1": {"type": "integer"},
+        "x2": {"type": "integer"},
+        "y2": {"type": "integer"},
+    },
+    "required": ["x1", "y1", "x2", "y2"],
+}
+
+ELEMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {"type": "string"},
+        "text": {"type": "string"},
+        "bounding_box": BOUNDING_BOX_SCHEMA,
+    },
+    "required": ["text", "bounding_box"],
+}
+
+ACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ACTION_TYPES},
+        "x": {"type": "integer"},
+        "y": {"type": "integer"},
+        "button": {"type": "string", "enum": ["left", "right"]},
+        "target": {"type": "string"},
+        "key": {"type": "string"},
+        "text": {"type": "string"},
+        "entry": {"type": "string", "enum": ["auto", "clipboard", "chunked", "per_char"]},
+        "seconds": {"type": "number"},
+        "mode": {"type": "string", "enum": ["stable", "change", "fixed"]},
+    },
+    "required": ["action"],
+}
+
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reasoning": {"type": "string"},
+        "elements": {"type": "array", "items": ELEMENT_SCHEMA},
+        "actions": {"type": "array", "items": ACTION_SCHEMA},
+    },
+    "required": ["elements", "actions"],
+}
+
+FUSED_SYSTEM_INSTRUCTION = """
+Tu es un assistant expert en automatisation d'interface graphique. Ton but est d'exécuter une instruction en interagissant avec l'interface.
+On te donne l'instruction et une capture d'écran.
+
+En une seule réponse JSON :
+1. Dans "elements", détecte tous les éléments de l'interface graphique visibles sur la capture, avec leur texte et leur bounding_box (x1, y1, x2, y2 en pixels de l'image).
+2. Dans "reasoning", explique brièvement ton raisonnement.
+3. Dans "actions", donne la liste ordonnée des actions à exécuter.
+
+Priorise toujours les interactions avec l'interface (clics, mouvements de souris) avant la frappe au clavier.
+**Si tu dois lancer un programme, ouvre le menu Démarrer avec press_key key="cmd", tape le nom du programme avec type_text puis valide avec press_key key="enter".**
+Après avoir lancé le programme, interagit directement avec son interface pour faire ce que l'on te demande.
+Une fois ta tâche terminée, ne fait rien de plus.
+Rajoute une action wait après avoir interagi avec l'interface graphique, surtout si tu viens d'ouvrir une application ou un menu, et après chaque press_key enter.
+
+Les actions possibles sont:
+    - move_mouse (x, y): Déplace le curseur aux coordonnées de l'image.
+    - click_mouse (button, et soit target soit x, y): Clique. target est le texte exact d'un élément de "elements", on cliquera en son centre.
+    - press_key (key): Appuie sur une touche spéciale comme enter, esc ou cmd (touche windows). Pour un raccourci, sépare les touches par + (ex: ctrl+c).
+    - type_text (text, entry optionnel): Tape du texte, uniquement dans les champs de texte. Laisse entry à "auto" sauf si le champ perd des caractères ("per_char").
+    - wait (seconds, mode optionnel): Pause d'au plus seconds secondes, dont tu choisis la durée selon le contexte. Par défaut on attend que l'écran soit stable ; mode "change" attend que l'écran change (ex: apparition d'une fenêtre), mode "fixed" attend toute la durée.
+    - capture_screen: Prend une capture d'écran pour vérifier le résultat ou réévaluer la situation.
+
+Si on te donne les éléments de la capture précédente (tableau id|type|texte|x1,y1,x2,y2), mets-les à jour.
+Si tu ne peux pas déterminer les actions à faire, retourne une liste d'actions vide.
+"""
+
+
+def build_fused_prompt(instruction, vision_data=None, retry_message=None, token_budget=None, history=None,
+                       history_frames=0):
+    """Partie variable du prompt du mode de planification en un seul appel (consignes dans FUSED_SYSTEM_INSTRUCTION)."""
+    prompt = f"Instruction: {instruction}\n" + history_section(history, history_frames)
+    if vision_data:
+        table, kept, total = encode_elements(vision_data, instruction, token_budget)
+        if table:
+            prompt += f"\nÉléments de la capture précédente ({kept}/{total}) :\n{table}\n"
+    if retry_message:
+        prompt += f"\nL'action précédente n'a pas fonctionné, voici l'erreur: {retry_message}. Essaye à nouveau.\n"
+    return prompt
@@ -0,0 +1,162 @@
+"""Construction des prompts : instructions fixes (system_instruction), éléments de l'interface
+en tableau compact et réduits aux plus pertinents pour l'instruction, comptage des tokens."""
+from gempcbot.element_index import bounding_box, normalize_text
+
+PLANNING_SYSTEM_INSTRUCTION = """
+Tu es un assistant expert en automatisation d'interface graphique. Ton but est d'exécuter une instruction en interagissant avec l'interface.
+On te donne l'instruction, une capture d'écran et les éléments de l'interface détectés sur la capture.
+
+Tu dois retourner une liste d'actions textuelles, une action par ligne.
+Priorise toujours les interactions avec l'interface (clics, mouvements de souris) avant la frappe au clavier.
+Si tu dois lancer un programme, **ouvre toujours le menu Démarrer en appuyant sur la touche windows, utilise type_text pour taper le nom du programme, puis appuie sur la touche enter pour valider.**
+Après avoir lancé le programme, interagit directement avec son interface pour faire ce que l'on te demande.
+Une fois ta tâche terminée, ne fait rien de plus.
+Rajoute une pause après avoir interagi avec l'interface graphique, surtout si tu viens d'ouvrir une application ou un menu.
+Ajoute une pause après une action `press_key enter`.
+Quand tu dois cliquer sur un élément, utilise les éléments de l'interface pour déterminer les coordonnées précises de l'élément et clique au centre de celui-ci.
+
+Les éléments sont donnés sous forme de tableau, une ligne par élément : id|type|texte|x1,y1,x2,y2 (bounding box en pixels de l'image).
+
+Les types d'actions possibles sont:
+    - 'move_mouse x y': Déplace le curseur.
+    - 'click_mouse button': Simule un clic de souris à la position courante. button peut être "left" ou "right".
+    - 'click_element texte': Clique au centre de l'élément dont le texte est texte. Si tu vois un élément de l'interface qui semble cliquable, utilise `click_element`.
+    - 'press_key key': Simule l'appui sur une touche du clavier. Utilise `press_key` pour les touches spéciales comme `enter`, `esc` ou `cmd`. Utilise 'cmd' pour la touche windows. Pour un raccourci, sépare les touches par + (ex: `press_key ctrl+c`).
+    - 'type_text text': Simule la frappe de texte. Utilise `type_text` uniquement dans les champs de texte ou pour saisir du texte libre.
+    - 'wait seconds': Mets le programme en pause. Tu dois choisir la durée de la pause (en secondes) en fonction du contexte. La pause s'arrête plus tôt si l'écran est stable.
+    - 'wait_for_change seconds': Attend que l'écran change (ex: ouverture d'une fenêtre), au plus seconds secondes.
+    - 'capture_screen': Prend une capture d'écran.
+
+Utilise 'capture_screen' quand :
+    - Tu as exécuté des actions et tu veux vérifier le résultat
+    - Tu ne comprends pas l'état de l'interface
+    - Tu soupçonnes un problème
+
+Si l'action précédente n'a pas fonctionné, explique brièvement pourquoi et prends une capture d'écran pour réévaluer la situation.
+Retourne les actions une par ligne. Si tu ne peux pas determiner les actions à faire, ne retourne rien.
+
+Par exemple, si tu dois cliquer sur un bouton qui contient le texte "Ouvrir", tu dois retourner l'action 'click_element Ouvrir'.
+Si tu dois écrire ton nom dans un champ texte, tu dois utiliser l'action 'type_text <ton nom>'.
+**Si tu dois lancer un programme, ouvre le menu Démarrer en appuyant sur la touche windows, tape le nom du programme avec type_text puis valides avec la touche enter.**
+
+Explique ton raisonnement avant de prendre une capture d'écran.
+"""
+
+VERIFICATION_SYSTEM_INSTRUCTION = """
+On te donne une instruction qui a été exécutée sur un ordinateur et, après son exécution, la capture d'écran
+ou les éléments de l'interface graphique (tableau id|type|texte|x1,y1,x2,y2).
+Dis si l'action a bien fonctionnée ou non. Si ce n'est pas le cas donne une raison de l'échec, sinon ne dis rien.
+Réponds par du texte uniquement, ne fait pas de code ou de json.
+"""
+
+# Types d'éléments sur lesquels on agit le plus souvent : prioritaires à pertinence égale
+INTERACTIVE_TYPES = ("button", "bouton", "menu", "input", "field", "champ", "text_field", "textbox", "link", "lien",
+                     "icon", "icone", "tab", "onglet", "checkbox", "case", "combobox", "list", "item")
+
+MAX_TEXT_LENGTH = 80  # Les textes plus longs sont tronqués dans le tableau
+
+
+def estimate_tokens(text):
+    """Estimation grossière du nombre de tokens d'un texte (environ 4 caractères par token)."""
+    return (len(text) + 3) // 4
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def relevance(element, query_tokens, query_trigrams):
+    """Score de pertinence d'un élément pour l'instruction (mots et trigrammes communs, type interactif)."""
+    text = normalize_text(element.get("text", ""))
+    element_type = normalize_text(element.get("type", ""))
+    score = 0.0
+    if text:
+        tokens = set(text.split())
+        score += 3.0 * len(tokens & query_tokens) / len(tokens)
+        trigrams = _trigrams(text)
+        if trigrams and query_trigrams:
+            score += len(trigrams & query_trigrams) / len(trigrams)
+        score += 0.2
+    if any(kind in element_type for kind in INTERACTIVE_TYPES):
+        score += 0.5
+    return score
+
+
+def _encode_row(index, element):
+    box = bounding_box(element)
+    box_text = ",".join(str(int(round(v))) for v in box) if box else ""
+    text = " ".join(str(element.get("text", "")).split())[:MAX_TEXT_LENGTH].replace("|", "/")
+    element_type = " ".join(str(element.get("type", "")).split()).replace("|", "/")
+    return f"{index}|{element_type}|{text}|{box_text}"
+
+
+def encode_elements(vision_data, instruction="", token_budget=None):
+    """Encode les éléments de l'interface en tableau compact (id|type|texte|x1,y1,x2,y2).
+
+    Avec token_budget, seuls les éléments les plus pertinents pour l'instruction sont gardés, dans l'ordre d'origine.
+    Retourne (texte, nombre d'éléments gardés, nombre total d'éléments)."""
+    elements = vision_data.get("elements", []) if isinstance(vision_data, dict) else []
+    rows = [(i, _encode_row(i, element)) for i, element in enumerate(elements) if isinstance(element, dict)]
+    if token_budget is not None and rows:
+        query = normalize_text(instruction)
+        query_tokens, query_trigrams = set(query.split()), _trigrams(query)
+        ranked = sorted(rows, key=lambda row: -relevance(elements[row[0]], query_tokens, query_trigrams))
+        kept, used = set(), 0
+        for i, row in ranked:
+            cost = estimate_tokens(row) + 1
+            if used + cost > token_budget:
+                continue  # Un élément plus court peut encore tenir dans le budget
+            kept.add(i)
+            used += cost
+        rows = [row for row in rows if row[0] in kept]
+    return "\n".join(row for _, row in rows), len(rows), len(elements)
+
+
+def _elements_section(vision_data, instruction, token_budget):
+    table, kept, total = encode_elements(vision_data, instruction, token_budget)
+    header = f"Éléments de l'interface ({kept}/{total}" + (", les plus pertinents" if kept < total else "") + ") :"
+    return f"{header}\n{table}" if table else "Aucun élément détecté.", kept, total
+
+
+def history_section(history, frames=0):
+    """Section du prompt qui résume les étapes précédentes (résumé de ScreenHistory.summary)."""
+    if not history:
+        return ""
+    section = f"\nÉtapes précédentes (de la plus ancienne à la plus récente) :\n{history}\n"
+    if frames:
+        section += f"Les {frames} captures précédentes sont jointes en basse résolution, avant la capture actuelle.\n"
+    return section
+
+
+def build_planning_prompt(instruction, vision_data, retry_message=None, token_budget=None, history=None,
+                          history_frames=0):
+    """Partie variable du prompt de planification (les consignes sont dans PLANNING_SYSTEM_INSTRUCTION).
+    Retourne (prompt, éléments gardés, éléments total)."""
+    section, kept, total = _elements_section(vision_data, instruction, token_budget)
+    prompt = f"Instruction: {instruction}\n{history_section(history, history_frames)}\n{section}\n"
+    if retry_message:
+        prompt += f"\nL'action précédente n'a pas fonctionné, voici l'erreur: {retry_message}. Essaye à nouveau.\n"
+    return prompt, kept, total
+
+
+def build_verification_prompt(instruction, vision_data, token_budget=None):
+    """Partie variable du prompt de vérification (les consignes sont dans VERIFICATION_SYSTEM_INSTRUCTION).
+    Sans vision_data, la vérification se fait sur la capture d'écran jointe."""
+    if vision_data is None:
+        return f"Instruction exécutée: {instruction}\n\nCapture d'écran après exécution jointe.\n"
+    section, _, _ = _elements_section(vision_data, instruction, token_budget)
+    return f"Instruction exécutée: {instruction}\n\n{section}\n"
+
+
+def token_usage(response, prompt_text):
+    """Retourne (tokens du prompt, tokens de la réponse, estimé) : usage_metadata de Gemini si disponible,
+    sinon estimation sur le texte (backends de rejeu, serveur local)."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) if usage is not None else None
+    if prompt_tokens:
+        return prompt_tokens, getattr(usage, "candidates_token_count", 0) or 0, False
+    try:
+        text = response.text or ""
+    except (AttributeError, ValueError):
+        text = ""
+    return estimate_tokens(prompt_text), estimate_tokens(text), True
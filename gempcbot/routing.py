@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import deque
+
+from gempcbot.scheduler import request_tokens
+from gempcbot.tracing import percentile
+
+STAGES = ("vision", "planning", "verification")
+
+# Prix indicatifs en dollars par million de tokens (entrée, sortie), à ajuster selon la grille tarifaire en vigueur
+MODEL_PRICES = {
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+}
+
+
+class ModelRouter:
+    """Choisit le modèle de chaque étape (vision, planification, vérification).
+
+    routes donne le modèle de chaque étape (les étapes absentes utilisent default_model) et fallbacks le modèle
+    de repli. On passe au modèle de repli si l'appel échoue, ou d'office si le p95 glissant de l'étape dépasse
+    p95_threshold secondes ; un appel sur probe_every retourne alors au modèle principal pour réévaluer sa latence.
+    Avec un scheduler (RequestScheduler), les appels respectent les quotas de chaque modèle et sont retentés en cas
+    d'erreur passagère avant de passer au repli, le tout avant l'échéance du scheduler."""
+
+    def __init__(self, factory, default_model, routes=None, fallbacks=None, p95_threshold=None, window=20,
+                 min_samples=5, probe_every=10, prices=None, scheduler=None):
+        self.factory = factory  # model_name -> backend avec generate_content
+        self.default_model = default_model
+        self.routes = dict(routes or {})
+        self.fallbacks = dict(fallbacks or {})
+        self.p95_threshold = p95_threshold  # None = pas de repli sur la latence
+        self.window = window
+        self.min_samples = min_samples
+        self.probe_every = probe_every
+        self.prices = MODEL_PRICES if prices is None else prices
+        self.scheduler = scheduler
+        self._backends = {}
+        self._latencies = {}  # (étape, modèle) -> dernières durées d'appel
+        self._stats = {}  # (étape, modèle) -> compteurs
+        self._demoted_calls = {}  # étape -> appels envoyés au repli depuis le dernier essai du modèle principal
+        self._lock = threading.Lock()
+
+    def set_default_model(self, model_name):
+        """Change le modèle des étapes sans route (choix du menu déroulant)."""
+        self.default_model = model_name
+
+    def clear_backends(self):
+        """Oublie les backends créés (ex: après un changement de clé API), ils seront recréés au prochain appel."""
+        with self._lock:
+            self._backends = {}
+
+    def warm_up(self, stages=("vision", "planning", "verification"), timeout=10):
+        """Crée les backends des modèles principaux des étapes et ouvre leur connexion (backends qui le permettent).
+        Retourne les noms des modèles préparés."""
+        models = []
+        for stage in stages:
+            model_name = self.model_for(stage)
+            if model_name in models:
+                continue
+            warm_up = getattr(self.backend(model_name), "warm_up", None)
+            if warm_up is not None:
+                warm_up(timeout)
+            models.append(model_name)
+        return models
+
+    def model_for(self, stage):
+        """Modèle principal de l'étape."""
+        return self.routes.get(stage) or self.default_model
+
+    def backend(self, model_name):
+        """Backend du modèle (créé au premier appel puis réutilisé)."""
+        with self._lock:
+            backend = self._backends.get(model_name)
+            if backend is None:
+                backend = self.factory(model_name)
+                self._backends[model_name] = backend
+            return backend
+
+    def _counters(self, stage, model_name):
+        return self._stats.setdefault((stage, model_name), {
+            "calls": 0, "errors": 0, "fallbacks": 0, "latency": 0.0, "prompt_tokens": 0, "output_tokens": 0})
+
+    def rolling_p95(self, stage, model_name):
+        """p95 des dernières durées d'appel de l'étape avec ce modèle, None s'il y a trop peu de mesures."""
+        with self._lock:
+            values = list(self._latencies.get((stage, model_name), ()))
+        return percentile(values, 95) if len(values) >= self.min_samples else None
+
+    def _order(self, stage):
+        """Modèles à essayer pour l'étape, dans l'ordre."""
+        primary = self.model_for(stage)
+        fallback = self.fallbacks.get(stage)
+        if not fallback or fallback == primary:
+            return [primary]
+        p95 = self.rolling_p95(stage, primary)
+        if self.p95_threshold is not None and p95 is not None and p95 > self.p95_threshold:
+            with self._lock:
+                demoted = self._demoted_calls.get(stage, 0) + 1
+                self._demoted_calls[stage] = demoted % self.probe_every
+            if demoted < self.probe_every:
+                return [fallback, primary]
+        return [primary, fallback]
+
+    def _record(self, stage, model_name, elapsed, error=False, fallback=False):
+        with self._lock:
+            counters = self._counters(stage, model_name)
+            counters["calls"] += 1
+            counters["errors"] += int(error)
+            counters["fallbacks"] += int(fallback)
+            counters["latency"] += elapsed
+            if not error:
+                self._latencies.setdefault((stage, model_name), deque(maxlen=self.window)).append(elapsed)
+
+    def record_usage(self, stage, model_name, prompt_tokens, output_tokens):
+        """Ajoute les tokens d'un appel aux compteurs (pour le coût)."""
+        with self._lock:
+            counters = self._counters(stage, model_name)
+            counters["prompt_tokens"] += prompt_tokens
+            counters["output_tokens"] += output_tokens
+
+    def generate_content(self, stage, contents, **kwargs):
+        """Appelle le modèle de l'étape, avec repli en cas d'erreur. Retourne (réponse, nom du modèle utilisé).
+
+        En streaming, la durée mesurée est celle de l'ouverture du flux (de la dernière tentative, sans les attentes
+        du quota), et seule l'ouverture du flux est retentée."""
+        primary = self.model_for(stage)
+        deadline = None
+        if self.scheduler is not None and self.scheduler.deadline is not None:
+            deadline = time.monotonic() + self.scheduler.deadline  # Commune au modèle principal et au repli
+        error = None
+        for model_name in self._order(stage):
+            backend = self.backend(model_name)
+            attempt_start = [time.perf_counter()]
+
+            def attempt(timeout):
+                attempt_start[0] = time.perf_counter()
+                return backend.generate_content(contents, timeout=timeout, **kwargs)
+
+            try:
+                if self.scheduler is None:
+                    response = backend.generate_content(contents, **kwargs)
+                else:
+                    tokens = request_tokens(contents, kwargs.get("system_instruction"))
+                    response = self.scheduler.call(model_name, attempt, tokens, deadline)
+            except Exception as e:
+                self._record(stage, model_name, time.perf_counter() - attempt_start[0], error=True,
+                             fallback=model_name != primary)
+                error = e
+                continue
+            self._record(stage, model_name, time.perf_counter() - attempt_start[0], fallback=model_name != primary)
+            return response, model_name
+        raise error
+
+    def cost(self, model_name, prompt_tokens, output_tokens):
+        """Coût estimé en dollars."""
+        input_price, output_price = self.prices.get(model_name, (0.0, 0.0))
+        return (prompt_tokens * input_price + output_tokens * output_price) / 1e6
+
+    def stats(self):
+        """Compteurs par (étape, modèle) avec p50/p95 glissants et coût estimé."""
+        with self._lock:
+            stats = {key: dict(counters) for key, counters in self._stats.items()}
+            latencies = {key: list(values) for key, values in self._latencies.items()}
+        for (stage, model_name), counters in stats.items():
+            values = latencies.get((stage, model_name), [])
+            counters["p50"] = percentile(values, 50)
+            counters["p95"] = percentile(values, 95)
+            counters["cost"] = self.cost(model_name, counters["prompt_tokens"], counters["output_tokens"])
+        return stats
+
+
+def format_router_stats(stats):
+    """Met en forme les compteurs du routeur sous forme de tableau texte."""
+    lines = [f"{'étape':<13} {'modèle':<24} {'appels':>6} {'erreurs':>7} {'replis':>6} {'p50 (s)':>8} {'p95 (s)':>8} "
+             f"{'tokens':>9} {'coût ($)':>9}"]
+    for (stage, model_name), row in sorted(stats.items()):
+        lines.append(f"{stage:<13} {model_name:<24} {row['calls']:>6} {row['errors']:>7} {row['fallbacks']:>6} "
+                     f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['prompt_tokens'] + row['output_tokens']:>9} "
+                     f"{row['cost']:>9.4f}")
+    total = sum(row["cost"] for row in stats.values())
+    lines.append(f"coût total estimé : {total:.4f} $")
+    return "\n".join(lines)
@@ -0,0 +1,277 @@
+"""Planification des appels au modèle : limite de débit par modèle, nouvelles tentatives et échéance.
+
+Chaque modèle a deux seaux à jetons (requêtes par minute et tokens par minute) : un appel attend que les deux
+permettent son envoi, au lieu d'être refusé par l'API. Les erreurs de quota (429) et les erreurs passagères (5xx,
+réseau) sont retentées avec une attente exponentielle aléatoire, ou la durée indiquée par l'API (Retry-After,
+retry_delay) ; après un 429, les autres appels au même modèle attendent aussi.
+"""
+import random
+import re
+import threading
+import time
+
+from gempcbot.prompts import estimate_tokens
+
+# Quotas indicatifs de l'offre gratuite de l'API Gemini (requêtes/min, tokens/min), à ajuster selon votre offre
+FREE_TIER_LIMITS = {
+    "gemini-2.0-flash-exp": (10, 4_000_000),
+    "gemini-2.0-flash-thinking-exp-1219": (10, 4_000_000),
+    "gemini-1.5-pro": (2, 32_000),
+    "gemini-1.5-flash": (15, 1_000_000),
+    "gemini-1.5-flash-8b": (15, 1_000_000),
+}
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+IMAGE_TOKENS = 258  # Tokens comptés par Gemini pour une image (approximation : une seule tuile)
+RETRY_HINT_PATTERNS = (
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)"),
+)
+
+
+class RequestDeadlineExceeded(TimeoutError):
+    """L'appel n'a pas pu aboutir avant son échéance (attente du quota ou nouvelles tentatives comprises)."""
+
+
+class RequestCancelled(Exception):
+    """La tâche a été interrompue pendant l'attente du quota ou d'une nouvelle tentative."""
+
+
+def request_tokens(contents, system_instruction=None):
+    """Estimation des tokens d'entrée d'une requête generate_content (texte, consignes et images)."""
+    if isinstance(contents, (str, dict)):
+        contents = [contents]
+    tokens = estimate_tokens(system_instruction or "")
+    for part in contents:
+        tokens += estimate_tokens(part) if isinstance(part, str) else IMAGE_TOKENS
+    return tokens
+
+
+def retry_hint(error):
+    """Retourne (erreur à retenter, attente demandée par l'API en secondes ou None)."""
+    status = getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "status", None)
+    if isinstance(status, int):
+        retryable = status in RETRYABLE_STATUS
+    else:
+        retryable = isinstance(error, OSError)  # Connexion refusée ou coupée, délai dépassé...
+    headers = getattr(error, "headers", None)
+    if headers is not None and headers.get("Retry-After"):
+        try:
+            return retryable, float(headers.get("Retry-After"))
+        except ValueError:
+            pass  # Date HTTP : on garde l'attente exponentielle
+    message = str(error)
+    for pattern in RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return retryable, float(match.group(1))
+    return retryable, None
+
+
+def is_rate_limit(error):
+    return getattr(error, "code", None) == 429 or getattr(error, "status", None) == 429
+
+
+class TokenBucket:
+    """Seau de capacity jetons, rempli à rate jetons par seconde. reserve() prend les jetons tout de suite
+    (le niveau peut devenir négatif) et retourne l'attente avant de pouvoir les utiliser : les appels sont servis
+    dans l'ordre de réservation."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _cost(self, amount):
+        return min(amount, max(self.capacity, 1))  # Une requête plus grosse que le seau n'attend pas indéfiniment
+
+    def reserve(self, amount, now):
+        self._refill(now)
+        self.level -= self._cost(amount)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount):
+        self.level = min(self.capacity, self.level + self._cost(amount))
+
+
+class ModelLimiter:
+    """Limite de débit d'un modèle : requêtes et tokens par période (une minute), et pause imposée après un 429."""
+
+    def __init__(self, rpm=None, tpm=None, period=60.0):
+        self.requests = TokenBucket(rpm / period, rpm) if rpm else None
+        self.tokens = TokenBucket(tpm / period, tpm) if tpm else None
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens, deadline=None):
+        """Réserve un appel de tokens tokens et retourne l'attente (s) avant de l'envoyer.
+        Lève RequestDeadlineExceeded (sans rien réserver) si l'attente dépasse l'échéance."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.blocked_until - now)
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            if deadline is not None and now + wait > deadline:
+                self._refund(tokens)
+                raise RequestDeadlineExceeded(f"quota du modèle atteint, envoi possible dans {wait:.1f} s")
+            return wait
+
+    def _refund(self, tokens):
+        if self.requests is not None:
+            self.requests.refund(1)
+        if self.tokens is not None:
+            self.tokens.refund(tokens)
+
+    def refund(self, tokens):
+        """Rend la réservation d'un appel qui n'a finalement pas été envoyé."""
+        with self._lock:
+            self._refund(tokens)
+
+    def block(self, seconds):
+        """Suspend les appels pendant seconds secondes (après un refus pour quota)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RequestScheduler:
+    """Envoie les appels au modèle en respectant les quotas de chaque modèle, avec nouvelles tentatives.
+
+    limits donne (requêtes/min, tokens/min) par modèle (None pour ne pas limiter l'un des deux, modèles absents
+    non limités) ; period change la durée de référence des quotas (tests). Un appel est tenté au plus max_attempts
+    fois, attentes comprises avant deadline secondes. should_stop interrompt les attentes (RequestCancelled) ;
+    on_retry(modèle, erreur, attente, tentative) est appelé avant chaque nouvelle tentative."""
+
+    def __init__(self, limits=None, max_attempts=4, base_delay=1.0, max_delay=30.0, deadline=60.0,
+                 should_stop=None, on_retry=None, poll_interval=0.1, period=60.0):
+        self.limits = dict(limits or {})
+        self.period = period
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline  # None = pas d'échéance
+        self.should_stop = should_stop
+        self.on_retry = on_retry
+        self.poll_interval = poll_interval
+        self._limiters = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Oublie l'état des quotas (ex: après un changement de clé API)."""
+        with self._lock:
+            self._limiters = {}
+
+    def limiter(self, model_name):
+        with self._lock:
+            limiter = self._limiters.get(model_name)
+            if limiter is None:
+                limiter = ModelLimiter(*self.limits.get(model_name, (None, None)), period=self.period)
+                self._limiters[model_name] = limiter
+            return limiter
+
+    def _count(self, model_name, **increments):
+        with self._lock:
+            counters = self._stats.setdefault(model_name, {
+                "calls": 0, "attempts": 0, "retries": 0, "rate_limited": 0, "failures": 0, "throttled_s": 0.0,
+                "backoff_s": 0.0})
+            for name, value in increments.items():
+                counters[name] += value
+
+    def _sleep(self, seconds):
+        end = time.monotonic() + seconds
+        while True:
+            if self.should_stop is not None and self.should_stop():
+                raise RequestCancelled()
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.poll_interval, remaining))
+
+    def backoff(self, attempt, hint=None):
+        """Attente avant la tentative attempt + 1 : la durée demandée par l'API (plus un peu d'aléa pour que les
+        appels en attente ne repartent pas ensemble), sinon une durée aléatoire entre 0 et base_delay * 2^attempt."""
+        if hint is not None:
+            return hint + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, model_name, fn, tokens=0, deadline=None):
+        """Appelle fn(timeout) pour le modèle : timeout est le temps restant avant l'échéance (None sans échéance).
+        deadline (time.monotonic()) remplace l'échéance par défaut. Retourne le résultat de fn, ou lève l'erreur
+        de la dernière tentative, RequestDeadlineExceeded ou RequestCancelled."""
+        if deadline is None and self.deadline is not None:
+            deadline = time.monotonic() + self.deadline
+        limiter = self.limiter(model_name)
+        self._count(model_name, calls=1)
+        attempt = 0
+        while True:
+            if self.should_stop is not None and self.should_stop():
+                raise RequestCancelled()
+            try:
+                wait = limiter.reserve(tokens, deadline)
+            except RequestDeadlineExceeded:
+                self._count(model_name, failures=1)
+                raise
+            if wait:
+                self._count(model_name, throttled_s=wait)
+                try:
+                    self._sleep(wait)
+                except RequestCancelled:
+                    limiter.refund(tokens)
+                    raise
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                limiter.refund(tokens)
+                self._count(model_name, failures=1)
+                raise RequestDeadlineExceeded("échéance atteinte avant l'envoi de l'appel")
+            attempt += 1
+            self._count(model_name, attempts=1)
+            try:
+                return fn(timeout)
+            except Exception as e:
+                retryable, hint = retry_hint(e)
+                if is_rate_limit(e):
+                    self._count(model_name, rate_limited=1)
+                delay = self.backoff(attempt - 1, hint)
+                if not retryable or attempt >= self.max_attempts or \
+                        (deadline is not None and time.monotonic() + delay > deadline):
+                    self._count(model_name, failures=1)
+                    raise
+                if is_rate_limit(e):
+                    limiter.block(delay)  # Les autres appels au modèle attendent aussi
+                self._count(model_name, retries=1, backoff_s=delay)
+                if self.on_retry is not None:
+                    self.on_retry(model_name, e, delay, attempt)
+                self._sleep(delay)
+
+    def stats(self):
+        """Compteurs par modèle : appels, tentatives, nouvelles tentatives, refus pour quota, échecs,
+        attente du limiteur et attente avant les nouvelles tentatives (s)."""
+        with self._lock:
+            return {model_name: dict(counters) for model_name, counters in self._stats.items()}
+
+
+def split_limits(limits, parts):
+    """Part de chaque quota {modèle: (requêtes/min, tokens/min)} pour un processus parmi parts qui partagent la même
+    clé API (les seaux à jetons ne sont pas partagés entre processus)."""
+    if parts <= 1:
+        return dict(limits)
+    return {model_name: tuple(limit / parts if limit else limit for limit in pair)
+            for model_name, pair in limits.items()}
+
+
+def format_scheduler_stats(stats):
+    """Met en forme les compteurs du planificateur sous forme de tableau texte."""
+    lines = [f"{'modèle':<24} {'appels':>6} {'essais':>6} {'429':>5} {'échecs':>6} {'limiteur (s)':>12} {'attentes (s)':>12}"]
+    for model_name, row in sorted(stats.items()):
+        lines.append(f"{model_name:<24} {row['calls']:>6} {row['attempts']:>6} {row['rate_limited']:>5} "
+                     f"{row['failures']:>6} {row['throttled_s']:>12.1f} {row['backoff_s']:>12.1f}")
+    return "\n".join(lines)
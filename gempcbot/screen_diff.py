@@ -0,0 +1,69 @@
+import math
+
+
+def thumbnail(img, max_edge=160):
+    """Retourne une version réduite en niveaux de gris de l'image, pour des comparaisons rapides."""
+    factor = max(1, max(img.size) // max_edge)
+    small = img.reduce(factor) if factor > 1 else img
+    return small.convert("L")
+
+
+def mask_boxes(img, boxes, scale=1.0):
+    """Copie de l'image où les rectangles boxes (x1, y1, x2, y2), multipliés par scale, sont remplis de noir :
+    deux images masquées de la même façon ne diffèrent plus dans ces zones. Retourne img telle quelle sans rectangle."""
+    if not boxes:
+        return img
+    img = img.copy()
+    for x1, y1, x2, y2 in boxes:
+        box = (max(0, math.floor(x1 * scale)), max(0, math.floor(y1 * scale)),
+               min(img.width, math.ceil(x2 * scale)), min(img.height, math.ceil(y2 * scale)))
+        if box[0] < box[2] and box[1] < box[3]:
+            img.paste(0, box)
+    return img
+
+
+def change_mask(a, b, tolerance=16):
+    """Retourne un masque (mode "1") des pixels qui diffèrent de plus de tolerance entre deux images de même taille."""
+    from PIL import ImageChops  # Comme toutes les dépendances lourdes, PIL n'est importé qu'à la première utilisation
+
+    return ImageChops.difference(a, b).point(lambda v: 255 if v > tolerance else 0).convert("1")
+
+
+def changed_ratio(a, b, tolerance=16):
+    """Proportion des pixels qui ont changé entre deux images de même taille (0.0 à 1.0)."""
+    if a.size != b.size:
+        return 1.0
+    histogram = change_mask(a, b, tolerance).histogram()
+    return histogram[-1] / (a.width * a.height)
+
+
+def changed_regions(a, b, tolerance=16, cell=4):
+    """Rectangles (x1, y1, x2, y2), en pixels des images, des zones qui ont changé entre deux images de même taille.
+
+    Le masque des changements est découpé en cellules de cell pixels ; les cellules modifiées voisines
+    (8-connexité) forment une même zone."""
+    from PIL import Image
+
+    if a.size != b.size:
+        return [(0, 0, a.width, a.height)]
+    mask = change_mask(a, b, tolerance).convert("L")
+    cols, rows = -(-mask.width // cell), -(-mask.height // cell)
+    blocks = mask.resize((cols, rows), Image.BOX, reducing_gap=None) if cell > 1 else mask
+    pixels = blocks.load()
+    changed = {(x, y) for y in range(rows) for x in range(cols) if pixels[x, y]}
+    regions = []
+    while changed:
+        stack = [changed.pop()]
+        x1 = x2 = stack[0][0]
+        y1 = y2 = stack[0][1]
+        while stack:
+            x, y = stack.pop()
+            x1, x2, y1, y2 = min(x1, x), max(x2, x), min(y1, y), max(y2, y)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    neighbour = (x + dx, y + dy)
+                    if neighbour in changed:
+                        changed.remove(neighbour)
+                        stack.append(neighbour)
+        regions.append((x1 * cell, y1 * cell, min((x2 + 1) * cell, a.width), min((y2 + 1) * cell, a.height)))
+    return regions
@@ -0,0 +1,297 @@
+"""Exécution de plusieurs sessions en parallèle sur une même machine Linux, chacune sur son propre écran virtuel Xvfb.
+
+Chaque session est un processus qui choisit son DISPLAY avant d'importer gemini-pc-bot.py : ses contrôleurs pynput
+et son grabber mss sont donc liés à son écran, et les sessions ne se disputent ni la souris ni le clavier.
+Les sessions prennent les instructions dans une file commune ; les durées par étape de toutes les sessions
+sont regroupées à la fin.
+
+Usage : python -m gempcbot.sessions instructions.txt [--sessions 4] [--size 1280x800] [--json-log sessions.jsonl]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import time
+
+from gempcbot.events import JsonLogSink
+from gempcbot.scheduler import split_limits
+from gempcbot.tracing import format_summary, summarize
+
+BOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gemini-pc-bot.py")
+
+
+class VirtualDisplay:
+    """Serveur Xvfb lancé sur le premier numéro d'écran libre à partir de first."""
+
+    def __init__(self, size=(1280, 800), depth=24, first=90):
+        self.size = size
+        self.depth = depth
+        self.first = first
+        self.number = None
+        self._process = None
+
+    @property
+    def name(self):
+        return f":{self.number}"
+
+    def start(self, timeout=10, attempts=20):
+        """Lance Xvfb et attend que l'écran accepte les connexions. Retourne self."""
+        if shutil.which("Xvfb") is None:
+            raise RuntimeError("Xvfb introuvable (installez le paquet xvfb)")
+        number = self.first
+        for _ in range(attempts):
+            while os.path.exists(f"/tmp/.X{number}-lock") or os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                number += 1
+            width, height = self.size
+            self._process = subprocess.Popen(
+                ["Xvfb", f":{number}", "-screen", "0", f"{width}x{height}x{self.depth}", "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + timeout
+            while self._process.poll() is None and not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"Xvfb :{number} n'a pas démarré en {timeout} s")
+                time.sleep(0.05)
+            if self._process.poll() is None:
+                self.number = number
+                return self
+            number += 1  # Numéro pris entre-temps par un autre serveur X
+        raise RuntimeError(f"Impossible de lancer Xvfb après {attempts} tentatives")
+
+    def stop(self):
+        if self._process is None:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+
+def load_bot(path=BOT_PATH):
+    """Importe gemini-pc-bot.py (nom de fichier non importable). À appeler une fois DISPLAY choisi."""
+    spec = importlib.util.spec_from_file_location("gemini_pc_bot", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["gemini_pc_bot"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class QueueSink:
+    """Transmet les messages d'une session au processus principal."""
+
+    def __init__(self, session, results):
+        self.session = session
+        self.results = results
+
+    def emit(self, event, **data):
+        if event == "log":
+            self.results.put({"type": "log", "session": self.session, "message": data["message"]})
+
+
+def session_path(path, session):
+    """Fichier propre à une session : "plan_cache.json" -> "plan_cache.session-0.json"."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.session-{session}{ext}"
+
+
+def _session_main(session, sessions, display, options, work_queue, results):
+    """Boucle d'une session (processus fils) parmi sessions : prend les instructions dans work_queue jusqu'à None."""
+    if display:
+        os.environ["DISPLAY"] = display  # Avant l'import de pynput et la création du grabber mss
+    try:
+        bot = load_bot(options.get("bot_path", BOT_PATH))
+        for name, value in options.get("overrides", {}).items():
+            setattr(bot, name, value)
+        # Chaque session écrit ses traces et son historique dans son propre dossier
+        if bot.TRACE_DIR:
+            bot.TRACE_DIR = os.path.join(bot.TRACE_DIR, f"session-{session}")
+        if bot.HISTORY_DIR:
+            bot.HISTORY_DIR = os.path.join(bot.HISTORY_DIR, f"session-{session}")
+        # et ses propres caches : deux processus qui réécrivent le même fichier perdraient des entrées
+        if bot.PLAN_CACHE_FILE:
+            bot.PLAN_CACHE_FILE = session_path(bot.PLAN_CACHE_FILE, session)
+        if bot.VISION_CACHE_FILE:
+            bot.VISION_CACHE_FILE = session_path(bot.VISION_CACHE_FILE, session)
+        # Les quotas de la clé API sont partagés par toutes les sessions
+        bot.RATE_LIMITS = split_limits(bot.RATE_LIMITS, sessions)
+        # Une cassette par session à l'enregistrement ; au rejeu, celle de la session si elle existe, sinon la commune
+        cassette = session_path(bot.CASSETTE_FILE, session) if bot.CASSETTE_FILE else None
+        if cassette and (bot.MODEL_BACKEND == "record" or (bot.MODEL_BACKEND == "replay" and os.path.exists(cassette))):
+            bot.CASSETTE_FILE = cassette
+        api_key = options.get("api_key") or os.environ.get("GEMINI_API_KEY") or bot.load_api_key()
+        if not api_key and bot.MODEL_BACKEND in ("replay", "http"):
+            api_key = "hors-ligne"  # Pas d'appel à l'API Gemini
+        if not api_key:
+            raise RuntimeError("Aucune clé API (GEMINI_API_KEY ou fichier api_key.txt)")
+        automator = bot.TaskAutomator(api_key, QueueSink(session, results),
+                                      model_name=options.get("model_name", bot.DEFAULT_MODEL),
+                                      capture_target=options.get("capture_target", bot.CAPTURE_TARGET))
+    except Exception as e:
+        results.put({"type": "error", "session": session, "error": f"{type(e).__name__}: {e}"})
+        results.put({"type": "done", "session": session})
+        return
+
+    while True:
+        item = work_queue.get()
+        if item is None:
+            break
+        index, instruction = item
+        start = time.perf_counter()
+        error = None
+        try:
+            success = automator.run_blocking(instruction)
+        except Exception as e:
+            success, error = False, f"{type(e).__name__}: {e}"
+        spans = [{"stage": span["stage"], "duration": span["duration"], "prompt_tokens": span.get("prompt_tokens", 0)}
+                 for span in automator.tracer.spans]
+        results.put({"type": "task", "session": session, "index": index, "instruction": instruction,
+                     "success": bool(success), "error": error, "duration": time.perf_counter() - start,
+                     "spans": spans})
+    automator.pipeline.shutdown()
+    automator.history.close()
+    results.put({"type": "done", "session": session})
+
+
+class SessionPool:
+    """Lance sessions processus TaskAutomator, chacun sur son écran Xvfb, qui se partagent une file d'instructions.
+
+    options : "model_name", "capture_target", "api_key", "bot_path" et "overrides" (constantes de gemini-pc-bot.py
+    à remplacer dans les sessions, ex: {"MODEL_BACKEND": "http"}). Sans virtual_displays, les sessions utilisent
+    l'écran courant (une seule session utile). on_event reçoit chaque message des sessions. Chaque session reçoit
+    une part égale des quotas RATE_LIMITS, même quand les autres ont fini leurs instructions."""
+
+    def __init__(self, sessions=2, options=None, virtual_displays=True, screen_size=(1280, 800), on_event=None):
+        self.sessions = sessions
+        self.options = options or {}
+        self.virtual_displays = virtual_displays
+        self.screen_size = screen_size
+        self.on_event = on_event
+
+    def run(self, instructions):
+        """Exécute les instructions et retourne le rapport (voir format_report)."""
+        context = multiprocessing.get_context("spawn")  # Le fils ne doit pas hériter des connexions X du parent
+        displays, processes = [], []
+        start = time.perf_counter()
+        tasks, errors = [], []
+        try:
+            if self.virtual_displays:
+                for _ in range(self.sessions):
+                    displays.append(VirtualDisplay(self.screen_size).start())
+            work_queue, results = context.Queue(), context.Queue()
+            count = 0
+            for count, instruction in enumerate(instructions, 1):
+                work_queue.put((count - 1, instruction))
+            for _ in range(self.sessions):
+                work_queue.put(None)
+            for session in range(self.sessions):
+                display = displays[session].name if displays else None
+                process = context.Process(target=_session_main, name=f"session-{session}",
+                                          args=(session, self.sessions, display, self.options, work_queue, results))
+                process.start()
+                processes.append(process)
+
+            done = set()
+            while len(done) < self.sessions:
+                try:
+                    event = results.get(timeout=0.5)
+                except queue.Empty:
+                    for session, process in enumerate(processes):
+                        if session not in done and not process.is_alive():
+                            errors.append({"session": session, "error": f"processus arrêté (code {process.exitcode})"})
+                            done.add(session)
+                    continue
+                if event["type"] == "task":
+                    tasks.append(event)
+                elif event["type"] == "error":
+                    errors.append(event)
+                elif event["type"] == "done":
+                    done.add(event["session"])
+                if self.on_event:
+                    self.on_event(event)
+        finally:
+            for process in processes:
+                process.join(5)
+                if process.is_alive():
+                    process.terminate()
+            for display in displays:
+                display.stop()
+        return {
+            "sessions": self.sessions,
+            "instructions": count,
+            "duration": time.perf_counter() - start,
+            "tasks": sorted(tasks, key=lambda task: task["index"]),
+            "errors": errors,
+            "summary": summarize([span for task in tasks for span in task["spans"]]),
+        }
+
+
+def format_report(report):
+    """Met en forme le rapport de SessionPool.run : débit, tâches par session et durées par étape."""
+    tasks = report["tasks"]
+    duration = report["duration"]
+    lines = [f"{len(tasks)}/{report['instructions']} tâches sur {report['sessions']} session(s) en {duration:.1f} s "
+             f"({len(tasks) / duration * 60 if duration else 0:.1f} tâches/min), "
+             f"{sum(task['success'] for task in tasks)} réussie(s)"]
+    lines.append(f"{'session':<8} {'tâches':>7} {'réussies':>9} {'occupée (s)':>12}")
+    for session in range(report["sessions"]):
+        own = [task for task in tasks if task["session"] == session]
+        lines.append(f"{session:<8} {len(own):>7} {sum(task['success'] for task in own):>9} "
+                     f"{sum(task['duration'] for task in own):>12.1f}")
+    for error in report["errors"]:
+        lines.append(f"session {error['session']} : {error['error']}")
+    if report["summary"]:
+        lines.append("Durée par étape (toutes sessions) :\n" + format_summary(report["summary"]))
+    return "\n".join(lines)
+
+
+def read_instructions(path):
+    """Instructions d'un fichier (ou de l'entrée standard "-"), une par ligne, sans lignes vides ni commentaires."""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    with stream:
+        return [line.strip() for line in stream if line.strip() and not line.strip().startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", help="fichier d'instructions, une par ligne (- pour l'entrée standard)")
+    parser.add_argument("--sessions", type=int, default=os.cpu_count() or 1,
+                        help="nombre de sessions (défaut : %(default)s)")
+    parser.add_argument("--size", default="1280x800", help="taille des écrans virtuels (défaut : %(default)s)")
+    parser.add_argument("--model", help="modèle Gemini à utiliser")
+    parser.add_argument("--capture", help='zone capturée : "monitor:N", "all" ou "active_window"')
+    parser.add_argument("--json-log", help="écrit aussi les messages des sessions en JSON lines dans ce fichier")
+    args = parser.parse_args()
+
+    options = {}
+    if args.model:
+        options["model_name"] = args.model
+    if args.capture:
+        options["capture_target"] = args.capture
+    json_log = JsonLogSink(args.json_log) if args.json_log else None
+
+    def on_event(event):
+        if event["type"] == "log":
+            print(f"{time.strftime('%H:%M:%S')} [session {event['session']}] {event['message']}", flush=True)
+            if json_log:
+                json_log.emit("log", session=event["session"], message=event["message"])
+
+    size = tuple(int(v) for v in args.size.split("x"))
+    pool = SessionPool(args.sessions, options, screen_size=size, on_event=on_event)
+    try:
+        report = pool.run(read_instructions(args.file))
+    finally:
+        if json_log:
+            json_log.close()
+    print(format_report(report))
+    return 0 if not report["errors"] and all(task["success"] for task in report["tasks"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import time
+
+from gempcbot.screen_diff import changed_ratio
+
+
+class ScreenSettleWaiter:
+    """Remplace les pauses fixes en surveillant l'écran avec des captures basse résolution."""
+
+    def __init__(self, grab_thumbnail, poll_interval=0.1, quiet_window=0.5, change_threshold=0.002):
+        self.grab_thumbnail = grab_thumbnail  # Fonction qui retourne une capture réduite (image PIL)
+        self.poll_interval = poll_interval
+        self.quiet_window = quiet_window  # Durée sans changement pour considérer l'écran stable
+        self.change_threshold = change_threshold  # Proportion de pixels modifiés à partir de laquelle l'écran a changé
+
+    def _changed(self, a, b):
+        return changed_ratio(a, b) > self.change_threshold
+
+    def reference(self):
+        """Vignette de l'écran à passer à wait_for_change, prise avant une action pour voir sa réaction même rapide."""
+        return self.grab_thumbnail()
+
+    def wait_until_stable(self, timeout, should_stop=None):
+        """Attend que l'écran ne change plus pendant quiet_window, au plus timeout secondes.
+        Retourne (durée d'attente, True si l'écran est stable)."""
+        start = time.monotonic()
+        previous = self.grab_thumbnail()
+        last_change = start
+        while True:
+            now = time.monotonic()
+            if now - last_change >= self.quiet_window:
+                return now - start, True
+            if now - start >= timeout or (should_stop and should_stop()):
+                return now - start, False
+            time.sleep(min(self.poll_interval, max(0.0, timeout - (now - start))))
+            current = self.grab_thumbnail()
+            if self._changed(previous, current):
+                last_change = time.monotonic()
+            previous = current
+
+    def wait_for_change(self, timeout, should_stop=None, reference=None):
+        """Attend que l'écran diffère de reference (ou de l'écran au début de l'attente), au plus timeout secondes.
+        Retourne (durée d'attente, True si l'écran a changé)."""
+        start = time.monotonic()
+        if reference is None:
+            reference = self.grab_thumbnail()
+        while True:
+            now = time.monotonic()
+            if now - start >= timeout or (should_stop and should_stop()):
+                return now - start, False
+            time.sleep(min(self.poll_interval, max(0.0, timeout - (now - start))))
+            if self._changed(reference, self.grab_thumbnail()):
+                return time.monotonic() - start, True
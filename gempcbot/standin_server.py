@@ -0,0 +1,62 @@
+"""Serveur HTTP local qui se fait passer pour Gemini en rejouant une cassette (pour HttpBackend).
+
+Usage : python -m gempcbot.standin_server cassette.jsonl [--port 8765] [--latency 0.5]
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gempcbot.backends import ReplayBackend
+
+
+def make_handler(backend):
+    """Crée le handler HTTP qui répond avec le backend donné."""
+
+    class StandinHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length).decode("utf-8"))
+                contents = list(request.get("prompt", [])) + list(request.get("images", []))
+            except (ValueError, AttributeError, TypeError) as e:
+                status, body = 400, {"error": f"requête invalide : {e}"}
+            else:
+                try:
+                    text = backend.generate_content(contents).text
+                    status, body = 200, {"text": text}
+                except LookupError as e:
+                    status, body = 404, {"error": str(e)}
+                except Exception as e:
+                    status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Pas de log par requête
+
+    return StandinHandler
+
+
+def serve(backend, host="127.0.0.1", port=8765):
+    """Crée le serveur (à lancer avec serve_forever)."""
+    return ThreadingHTTPServer((host, port), make_handler(backend))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("cassette")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=None, help="latence fixe (s), par défaut celle enregistrée")
+    args = parser.parse_args()
+    server = serve(ReplayBackend(args.cassette, latency=args.latency), args.host, args.port)
+    print(f"Serveur de remplacement sur http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+
+# Stratégies de saisie de texte disponibles
+STRATEGIES = ("clipboard", "chunked", "per_char")
+
+# Cibles où le collage est peu fiable (ex: la recherche du menu Démarrer ne reçoit pas toujours Ctrl+V)
+NO_CLIPBOARD_TARGETS = ("start_menu",)
+
+
+class TextEntryEngine:
+    """Saisie de texte au clavier avec choix de la stratégie selon la longueur du texte et la cible."""
+
+    def __init__(self, keyboard, paste_modifier, clipboard_threshold=200, chunk_size=32,
+                 base_delay=0.002, per_char_delay=0.03, per_char_targets=()):
+        self.keyboard = keyboard  # Contrôleur clavier pynput
+        self.paste_modifier = paste_modifier  # Key.ctrl_l (Windows/Linux) ou Key.cmd (macOS)
+        self.clipboard_threshold = clipboard_threshold  # Longueur à partir de laquelle on colle le texte
+        self.chunk_size = chunk_size
+        self.base_delay = base_delay  # Pause par caractère "simple" en mode chunked
+        self.per_char_delay = per_char_delay  # Pause entre chaque caractère en mode per_char
+        self.per_char_targets = per_char_targets  # Cibles qui perdent des touches si on tape trop vite
+
+    def choose(self, text, target=None):
+        """Choisit la stratégie de saisie pour un texte et une cible."""
+        if target in self.per_char_targets:
+            return "per_char"
+        if len(text) >= self.clipboard_threshold and target not in NO_CLIPBOARD_TARGETS:
+            return "clipboard"
+        return "chunked"
+
+    def type_text(self, text, strategy=None, target=None):
+        """Saisit le texte avec la stratégie demandée (ou choisie automatiquement) et retourne la stratégie utilisée."""
+        if strategy in (None, "auto"):
+            strategy = self.choose(text, target)
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie de saisie inconnue : {strategy}")
+        if strategy == "clipboard":
+            import pyperclip  # Importé seulement si on colle du texte
+
+            try:
+                self.paste(text)
+                return strategy
+            except pyperclip.PyperclipException:
+                strategy = "chunked"  # Pas de presse-papier disponible (ex: Linux sans xclip)
+        if strategy == "chunked":
+            self.type_chunked(text)
+        else:
+            self.type_per_char(text)
+        return strategy
+
+    def paste(self, text):
+        """Colle le texte via le presse-papier puis restaure son contenu précédent."""
+        import pyperclip
+
+        previous = pyperclip.paste()
+        pyperclip.copy(text)
+        try:
+            with self.keyboard.pressed(self.paste_modifier):
+                self.keyboard.press('v')
+                self.keyboard.release('v')
+            time.sleep(0.1)  # Laisse à l'application le temps de lire le presse-papier
+        finally:
+            pyperclip.copy(previous)
+
+    def _chunk_delay(self, chunk):
+        """Pause après un morceau : les retours à la ligne (auto-indentation) et les caractères non ASCII
+        (saisie unicode plus lente) laissent plus de temps à l'application."""
+        delay = 0.0
+        for char in chunk:
+            if char in "\n\t":
+                delay += self.base_delay * 10
+            elif ord(char) > 127:
+                delay += self.base_delay * 3
+            else:
+                delay += self.base_delay
+        return delay
+
+    def type_chunked(self, text):
+        """Tape le texte par morceaux, avec une pause adaptée au contenu de chaque morceau."""
+        for start in range(0, len(text), self.chunk_size):
+            chunk = text[start:start + self.chunk_size]
+            self.keyboard.type(chunk)
+            time.sleep(self._chunk_delay(chunk))
+
+    def type_per_char(self, text):
+        """Tape le texte caractère par caractère avec une pause fixe."""
+        for char in text:
+            self.keyboard.type(char)
+            time.sleep(self.per_char_delay)
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+def percentile(values, p):
+    """Percentile p (0-100) d'une liste de valeurs, par interpolation linéaire."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(spans):
+    """Regroupe des spans par étape : {étape: {"count", "total", "p50", "p95", "max", "prompt_tokens"}}."""
+    durations = {}
+    tokens = {}
+    for span in spans:
+        durations.setdefault(span["stage"], []).append(span["duration"])
+        tokens[span["stage"]] = tokens.get(span["stage"], 0) + span.get("prompt_tokens", 0)
+    return {
+        stage: {
+            "count": len(values),
+            "total": sum(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": max(values),
+            "prompt_tokens": tokens[stage],
+        }
+        for stage, values in durations.items()
+    }
+
+
+def format_summary(summary):
+    """Met en forme le résumé par étape sous forme de tableau texte."""
+    lines = [f"{'étape':<14} {'nb':>4} {'total (s)':>10} {'p50 (s)':>8} {'p95 (s)':>8} {'max (s)':>8} {'tokens':>8}"]
+    for stage, row in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{stage:<14} {row['count']:>4} {row['total']:>10.2f} {row['p50']:>8.2f} "
+                     f"{row['p95']:>8.2f} {row['max']:>8.2f} {row.get('prompt_tokens', 0) or '-':>8}")
+    return "\n".join(lines)
+
+
+def load_spans(paths):
+    """Charge les spans de fichiers de trace JSON lines."""
+    spans = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("type") == "span":
+                    spans.append(record)
+    return spans
+
+
+class RunTracer:
+    """Mesure la durée de chaque étape d'une exécution (capture, encodage, appels au modèle, actions...)."""
+
+    def __init__(self, trace_dir=None):
+        self.trace_dir = trace_dir  # Dossier des traces JSON lines (None = pas d'écriture sur le disque)
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, instruction):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.instruction = instruction
+        self.run_attrs = {}
+        self.spans = []
+        self._start = time.perf_counter()
+        self._started_at = time.time()
+
+    def start_run(self, instruction):
+        """Commence une nouvelle trace."""
+        with self._lock:
+            self._reset(instruction)
+
+    def annotate(self, **attrs):
+        """Ajoute des attributs à l'exécution en cours (ex: nombre de tentatives)."""
+        with self._lock:
+            self.run_attrs.update(attrs)
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        """Mesure la durée du bloc. Le dictionnaire retourné permet d'ajouter des attributs pendant le bloc.
+
+        Le span appartient à l'exécution en cours à son début : s'il se termine après la fin de celle-ci (appel en
+        arrière-plan), il n'est pas compté dans l'exécution suivante."""
+        with self._lock:
+            run_id, run_start = self.run_id, self._start
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = str(e)
+            raise
+        finally:
+            end = time.perf_counter()
+            span = {
+                "type": "span",
+                "run_id": run_id,
+                "stage": stage,
+                "start": start - run_start,
+                "duration": end - start,
+                "thread": threading.current_thread().name,
+            }
+            span.update(attrs)
+            with self._lock:
+                if run_id == self.run_id:
+                    self.spans.append(span)
+
+    def end_run(self):
+        """Termine la trace, l'écrit sur le disque si besoin et retourne le résumé par étape."""
+        with self._lock:
+            spans = list(self.spans)
+            run = {
+                "type": "run",
+                "run_id": self.run_id,
+                "instruction": self.instruction,
+                "started_at": self._started_at,
+                "duration": time.perf_counter() - self._start,
+            }
+            run.update(self.run_attrs)
+        summary = summarize(spans)
+        if self.trace_dir:
+            try:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                path = os.path.join(self.trace_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.run_id}.jsonl")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(run, ensure_ascii=False, default=str) + "\n")
+                    for span in spans:
+                        f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+            except OSError as e:
+                print(f"Erreur lors de l'écriture de la trace : {e}")
+        return summary
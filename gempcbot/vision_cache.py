@@ -0,0 +1,137 @@
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def dhash(img, hash_size=16):
+    """Calcule le hash perceptuel (dHash) d'une image PIL, sous forme d'entier de hash_size² bits."""
+    from PIL import Image  # Importé à la première utilisation
+
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """Nombre de bits différents entre deux hashs."""
+    return bin(a ^ b).count("1")
+
+
+class VisionCache:
+    """Cache LRU borné des résultats de Gemini Vision, indexé par hash perceptuel de la capture."""
+
+    def __init__(self, max_entries=64, max_distance=2, hash_size=16, path=None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance  # Distance de Hamming max pour considérer deux captures identiques
+        self.hash_size = hash_size
+        self.path = path  # Fichier de persistance (None = cache en mémoire uniquement)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (hash, taille de l'image) -> données de vision
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def key_for(self, img):
+        """Retourne la clé de cache d'une image."""
+        return dhash(img, self.hash_size), img.size
+
+    def _nearest(self, key):
+        """Clé de l'entrée la plus proche de key et sa distance, ou (None, None). À appeler avec self._lock."""
+        image_hash, size = key
+        best_key, best_distance = None, None
+        for entry_key in self._entries:
+            entry_hash, entry_size = entry_key
+            if entry_size != size:
+                continue
+            distance = hamming_distance(image_hash, entry_hash)
+            if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                best_key, best_distance = entry_key, distance
+                if distance == 0:
+                    break
+        return best_key, best_distance
+
+    def get(self, key):
+        """Retourne (données, distance) pour la capture la plus proche, ou (None, None) si aucune n'est assez proche."""
+        with self._lock:
+            best_key, best_distance = self._nearest(key)
+            if best_key is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return copy.deepcopy(self._entries[best_key]), best_distance
+
+    def peek(self, key):
+        """Comme get, sans compter de hit ni de miss ni rafraîchir l'entrée (pour un préchargement : l'analyse
+        elle-même fera le get)."""
+        with self._lock:
+            best_key, best_distance = self._nearest(key)
+            if best_key is None:
+                return None, None
+            return copy.deepcopy(self._entries[best_key]), best_distance
+
+    def put(self, key, data):
+        """Ajoute un résultat de vision au cache et évince le plus ancien si besoin."""
+        with self._lock:
+            self._entries[key] = copy.deepcopy(data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.path:
+            self.save()
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self.save()
+
+    def stats(self):
+        """Retourne les compteurs du cache."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def save(self):
+        """Sauvegarde le cache sur le disque."""
+        with self._lock:
+            entries = [
+                {"hash": format(image_hash, "x"), "size": list(size), "data": data}
+                for (image_hash, size), data in self._entries.items()
+            ]
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"hash_size": self.hash_size, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Erreur lors de la sauvegarde du cache de vision : {e}")
+
+    def load(self):
+        """Charge le cache depuis le disque s'il existe."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Erreur lors du chargement du cache de vision : {e}")
+            return
+        if saved.get("hash_size") != self.hash_size:
+            return  # Hashs incompatibles, on repart d'un cache vide
+        with self._lock:
+            for entry in saved.get("entries", [])[-self.max_entries:]:
+                self._entries[(int(entry["hash"], 16), tuple(entry["size"]))] = entry["data"]
@@ -0,0 +1,282 @@
+"""Saisie vocale : micro ouvert en continu, détection de fin de parole (VAD) et moteurs de reconnaissance au choix.
+
+speech_recognition (et le moteur choisi) n'est importé qu'à la première utilisation du micro.
+"""
+import json
+import math
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import audioop  # Retiré de la bibliothèque standard en Python 3.13
+except ImportError:
+    audioop = None
+
+
+def frame_rms(frame, sample_width=2):
+    """Énergie (RMS) d'un morceau d'audio PCM."""
+    if audioop is not None:
+        return audioop.rms(frame, sample_width)
+    samples = array({1: "b", 2: "h", 4: "i"}[sample_width], frame[:len(frame) - len(frame) % sample_width])
+    return int(math.sqrt(sum(s * s for s in samples) / len(samples))) if samples else 0
+
+
+class VadSegmenter:
+    """Découpe un flux audio en phrases d'après l'énergie de chaque trame.
+
+    Le bruit de fond est mesuré une fois (calibrate) puis suivi lentement entre les phrases ; une trame est de la parole
+    si son énergie dépasse ratio fois le bruit de fond. Une phrase commence après start_ms de parole (avec pre_roll_ms
+    d'audio avant, pour ne pas couper la première syllabe) et se termine après end_silence_ms de silence."""
+
+    def __init__(self, sample_rate=16000, sample_width=2, frame_ms=30, ratio=3.0, min_threshold=150,
+                 start_ms=90, end_silence_ms=500, pre_roll_ms=300, max_phrase_s=15):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.frame_ms = frame_ms
+        self.ratio = ratio
+        self.min_threshold = min_threshold  # Seuil minimal (micro très silencieux)
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.end_frames = max(1, end_silence_ms // frame_ms)
+        self.max_frames = int(max_phrase_s * 1000 // frame_ms)
+        self.noise = 0.0
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._phrase = None  # Trames de la phrase en cours
+        self._voiced = 0  # Trames de parole consécutives avant le début d'une phrase
+        self._silent = 0  # Trames de silence consécutives dans la phrase
+
+    @property
+    def frame_size(self):
+        """Nombre d'échantillons par trame."""
+        return self.sample_rate * self.frame_ms // 1000
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.noise * self.ratio)
+
+    @property
+    def in_phrase(self):
+        return self._phrase is not None
+
+    def calibrate(self, frames):
+        """Mesure le bruit de fond sur des trames sans parole."""
+        levels = [frame_rms(frame, self.sample_width) for frame in frames]
+        if levels:
+            self.noise = sum(levels) / len(levels)
+
+    def reset(self):
+        """Oublie la phrase en cours et l'audio mémorisé."""
+        self._pre_roll.clear()
+        self._phrase = None
+        self._voiced = self._silent = 0
+
+    def feed(self, frame):
+        """Ajoute une trame. Retourne l'audio de la phrase (bytes) quand sa fin est détectée, sinon None."""
+        level = frame_rms(frame, self.sample_width)
+        speech = level > self.threshold
+        if self._phrase is None:
+            self._pre_roll.append(frame)
+            if not speech:
+                self._voiced = 0
+                self.noise = 0.95 * self.noise + 0.05 * level  # Le bruit de fond évolue lentement
+                return None
+            self._voiced += 1
+            if self._voiced < self.start_frames:
+                return None
+            self._phrase = list(self._pre_roll)
+            self._pre_roll.clear()
+            self._silent = 0
+            return None
+        self._phrase.append(frame)
+        self._silent = 0 if speech else self._silent + 1
+        if self._silent < self.end_frames and len(self._phrase) < self.max_frames:
+            return None
+        phrase = b"".join(self._phrase[:len(self._phrase) - self._silent] or self._phrase)
+        self.reset()
+        return phrase
+
+
+class GoogleRecognizer:
+    """Reconnaissance par l'API web de Google (réseau)."""
+
+    name = "google"
+    offline = False
+
+    def __init__(self, language="fr-FR", **options):
+        self.language = language
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+
+        return sr.Recognizer().recognize_google(audio, language=self.language)
+
+
+class SphinxRecognizer:
+    """Reconnaissance hors ligne par CMU Sphinx (paquet pocketsphinx, et modèle de la langue pour autre chose que en-US)."""
+
+    name = "sphinx"
+    offline = True
+
+    def __init__(self, language="fr-FR", **options):
+        self.language = language
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+
+        return sr.Recognizer().recognize_sphinx(audio, language=self.language)
+
+
+class VoskRecognizer:
+    """Reconnaissance hors ligne par Vosk (paquet vosk et modèle téléchargé dans model_path), modèle chargé une fois."""
+
+    name = "vosk"
+    offline = True
+
+    def __init__(self, language="fr-FR", model_path="vosk-model-small-fr", **options):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Charge le modèle (plusieurs secondes pour les gros modèles)."""
+        with self._lock:
+            if self._model is None:
+                from vosk import Model, SetLogLevel
+
+                SetLogLevel(-1)
+                self._model = Model(self.model_path)
+        return self._model
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.warm_up(), 16000)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=16000, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+RECOGNIZERS = {recognizer.name: recognizer for recognizer in (GoogleRecognizer, SphinxRecognizer, VoskRecognizer)}
+
+
+def create_recognizer(name, language="fr-FR", **options):
+    """Crée le moteur de reconnaissance demandé ("google", "sphinx" ou "vosk")."""
+    if name not in RECOGNIZERS:
+        raise ValueError(f"Moteur de reconnaissance vocale inconnu : {name} ({', '.join(RECOGNIZERS)})")
+    return RECOGNIZERS[name](language=language, **options)
+
+
+class VoiceListener:
+    """Garde le micro ouvert et reconnaît la prochaine phrase dès que l'utilisateur se tait.
+
+    Le micro est ouvert et le bruit de fond mesuré une seule fois (start) ; un thread lit l'audio en continu.
+    listen_once(callback) attend la prochaine phrase : callback reçoit le texte reconnu, ou None (pas de parole
+    avant timeout secondes, audio incompréhensible, erreur du moteur). log reçoit les messages pour l'utilisateur."""
+
+    def __init__(self, recognizer, segmenter=None, source_factory=None, calibration_s=0.5, log=print):
+        self.recognizer = recognizer
+        self.segmenter = segmenter or VadSegmenter()
+        self.source_factory = source_factory  # Crée la source audio (par défaut le micro de speech_recognition)
+        self.calibration_s = calibration_s
+        self.log = log
+        self.last_latency = None  # Délai entre la fin de la parole et le texte reconnu (s)
+        self._source = None
+        self._reader = None
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = None  # (callback, échéance) de l'écoute en cours
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="voice")
+
+    @property
+    def running(self):
+        return self._reader is not None and self._reader.is_alive()
+
+    def start(self):
+        """Ouvre le micro, mesure le bruit de fond et lance la lecture en continu (une seule fois)."""
+        if self.running:
+            return
+        import speech_recognition as sr
+
+        if self.source_factory is None:
+            self._source = sr.Microphone(sample_rate=self.segmenter.sample_rate, chunk_size=self.segmenter.frame_size)
+        else:
+            self._source = self.source_factory()
+        self._source.__enter__()
+        frames = [self._read() for _ in range(max(1, int(self.calibration_s * 1000 / self.segmenter.frame_ms)))]
+        self.segmenter.calibrate(frame for frame in frames if frame)
+        if hasattr(self.recognizer, "warm_up"):
+            self._worker.submit(self.recognizer.warm_up)
+        self._closed.clear()
+        self._reader = threading.Thread(target=self._read_loop, name="voice-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        return self._source.stream.read(self.segmenter.frame_size)
+
+    def listen_once(self, callback, timeout=5.0):
+        """Reconnaît la prochaine phrase (commencée avant timeout secondes) et appelle callback avec le texte ou None."""
+        with self._lock:
+            self.segmenter.reset()
+            self._pending = (callback, time.monotonic() + timeout)
+
+    def _read_loop(self):
+        while not self._closed.is_set():
+            try:
+                frame = self._read()
+            except Exception as e:
+                self.log(f"Erreur de lecture du micro : {e}")
+                self._finish(None)
+                break
+            if not frame:
+                break  # Fin du fichier audio
+            with self._lock:
+                pending = self._pending
+            if pending is None:
+                continue  # Micro ouvert mais personne n'écoute : l'audio est ignoré
+            callback, deadline = pending
+            phrase = self.segmenter.feed(frame)
+            if phrase is not None:
+                with self._lock:
+                    self._pending = None
+                self._worker.submit(self._recognize, phrase, callback, time.perf_counter())
+            elif not self.segmenter.in_phrase and time.monotonic() > deadline:
+                self.log("Aucune parole détectée, veuillez réessayer.")
+                self._finish(None)
+
+    def _finish(self, text):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            pending[0](text)
+
+    def _recognize(self, phrase, callback, speech_end):
+        import speech_recognition as sr
+
+        audio = sr.AudioData(phrase, self.segmenter.sample_rate, self.segmenter.sample_width)
+        self.log("Reconnaissance en cours...")
+        try:
+            text = self.recognizer.recognize(audio)
+        except sr.UnknownValueError:
+            self.log("Impossible de comprendre l'audio")
+            text = None
+        except Exception as e:
+            self.log(f"Erreur lors de la requête de reconnaissance vocale: {e}")
+            text = None
+        self.last_latency = time.perf_counter() - speech_end
+        callback(text)
+
+    def close(self):
+        """Arrête la lecture et ferme le micro."""
+        self._closed.set()
+        if self._reader is not None:
+            self._reader.join(1)
+            self._reader = None
+        if self._source is not None:
+            self._source.__exit__(None, None, None)
+            self._source = None
+        self._worker.shutdown(wait=False)
@@ -0,0 +1,56 @@
+import sys
+
+
+def active_window_rect():
+    """Rectangle {"left", "top", "width", "height"} de la fenêtre au premier plan, ou None si on ne peut pas le connaître
+    (pas de fenêtre active, serveur X sans _NET_ACTIVE_WINDOW, macOS...)."""
+    try:
+        if sys.platform == "win32":
+            return _win32_active_window_rect()
+        if sys.platform.startswith("linux"):
+            return _x11_active_window_rect()
+    except Exception:
+        return None
+    return None
+
+
+def _win32_active_window_rect():
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd:
+        return None
+    rect = wintypes.RECT()
+    if not user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return None
+    return {"left": rect.left, "top": rect.top, "width": rect.right - rect.left, "height": rect.bottom - rect.top}
+
+
+def _x11_active_window_rect():
+    from Xlib import X, display
+
+    disp = display.Display()
+    try:
+        root = disp.screen().root
+        prop = root.get_full_property(disp.intern_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType)
+        if prop is None or not prop.value or not prop.value[0]:
+            return None
+        window = disp.create_resource_object("window", prop.value[0])
+        geometry = window.get_geometry()
+        origin = window.translate_coords(root, 0, 0)  # Position de l'origine de l'écran dans la fenêtre
+        return {"left": -origin.x, "top": -origin.y, "width": geometry.width, "height": geometry.height}
+    finally:
+        disp.close()
+
+
+def clip_rect(rect, bounds):
+    """Intersection de deux rectangles {"left", "top", "width", "height"}, ou None si elle est vide."""
+    left = max(rect["left"], bounds["left"])
+    top = max(rect["top"], bounds["top"])
+    right = min(rect["left"] + rect["width"], bounds["left"] + bounds["width"])
+    bottom = min(rect["top"] + rect["height"], bounds["top"] + bounds["height"])
+    if right <= left or bottom <= top:
+        return None
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
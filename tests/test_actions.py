@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from benchmarks.bench_actions import effects, random_plan, run
+from gempcbot.actions import (Capture, Click, DryRunExecutor, Keys, Move, TypeText, Wait, compile_actions, from_dict,
+                              optimize)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_optimize_keeps_effects_of_random_plans(seed):
+    rnd = random.Random(seed)
+    for _ in range(50):
+        actions = compile_actions(random_plan(rnd.randint(1, 20), rnd), optimized=False)
+        optimized = optimize(actions)
+        assert effects(optimized) == effects(actions)
+        assert len(optimized) <= len(actions)
+
+
+def test_optimize_is_idempotent():
+    actions = compile_actions(random_plan(30, random.Random(1)), optimized=False)
+    once = optimize(actions)
+    assert optimize(once) == once
+
+
+def test_move_then_click_is_merged():
+    assert optimize([Move(10, 20), Click("right")]) == [Click("right", 10, 20)]
+
+
+def test_overridden_move_is_dropped():
+    assert optimize([Move(1, 2), Move(3, 4), Click()]) == [Click("left", 3, 4)]
+
+
+def test_consecutive_waits_and_keys_are_merged():
+    actions = [Wait(0.1), Wait(0.2), Keys((("ctrl", "c"),)), Keys((("enter",),))]
+    assert optimize(actions) == [Wait(0.3), Keys((("ctrl", "c"), ("enter",)))]
+
+
+def test_move_separated_from_its_override_by_a_wait_is_kept():
+    # Le pointeur reste au premier point pendant la pause (survol, infobulle)
+    actions = [Move(1, 2), Wait(1.0), Move(3, 4)]
+    assert optimize(actions) == actions
+
+
+def test_move_separated_from_click_is_not_merged():
+    for separator in (Wait(0.5), Capture(), TypeText("a"), Keys((("tab",),))):
+        actions = [Move(1, 2), separator, Click()]
+        assert optimize(actions) == actions
+
+
+def test_click_with_its_own_position_keeps_previous_move():
+    actions = [Move(1, 2), Click("left", 5, 6)]
+    assert optimize(actions) == actions
+
+
+def test_waits_of_different_modes_are_not_merged():
+    actions = [Wait(1.0, "change"), Wait(1.0, "stable"), Wait(1.0)]
+    assert optimize(actions) == actions
+
+
+def test_keys_separated_by_text_are_not_merged():
+    actions = [Keys((("ctrl", "a"),)), TypeText("bonjour"), Keys((("enter",),))]
+    assert optimize(actions) == actions
+
+
+def test_dict_round_trip():
+    actions = [Move(1, 2), Click("left", 3, 4), Keys((("ctrl", "c"),)), Keys((("enter",),)), TypeText("é", "clipboard"),
+               Wait(0.5, "fixed"), Capture()]
+    assert [from_dict(action.to_dict()) for action in actions] == actions
+
+
+def test_dry_run_counts_fewer_events_after_optimize():
+    plan = [{"action": "mouse_move", "x": 1, "y": 1}, {"action": "mouse_move", "x": 5, "y": 5},
+            {"action": "mouse_click", "button": "left"}, {"action": "keyboard_press", "key": "enter"},
+            {"action": "keyboard_press", "key": "tab"}]
+    executor = DryRunExecutor()
+    for optimized, expected in ((False, 5), (True, 3)):  # Le clic à une position, et une frappe par touche
+        run(compile_actions(plan, optimized), executor)
+        assert len(executor.events) == expected
+        assert executor.position == (5, 5)
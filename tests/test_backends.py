@@ -0,0 +1,77 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from gempcbot.backends import RecordingBackend, ReplayBackend, TextResponse
+from gempcbot.standin_server import serve
+
+
+class StreamingBackend:
+    model_name = "simulé"
+
+    def __init__(self, chunks, events):
+        self.chunks = chunks
+        self.events = events
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        if not stream:
+            return TextResponse("".join(self.chunks))
+        return self._stream()
+
+    def _stream(self):
+        for chunk in self.chunks:
+            self.events.append(("envoyé", chunk))
+            yield TextResponse(chunk)
+
+
+def test_recording_stream_yields_chunks_as_they_arrive(tmp_path):
+    events = []
+    cassette = tmp_path / "cassette.jsonl"
+    backend = RecordingBackend(StreamingBackend(["click", "_mouse ", "left\n"], events), str(cassette))
+    response = backend.generate_content(["instruction"], stream=True)
+    for chunk in response:
+        events.append(("reçu", chunk.text))
+        assert not cassette.exists() or not cassette.read_text()
+    assert events == [("envoyé", "click"), ("reçu", "click"), ("envoyé", "_mouse "), ("reçu", "_mouse "),
+                      ("envoyé", "left\n"), ("reçu", "left\n")]
+    assert response.text == "click_mouse left\n"
+    entry = json.loads(cassette.read_text())
+    assert entry["stream"] and entry["response"] == "click_mouse left\n"
+    assert ReplayBackend(str(cassette), latency=0).generate_content(["instruction"]).text == "click_mouse left\n"
+
+
+def test_interrupted_stream_is_not_recorded(tmp_path):
+    cassette = tmp_path / "cassette.jsonl"
+    backend = RecordingBackend(StreamingBackend(["a", "b", "c"], []), str(cassette))
+    for chunk in backend.generate_content(["instruction"], stream=True):
+        break
+    assert not cassette.exists()
+
+
+class FailingBackend:
+    def __init__(self, error):
+        self.error = error
+
+    def generate_content(self, contents):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, status", [(LookupError("cassette épuisée"), 404),
+                                           (RuntimeError("cassette illisible"), 500)])
+def test_standin_server_returns_json_errors(error, status):
+    server = serve(FailingBackend(error), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/",
+                                         data=json.dumps({"prompt": ["bonjour"]}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        with pytest.raises(urllib.error.HTTPError) as raised:
+            urllib.request.urlopen(request, timeout=5)
+        assert raised.value.code == status
+        assert str(error) in json.loads(raised.value.read().decode("utf-8"))["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,42 @@
+from PIL import Image, ImageDraw
+
+from gempcbot.dirty_regions import REGION, SAME, DirtyRegionTracker
+
+BOT_WINDOW = (1200, 500, 1600, 900)
+VISION_DATA = {"elements": [{"text": "Fichier", "bounding_box": {"x1": 10, "y1": 10, "x2": 60, "y2": 30}}]}
+
+
+def desktop(log_lines=0, dialog=False):
+    img = Image.new("RGB", (1920, 1080), (40, 90, 160))
+    draw = ImageDraw.Draw(img)
+    if dialog:
+        draw.rectangle((300, 200, 500, 300), fill=(240, 240, 240))
+    draw.rectangle(BOT_WINDOW, fill=(255, 255, 255))
+    for i in range(log_lines):
+        draw.rectangle((1220, 520 + 30 * i, 1580, 540 + 30 * i), fill=(30, 30, 30))
+    return img
+
+
+def tracker_after(image):
+    tracker = DirtyRegionTracker(tile=64)
+    tracker.update(image, VISION_DATA)
+    return tracker
+
+
+def test_log_change_is_dirty_without_ignore():
+    mode, box, _ = tracker_after(desktop(3)).plan(desktop(8))
+    assert mode == REGION
+    assert box[0] <= BOT_WINDOW[0] + 20 and box[2] >= BOT_WINDOW[2] - 20
+
+
+def test_log_change_is_ignored_in_bot_window():
+    mode, box, data = tracker_after(desktop(3)).plan(desktop(8), [BOT_WINDOW])
+    assert (mode, box, data) == (SAME, None, VISION_DATA)
+
+
+def test_region_box_excludes_bot_window():
+    mode, box, _ = tracker_after(desktop(3)).plan(desktop(8, dialog=True), [BOT_WINDOW])
+    assert mode == REGION
+    x1, y1, x2, y2 = box
+    assert x1 <= 300 and y1 <= 200 and x2 >= 500 and y2 >= 300
+    assert x2 < BOT_WINDOW[0] and y2 < BOT_WINDOW[1]
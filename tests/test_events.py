@@ -0,0 +1,47 @@
+import pytest
+
+from gempcbot.events import TkSink
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(callback)
+
+
+class FakeText:
+    def __init__(self):
+        self.text = ""
+
+    def insert(self, index, text):
+        self.text += text
+
+    def index(self, index):
+        return f"{self.text.count(chr(10)) + 1}.0"
+
+    def delete(self, start, end):
+        pass
+
+    def see(self, index):
+        pass
+
+
+class BrokenLabel:
+    def config(self, **options):
+        raise RuntimeError("widget détruit")
+
+
+def test_drain_reschedules_when_a_widget_fails():
+    root, text = FakeRoot(), FakeText()
+    sink = TkSink(root, text, BrokenLabel(), None, None)
+    sink.emit("log", message="avant")
+    sink.emit("status", text="Gemini réfléchi...")
+    sink.emit("log", message="après")
+    with pytest.raises(RuntimeError):
+        root.scheduled.pop()()
+    assert len(root.scheduled) == 1  # Le prochain passage est toujours planifié
+    assert text.text == "avant\n"
+    root.scheduled.pop()()
+    assert text.text == "avant\naprès\n"
@@ -0,0 +1,15 @@
+import time
+
+from PIL import Image
+
+from gempcbot.history import ScreenHistory
+
+
+def test_summary_text_does_not_change_with_time(monkeypatch):
+    history = ScreenHistory()
+    history.record("ouvre le bloc-notes", Image.new("RGB", (64, 48)), [{"action": "capture_screen"}], "réussi")
+    first = history.summary()
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3600)
+    assert history.summary() == first
+    assert first.startswith("- étape 1 | tâche: ouvre le bloc-notes |")
@@ -0,0 +1,67 @@
+from PIL import Image, ImageDraw
+
+from gempcbot.capture import ScreenCapturer
+from gempcbot.local_check import EXPECTED_CHANGE, INCONCLUSIVE, UNCHANGED, LocalVerifier
+
+BOT_WINDOW = (1200, 500, 1600, 900)  # Fenêtre du bot sur la capture (x1, y1, x2, y2)
+
+
+def desktop(log_lines=0, dialog=False):
+    """Capture simulée : le bureau, une boîte de dialogue éventuelle et la fenêtre du bot avec log_lines lignes."""
+    img = Image.new("RGB", (1920, 1080), (40, 90, 160))
+    draw = ImageDraw.Draw(img)
+    if dialog:
+        draw.rectangle((300, 200, 700, 500), fill=(240, 240, 240))
+    draw.rectangle(BOT_WINDOW, fill=(255, 255, 255))
+    for i in range(log_lines):
+        draw.rectangle((1220, 520 + 30 * i, 1580, 540 + 30 * i), fill=(30, 30, 30))
+    return img
+
+
+def test_log_only_change_counts_without_ignore():
+    verdict, ratio, _ = LocalVerifier().compare(desktop(3), desktop(8))
+    assert verdict == EXPECTED_CHANGE
+    assert ratio > 0
+
+
+def test_log_only_change_is_unchanged_outside_bot_window():
+    verdict, ratio, regions = LocalVerifier().compare(desktop(3), desktop(8), ignore=[BOT_WINDOW])
+    assert verdict == UNCHANGED
+    assert ratio == 0
+    assert regions == []
+
+
+def test_change_outside_bot_window_is_still_seen():
+    verifier = LocalVerifier()
+    before, after = desktop(3), desktop(8, dialog=True)
+    assert verifier.compare(before, after, ignore=[BOT_WINDOW])[0] == EXPECTED_CHANGE
+    assert verifier.compare(before, after, [(500, 350)], [BOT_WINDOW])[0] == EXPECTED_CHANGE
+    assert verifier.compare(before, after, [(100, 1000)], [BOT_WINDOW])[0] == INCONCLUSIVE
+
+
+def test_click_near_log_is_not_explained_by_log_change():
+    verdict, _, _ = LocalVerifier().compare(desktop(3), desktop(8), [(1250, 600)], [BOT_WINDOW])
+    assert verdict == UNCHANGED
+
+
+def test_ignore_boxes_in_capture_pixels():
+    capturer = ScreenCapturer()
+    monitor = {"left": 1920, "top": 0, "width": 1920, "height": 1080}
+    assert capturer.ignore_boxes(monitor) == ()
+    capturer.ignore_rect = {"left": 3000, "top": 100, "width": 400, "height": 300}
+    assert capturer.ignore_boxes(monitor, 0.5) == ((540.0, 50.0, 740.0, 200.0),)
+    capturer.ignore_rect = {"left": 100, "top": 100, "width": 400, "height": 300}  # Sur un autre moniteur
+    assert capturer.ignore_boxes(monitor) == ()
+
+
+def test_small_mark_near_click_is_seen_at_full_resolution():
+    before = desktop(3, dialog=True)
+    after = before.copy()
+    ImageDraw.Draw(after).rectangle((490, 340, 509, 359), fill=(20, 20, 20))  # Case cochée de 20x20 px
+    verifier = LocalVerifier()
+    verdict, ratio, regions = verifier.compare(before, after, [(500, 350)], [BOT_WINDOW])
+    assert ratio < verifier.unchanged_ratio
+    assert verdict == EXPECTED_CHANGE
+    x1, y1, x2, y2 = regions[0]
+    assert x1 <= 490 and y1 <= 340 and x2 >= 510 and y2 >= 360
+    assert verifier.compare(before, after, [(1000, 900)], [BOT_WINDOW])[0] == UNCHANGED
@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from gempcbot.scheduler import (ModelLimiter, RequestCancelled, RequestDeadlineExceeded, RequestScheduler,
+                                split_limits)
+
+
+def test_cancelled_during_throttle_wait_refunds():
+    calls = []
+    scheduler = RequestScheduler({"m": (1, None)}, poll_interval=0.01, period=10.0)
+    scheduler.call("m", lambda timeout: calls.append(timeout))
+    start = time.monotonic()
+    scheduler.should_stop = lambda: time.monotonic() - start > 0.05
+    with pytest.raises(RequestCancelled):
+        scheduler.call("m", lambda timeout: calls.append(timeout))
+    assert len(calls) == 1
+    assert scheduler.limiter("m").requests.level > -0.5  # La deuxième réservation a été rendue
+
+
+def test_expired_deadline_raises_instead_of_calling():
+    calls = []
+    scheduler = RequestScheduler({}, deadline=None)
+    with pytest.raises(RequestDeadlineExceeded):
+        scheduler.call("m", lambda timeout: calls.append(timeout), deadline=time.monotonic() - 1)
+    assert calls == []
+    assert scheduler.stats()["m"]["failures"] == 1
+
+
+def test_timeout_is_time_left_before_deadline():
+    scheduler = RequestScheduler({}, deadline=5.0)
+    timeout = scheduler.call("m", lambda timeout: timeout)
+    assert 4.0 < timeout <= 5.0
+
+
+def test_split_limits_shares_quota():
+    limits = {"a": (10, 4_000_000), "b": (2, None)}
+    assert split_limits(limits, 1) == limits
+    assert split_limits(limits, 4) == {"a": (2.5, 1_000_000), "b": (0.5, None)}
+
+
+def test_fractional_rpm_limits_rate():
+    limiter = ModelLimiter(rpm=0.5, period=1.0)  # Une requête toutes les 2 s
+    first, second = limiter.reserve(0), limiter.reserve(0)
+    assert second - first == pytest.approx(2.0, abs=0.05)
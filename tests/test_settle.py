@@ -0,0 +1,69 @@
+from PIL import Image, ImageDraw
+
+from gempcbot.capture import ScreenCapturer
+from gempcbot.settle import ScreenSettleWaiter
+
+MONITOR = {"left": 0, "top": 0, "width": 1920, "height": 1080}
+BOT_WINDOW = {"left": 1200, "top": 500, "width": 400, "height": 400}
+
+
+class FakeScreen:
+    """Écran dont seul le journal du bot change : une ligne de plus à chaque capture."""
+
+    def __init__(self):
+        self.lines = 0
+
+    def grab(self):
+        img = Image.new("RGB", (MONITOR["width"], MONITOR["height"]), (40, 90, 160))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((1200, 500, 1600, 900), fill=(255, 255, 255))
+        for i in range(self.lines % 12):
+            draw.rectangle((1220, 520 + 30 * i, 1580, 540 + 30 * i), fill=(30, 30, 30))
+        self.lines += 1
+        return img, dict(MONITOR)
+
+
+def capturer_for(screen, ignore_rect):
+    capturer = ScreenCapturer()
+    capturer.grab = screen.grab
+    capturer.ignore_rect = ignore_rect
+    return capturer
+
+
+def test_log_repaint_ends_wait_for_change_without_ignore_rect():
+    waiter = ScreenSettleWaiter(capturer_for(FakeScreen(), None).grab_thumbnail, poll_interval=0.01)
+    _, changed = waiter.wait_for_change(1.0)
+    assert changed
+
+
+def test_log_repaint_is_ignored_with_bot_window():
+    waiter = ScreenSettleWaiter(capturer_for(FakeScreen(), BOT_WINDOW).grab_thumbnail, poll_interval=0.01,
+                                quiet_window=0.05)
+    elapsed, changed = waiter.wait_for_change(0.1)
+    assert not changed and elapsed >= 0.1
+    _, stable = waiter.wait_until_stable(1.0)
+    assert stable
+
+
+class MenuScreen:
+    """Écran sur lequel un menu s'ouvre dès le clic, avant le début de l'attente."""
+
+    def __init__(self):
+        self.menu_open = False
+
+    def grab(self):
+        img = Image.new("RGB", (MONITOR["width"], MONITOR["height"]), (40, 90, 160))
+        if self.menu_open:
+            ImageDraw.Draw(img).rectangle((100, 100, 500, 700), fill=(240, 240, 240))
+        return img, dict(MONITOR)
+
+
+def test_reference_taken_before_click_sees_fast_reaction():
+    screen = MenuScreen()
+    waiter = ScreenSettleWaiter(capturer_for(screen, None).grab_thumbnail, poll_interval=0.01)
+    reference = waiter.reference()
+    screen.menu_open = True  # le clic
+    elapsed, changed = waiter.wait_for_change(1.0, reference=reference)
+    assert changed and elapsed < 0.5
+    _, changed = waiter.wait_for_change(0.1)
+    assert not changed
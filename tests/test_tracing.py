@@ -0,0 +1,31 @@
+import threading
+
+from gempcbot.tracing import RunTracer
+
+
+def test_background_span_stays_out_of_next_run():
+    tracer = RunTracer()
+    tracer.start_run("première tâche")
+    first_run = tracer.run_id
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with tracer.span("vision"):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait(5)
+    with tracer.span("planning"):
+        pass
+    assert tracer.end_run()["planning"]["count"] == 1
+
+    tracer.start_run("deuxième tâche")
+    release.set()
+    thread.join(5)
+    with tracer.span("capture"):
+        pass
+    assert tracer.run_id != first_run
+    assert [span["stage"] for span in tracer.spans] == ["capture"]
+    assert all(span["run_id"] == tracer.run_id for span in tracer.spans)
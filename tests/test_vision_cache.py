@@ -0,0 +1,23 @@
+from PIL import Image, ImageDraw
+
+from gempcbot.vision_cache import VisionCache
+
+
+def screen(marked=False):
+    img = Image.new("RGB", (320, 200), (40, 90, 160))
+    if marked:
+        ImageDraw.Draw(img).rectangle((0, 0, 200, 120), fill=(255, 255, 255))
+    return img
+
+
+def test_peek_does_not_count_hits_or_misses():
+    cache = VisionCache()
+    key = cache.key_for(screen())
+    assert cache.peek(key) == (None, None)
+    cache.put(key, {"elements": [{"text": "OK"}]})
+    data, distance = cache.peek(key)
+    assert data == {"elements": [{"text": "OK"}]} and distance == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+    cache.get(key)
+    cache.get(cache.key_for(screen(marked=True)))
+    assert (cache.hits, cache.misses) == (1, 1)